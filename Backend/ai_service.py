@@ -1,43 +1,417 @@
 import os
+import time
+import threading
 import requests
 import json
 import random
-from dotenv import load_dotenv
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+import lead_scoring
+import churn_model
+import json_extract
+import compliance_rules
+import compliance_scan
+import metrics
+from micro_batcher import build_micro_batchers
+from chat_sessions import build_chat_session_store
+from resilience import (call_with_retries, build_retry_policy, build_circuit_breaker,
+                        build_timeouts)
+import pricing_engine
+import product_index
+import prompts
+import segment_cache
+import sentiment_lexicon
+from rate_limiter import PRIORITIES, build_rate_limiter, current_priority, request_priority
+from response_cache import ResponseCache, build_response_cache
+from single_flight import SingleFlight
+from tokens import estimate_message_tokens, estimate_tokens
 
-load_dotenv()
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+# Streams cannot use response_format; in JSON mode this system message stands in for it so a
+# streamed reply to the compact prompt has the same shape as the non-streamed one
+STREAM_JSON_INSTRUCTION = ("Reply with a single JSON object only: no prose, no markdown code fences, "
+                           "nothing before or after the object.")
+
+# Set when _post_chat answers from the response cache; read by per-call timings (this thread only)
+_served_from_cache = contextvars.ContextVar("llm_served_from_cache", default=False)
+
+def _env_flag(name, default):
+    """Reads a boolean flag (1/true/yes/on) from the environment."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
 class AIService:
-    def __init__(self):
+    def __init__(self, pool_connections=None, pool_maxsize=None, pool_block=None, keep_alive=None):
+        """
+        Args:
+            pool_connections (int): Number of per-host connection pools to cache (GROQ_POOL_CONNECTIONS)
+            pool_maxsize (int): Max connections kept open per host (GROQ_POOL_MAXSIZE)
+            pool_block (bool): Block when all pooled connections are busy instead of
+                opening throwaway extra ones (GROQ_POOL_BLOCK)
+            keep_alive (bool): Reuse connections between calls (GROQ_KEEP_ALIVE)
+        """
         self.api_key = os.getenv("GROQ_API_KEY")
-        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
+        # GROQ_API_URL points the service at any OpenAI-compatible endpoint (e.g. mock_groq_server.py)
+        self.api_url = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
         self.model = "llama-3.3-70b-versatile"
         self.chat_history = []
 
-    def _call_groq(self, prompt):
-        if not self.api_key:
-            return "Error: API Key missing in .env file."
-        
-        headers = {
+        # Connection pool settings (constructor args win over environment)
+        self.pool_connections = int(pool_connections or os.getenv("GROQ_POOL_CONNECTIONS", 4))
+        self.pool_maxsize = int(pool_maxsize or os.getenv("GROQ_POOL_MAXSIZE", 32))
+        self.pool_block = _env_flag("GROQ_POOL_BLOCK", False) if pool_block is None else pool_block
+        self.keep_alive = _env_flag("GROQ_KEEP_ALIVE", True) if keep_alive is None else keep_alive
+
+        self._stats_lock = threading.Lock()
+        self._upstream_calls = 0
+        self.session = self._build_session()
+
+        # Response cache for deterministic prompts (LLM_CACHE_* env vars, None when disabled)
+        self.cache = build_response_cache()
+
+        # Coalesce concurrent identical requests into one upstream call (LLM_SINGLE_FLIGHT)
+        self.single_flight = SingleFlight() if _env_flag("LLM_SINGLE_FLIGHT", True) else None
+
+        # Server-side chat history (CHAT_* env vars)
+        self.chat_sessions = build_chat_session_store()
+
+        # Upstream resilience: retries with backoff, circuit breaker, per-profile timeouts
+        self.retry_policy = build_retry_policy()
+        self.circuit_breaker = build_circuit_breaker()
+        self.timeouts = build_timeouts()
+
+        # Client-side RPM/TPM budgets (GROQ_RPM_LIMIT / GROQ_TPM_LIMIT, None when unlimited)
+        self.rate_limiter = build_rate_limiter()
+        self.completion_token_estimate = int(os.getenv("GROQ_TPM_COMPLETION_ESTIMATE", 300))
+
+        # Groq JSON mode + compact schema-hint prompts for the structured modules (GROQ_JSON_MODE)
+        self.json_mode = _env_flag("GROQ_JSON_MODE", True)
+        self.prompt_savings = {}
+
+        # Versioned prompt templates, compiled once (prompts.py)
+        self.prompts = prompts.REGISTRY
+
+        # Local lexicon scorer answers confident sentiment cases; the rest go to the LLM
+        # (SENTIMENT_FAST_PATH / SENTIMENT_MIN_CONFIDENCE)
+        self.sentiment_fast_path = _env_flag("SENTIMENT_FAST_PATH", True)
+        self.sentiment_min_confidence = float(os.getenv("SENTIMENT_MIN_CONFIDENCE", 0.5))
+        self.sentiment_paths = {"lexicon": 0, "llm": 0}
+
+        # Deterministic compliance pre-screen; the LLM reviews only texts the rules flag by
+        # default (COMPLIANCE_RULES_PATH / COMPLIANCE_LLM_REVIEW = flagged|always|never)
+        self.compliance_rules = compliance_rules.build_rule_set()
+        self.compliance_llm_review = os.getenv("COMPLIANCE_LLM_REVIEW", "flagged").strip().lower()
+        self.compliance_paths = {"rules": 0, "llm": 0}
+        # Process pool for multi-worker batch scans: spawned by the first one and shared by
+        # every later scan for the life of the service (one process per CPU, started on demand)
+        self._scan_pool = None
+        self._scan_pool_lock = threading.Lock()
+
+        # Opt-in micro-batching: concurrent short sentiment/compliance LLM calls are packed into
+        # one indexed multi-item prompt (LLM_MICRO_BATCH / LLM_MICRO_BATCH_MAX_SIZE /
+        # LLM_MICRO_BATCH_MAX_WAIT_MS / LLM_MICRO_BATCH_MAX_CHARS)
+        self.micro_batchers = build_micro_batchers({
+            "sentiment": lambda items: self._run_classification_batch("sentiment", items),
+            "compliance": lambda items: self._run_classification_batch("compliance", items)
+        })
+        self.micro_batch_max_chars = int(os.getenv("LLM_MICRO_BATCH_MAX_CHARS", 1000))
+
+        # Catalog retrieval for personalization: the LLM ranks only the top candidates from
+        # the product index when one has been built (PRODUCT_INDEX_PATH / PERSONALIZE_CANDIDATES
+        # / PERSONALIZE_RECOMMENDATIONS)
+        self.product_index_path = product_index.default_index_path()
+        self.product_index = product_index.load_product_index(self.product_index_path)
+        self._product_index_stamp = self._index_stamp()
+        self._catalog_lock = threading.Lock()
+        self.personalize_candidates = int(os.getenv("PERSONALIZE_CANDIDATES", 8))
+        self.personalize_recommendations = int(os.getenv("PERSONALIZE_RECOMMENDATIONS", 3))
+
+        # Precomputed recommendations per role x industry x size segment (SEGMENT_CACHE_BACKEND /
+        # SEGMENT_CACHE_PATH, None when disabled)
+        self.segment_store = segment_cache.build_segment_store()
+
+    def _build_session(self):
+        """
+        Builds the pooled HTTP session shared by every Groq call path.
+        The session is configured once here and never mutated afterwards, so it
+        is safe to share across Flask worker threads (urllib3's pool is thread-safe).
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
             "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Structure the payload exactly as Groq expects
+            "Content-Type": "application/json",
+            "Connection": "keep-alive" if self.keep_alive else "close"
+        })
+        return session
+
+    def _cache_lookup(self, messages, temperature, use_cache, json_mode=False):
+        """
+        Returns (request_key, cached_text).
+        request_key content-addresses the request and is also the single-flight key;
+        cached_text is None on a miss or when caching does not apply.
+        """
+        request_key = ResponseCache.make_key(self.model, temperature, messages,
+                                             JSON_OBJECT_FORMAT if json_mode else None)
+        if not use_cache or self.cache is None:
+            return request_key, None
+        return request_key, self.cache.get(request_key)
+
+    def _cache_store(self, request_key, content, use_cache):
+        if use_cache and self.cache is not None:
+            self.cache.set(request_key, content)
+
+    def _estimate_request_tokens(self, data):
+        """TPM charge for a request: estimated prompt tokens plus a typical completion."""
+        return estimate_message_tokens(data["messages"]) + self.completion_token_estimate
+
+    def _record_usage(self, data, body):
+        """Feeds the usage Groq reported to the metrics and the rate limiter's TPM estimate."""
+        usage = body.get("usage") or {}
+        metrics.record_usage(usage)
+        if self.rate_limiter is not None:
+            self.rate_limiter.settle(self._estimate_request_tokens(data), usage.get("total_tokens"))
+
+    def _send(self, data, timeout="default", stream=False, priority=None):
+        """
+        POSTs to Groq with the profile's (connect, read) timeout, retrying 429/5xx and
+        connection errors with jittered backoff (honoring Retry-After). Fails fast with
+        CircuitOpenError while the circuit breaker is open. With a rate limiter configured
+        every attempt first queues for RPM/TPM budget at the given priority (default: the
+        caller's request_priority context), before the circuit breaker is consulted.
+        """
+        priority = priority or current_priority()
+        tokens = self._estimate_request_tokens(data)
+        acquire = None
+        if self.rate_limiter is not None:
+            acquire = lambda: self.rate_limiter.acquire(tokens, priority)
+
+        def attempt():
+            with self._stats_lock:
+                self._upstream_calls += 1
+            return self.session.post(self.api_url, json=data, timeout=self.timeouts[timeout], stream=stream)
+
+        started = time.perf_counter()
+        try:
+            resp = call_with_retries(attempt, self.retry_policy, self.circuit_breaker,
+                                     (requests.ConnectionError, requests.Timeout), acquire)
+            resp.raise_for_status()
+        except Exception:
+            metrics.observe_upstream(time.perf_counter() - started, "error")
+            raise
+        metrics.observe_upstream(time.perf_counter() - started, "success")
+        return resp
+
+    def _post_chat(self, messages, temperature=0.7, use_cache=False, timeout="default", priority=None,
+                   json_mode=False, request_key=None):
+        """
+        Sends a chat completion request over the pooled session and returns the message text.
+        With use_cache=True an identical (model, temperature, messages) request is answered
+        from the response cache instead of going upstream. Concurrent identical requests
+        share a single upstream call. timeout selects a profile from self.timeouts.
+        json_mode sets response_format json_object so Groq only returns a JSON object.
+        request_key: the caller already looked this request up and missed (skips the lookup).
+        """
+        if request_key is None:
+            request_key, cached = self._cache_lookup(messages, temperature, use_cache, json_mode)
+            if cached is not None:
+                _served_from_cache.set(True)
+                return cached
+
+        def fetch():
+            data = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature
+            }
+            if json_mode:
+                data["response_format"] = JSON_OBJECT_FORMAT
+            body = self._send(data, timeout, priority=priority).json()
+            self._record_usage(data, body)
+            content = body['choices'][0]['message']['content']
+            self._cache_store(request_key, content, use_cache)
+            return content
+
+        if self.single_flight is None:
+            return fetch()
+        return self.single_flight.do(request_key, fetch)
+
+    def _stream_chat(self, messages, temperature=0.7, timeout="default", priority=None):
+        """
+        Streams a chat completion (stream=true) and yields content deltas as they arrive.
+        Bypasses the response cache and single-flight: every stream is its own upstream call.
+        """
+        if not self.api_key:
+            raise ValueError("API Key missing in .env file")
+
         data = {
             "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.7
+            "messages": messages,
+            "temperature": temperature,
+            "stream": True
+        }
+        # Retries only cover establishing the stream; the read timeout applies between chunks
+        with self._send(data, timeout, stream=True, priority=priority) as resp:
+            for line in resp.iter_lines():
+                # Server-Sent Events: "data: {chunk json}" lines, terminated by "data: [DONE]"
+                if not line.startswith(b"data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == b"[DONE]":
+                    break
+                delta = json.loads(payload)['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+
+    def _json_stream_messages(self, prompt):
+        """
+        Messages for streaming a structured module: the same _structured_prompt text as the
+        non-streaming call, plus STREAM_JSON_INSTRUCTION in JSON mode (where the compact
+        prompt relies on response_format, which streaming requests cannot send).
+        """
+        messages = [{"role": "user", "content": prompt}]
+        if self.json_mode:
+            messages.insert(0, {"role": "system", "content": STREAM_JSON_INSTRUCTION})
+        return messages
+
+    def _stream_events(self, messages, finalize, timeout="default", priority=None):
+        """
+        Yields ("token", {"delta": text}) for each streamed chunk, then
+        ("done", finalize(full_text)) with the same result the non-streaming method returns.
+        """
+        parts = []
+        for delta in self._stream_chat(messages, timeout=timeout, priority=priority):
+            parts.append(delta)
+            yield "token", {"delta": delta}
+        yield "done", finalize("".join(parts))
+
+    def connection_stats(self):
+        """
+        Connection reuse counters for the Groq session.
+        
+        Returns:
+            dict: requests sent, new connections opened, reused connections and reuse ratio
+        """
+        requests_sent = 0
+        connections_opened = 0
+        idle_connections = 0
+        pools = self.session.get_adapter(self.api_url).poolmanager.pools
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue  # evicted between keys() and lookup
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
+            if pool.pool is not None:
+                # The queue is pre-filled with None placeholders; count live sockets only
+                idle_connections += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+
+        reused = max(requests_sent - connections_opened, 0)
+        with self._stats_lock:
+            upstream_calls = self._upstream_calls
+        return {
+            "upstream_calls": upstream_calls,
+            "requests_sent": requests_sent,
+            "connections_opened": connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / requests_sent, 3) if requests_sent else 0.0,
+            "idle_connections": idle_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "keep_alive": self.keep_alive
         }
+
+    def _call_groq(self, prompt, use_cache=False, timeout="default", priority=None, json_mode=False,
+                   request_key=None):
+        if not self.api_key:
+            return "Error: API Key missing in .env file."
         
         try:
-            resp = requests.post(self.api_url, json=data, headers=headers)
-            resp.raise_for_status()
-            return resp.json()['choices'][0]['message']['content']
+            return self._post_chat([{"role": "user", "content": prompt}], use_cache=use_cache, timeout=timeout,
+                                   priority=priority, json_mode=json_mode, request_key=request_key)
         except Exception as e:
             print(f"DEBUG: AI Service Error -> {e}")
             return f"AI Error: {str(e)}"
 
+    def _call_json(self, prompt, module, use_cache=False, timeout="default", priority=None):
+        """
+        _call_groq for prompts that must answer with a JSON object. When the reply has no
+        extractable object or fails json_extract.SCHEMAS[module], one repair call is made;
+        returns the reply text for the module's parser. Uses Groq JSON mode when enabled.
+        """
+        response = self._call_groq(prompt, use_cache=use_cache, timeout=timeout, priority=priority,
+                                   json_mode=self.json_mode)
+        return self._repair_json(response, module, use_cache, timeout, priority)
+
+    def _repair_json(self, response, module, use_cache=False, timeout="default", priority=None):
+        """
+        Returns response unchanged when it validates (the common case: no extra call) or is
+        an upstream error; otherwise asks the model once, at temperature 0, to fix its own
+        reply and returns the fix if that validates.
+        """
+        errors = json_extract.parse(response, module)[1]
+        if not errors or json_extract.is_upstream_error(response):
+            return response
+        metrics.record_parse_failure(module)
+        try:
+            repaired = self._post_chat(json_extract.repair_messages(module, response, errors), temperature=0,
+                                       use_cache=use_cache, timeout=timeout, priority=priority,
+                                       json_mode=self.json_mode)
+        except Exception as e:
+            print(f"DEBUG: JSON repair call failed -> {e}")
+            metrics.record_repair(module, False)
+            return response
+        repaired_ok = not json_extract.parse(repaired, module)[1]
+        metrics.record_repair(module, repaired_ok)
+        return repaired if repaired_ok else response
+
+    def _structured_prompt(self, module, template, **fields):
+        """
+        Prompt for a structured module from the `template` / `<template>_task` pair in the
+        registry. In JSON mode the response_format already forces a JSON object, so the short
+        task is followed by the one-line json_extract.schema_hint instead of the verbose
+        template's pretty-printed skeleton; the token difference (the verbose size is
+        estimated, not rendered) is recorded per module. Without JSON mode the verbose
+        template is used as before.
+        """
+        if not self.json_mode:
+            return self.prompts.render(template, **fields)
+        task = self.prompts.render(f"{template}_task", **fields).rstrip()  # optional last line may be empty
+        prompt = f"{task}\n\nRespond with a JSON object: {json_extract.schema_hint(module)}"
+        verbose_tokens = self.prompts.get(template).estimate(**fields)
+        compact_tokens = estimate_tokens(prompt)
+        with self._stats_lock:
+            entry = self.prompt_savings.setdefault(module, {"prompts": 0, "verbose_tokens": 0, "compact_tokens": 0})
+            entry["prompts"] += 1
+            entry["verbose_tokens"] += verbose_tokens
+            entry["compact_tokens"] += compact_tokens
+        metrics.record_prompt_savings(module, verbose_tokens - compact_tokens)
+        return prompt
+
+    def prompt_savings_stats(self):
+        """Estimated prompt tokens saved by the compact JSON-mode prompts, per module and in total."""
+        with self._stats_lock:
+            modules = {module: dict(entry, tokens_saved=entry["verbose_tokens"] - entry["compact_tokens"])
+                       for module, entry in self.prompt_savings.items()}
+        verbose = sum(entry["verbose_tokens"] for entry in modules.values())
+        saved = sum(entry["tokens_saved"] for entry in modules.values())
+        return {
+            "json_mode": self.json_mode,
+            "tokens_saved": saved,
+            "saved_ratio": round(saved / verbose, 3) if verbose else 0.0,
+            "modules": modules
+        }
+
     # ===================== CENTRALIZED LLM HANDLER (Node.js Pattern) =====================
+    @metrics.track_method()
     def call_llm_with_system_prompt(self, system_prompt, user_prompt):
         """
         Unified LLM interface that takes a system prompt and user prompt.
@@ -53,69 +427,166 @@ class AIService:
         if not self.api_key:
             return {"status": "error", "message": "API Key missing in .env file"}
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         # Combine system prompt and user prompt for full context
         full_prompt = f"{system_prompt}\n\n{user_prompt}"
         
-        data = {
-            "model": self.model,
-            "messages": [{"role": "user", "content": full_prompt}],
-            "temperature": 0.7
-        }
-        
         try:
-            resp = requests.post(self.api_url, json=data, headers=headers)
-            resp.raise_for_status()
-            response_text = resp.json()['choices'][0]['message']['content']
-            
-            # Try to parse as JSON, return raw if fails
-            try:
-                json_data = json.loads(response_text)
-                return {"status": "success", "data": json_data}
-            except json.JSONDecodeError:
-                return {"status": "success", "data": response_text}
-                
+            response_text = self._post_chat([{"role": "user", "content": full_prompt}], timeout="generator")
+            return self._parse_system_prompt_response(response_text)
         except Exception as e:
             print(f"DEBUG: API Error in call_llm_with_system_prompt -> {e}")
             return {"status": "error", "message": str(e)}
 
+    def _parse_system_prompt_response(self, response_text):
+        # Use the JSON object in the reply (fences/prose around it are fine), return raw if there is none
+        json_data = json_extract.extract_json(response_text)
+        if json_data is not None:
+            return {"status": "success", "data": json_data}
+        metrics.record_parse_failure("system_prompt")
+        return {"status": "success", "data": response_text}
+
     # ===================== MODULE 1: MARKET INTELLIGENCE =====================
-    def analyze_sentiment(self, text):
-        """Analyzes customer sentiment and returns confidence score."""
-        prompt = (f"Analyze the sentiment of this customer feedback in JSON format:\n\n"
-                  f"\"{text}\"\n\n"
-                  f"Return ONLY valid JSON with these exact keys:\n"
-                  f"{{ \"sentiment\": \"positive/neutral/negative\", \"confidence\": 0.0-1.0, \"summary\": \"brief analysis\" }}")
-        response = self._call_groq(prompt)
-        try:
-            return json.loads(response)
-        except:
-            return {
-                "sentiment": "neutral",
-                "confidence": 0.5,
-                "summary": response
-            }
+    @metrics.track_method()
+    def analyze_sentiment(self, text, use_cache=True, fast_path=None):
+        """
+        Analyzes customer sentiment and returns confidence score.
+        Confident lexicon scores are returned without an upstream call; "path" says
+        which scorer answered ("lexicon" or "llm"). fast_path=False forces the LLM.
+        """
+        result = self._lexicon_sentiment(text, fast_path)
+        if result is not None:
+            return result
+        if self._batchable("sentiment", text):
+            response = self._submit_classification("sentiment", text, use_cache).result()
+        else:
+            response = self._call_json(self._sentiment_prompt(text), "sentiment", use_cache=use_cache)
+        return self._llm_sentiment(response)
+
+    def _lexicon_sentiment(self, text, fast_path=None):
+        """Fast-path result (path "lexicon") or None when the text should go to the LLM."""
+        if not (self.sentiment_fast_path if fast_path is None else fast_path):
+            return None
+        result = sentiment_lexicon.score_text(text, self.sentiment_min_confidence)
+        if result is None:
+            return None
+        self._count_sentiment_path("lexicon")
+        return dict(result, path="lexicon")
+
+    def _llm_sentiment(self, response):
+        self._count_sentiment_path("llm")
+        return dict(self._parse_sentiment(response), path="llm")
+
+    def _count_sentiment_path(self, path, count=1):
+        with self._stats_lock:
+            self.sentiment_paths[path] += count
+
+    def sentiment_path_stats(self):
+        """How many sentiment results each path produced (single and batch calls)."""
+        with self._stats_lock:
+            paths = dict(self.sentiment_paths)
+        total = sum(paths.values())
+        return {
+            "fast_path": self.sentiment_fast_path,
+            "min_confidence": self.sentiment_min_confidence,
+            "paths": paths,
+            "lexicon_ratio": round(paths["lexicon"] / total, 3) if total else 0.0
+        }
+
+    def analyze_sentiment_batch(self, texts, escalate_limit=0, max_concurrency=4):
+        """
+        Scores many texts in one vectorized lexicon pass. Up to escalate_limit of the
+        ambiguous texts (least confident first) are sent to the LLM, at most
+        max_concurrency calls at a time; other ambiguous rows keep their lexicon score.
+
+        Returns:
+            dict: sentiment_lexicon.score_texts arrays + "escalated" {row index: LLM result}
+        """
+        result, escalate = self._score_sentiment_batch(texts, escalate_limit)
+        if escalate:
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+                answers = list(pool.map(lambda i: self._escalate_sentiment(texts[i]), escalate))
+            result["escalated"] = dict(zip(escalate, answers))
+        return result
+
+    def _score_sentiment_batch(self, texts, escalate_limit):
+        """Lexicon part of the batch scorer -> (score arrays, row indices to escalate)."""
+        result = sentiment_lexicon.score_texts(texts, self.sentiment_min_confidence)
+        result["escalated"] = {}
+        escalate = sentiment_lexicon.escalation_indices(result, escalate_limit).tolist()
+        self._count_sentiment_path("lexicon", len(texts) - len(escalate))
+        return result, escalate
+
+    @metrics.track_method("analyze_sentiment_batch")
+    def _escalate_sentiment(self, text):
+        response = self._call_json(self._sentiment_prompt(text), "sentiment", use_cache=True, priority="batch")
+        return self._llm_sentiment(response)
+
+    def _sentiment_prompt(self, text):
+        return self._structured_prompt("sentiment", "sentiment", text=text)
+
+    def _parse_sentiment(self, response):
+        data, errors = json_extract.parse(response, "sentiment")
+        if not errors:
+            return data
+        metrics.record_fallback("sentiment", response)
+        return {
+            "sentiment": "neutral",
+            "confidence": 0.5,
+            "summary": response
+        }
 
-    def competitor_benchmark(self, brand):
+    @metrics.track_method()
+    def competitor_benchmark(self, brand, use_cache=True):
         """Benchmarks competitor market position and trends."""
-        prompt = (f"Provide market intelligence on '{brand}' in JSON format:\n"
-                  f"Return ONLY valid JSON with these exact keys:\n"
-                  f"{{ \"market_score\": 0-100, \"trend\": \"up/down/stable\", \"market_position\": \"description\", \"key_strength\": \"strength\", \"key_weakness\": \"weakness\" }}")
-        response = self._call_groq(prompt)
+        response = self._call_json(self._benchmark_prompt(brand), "benchmark", use_cache=use_cache)
+        return self._parse_benchmark(response)
+
+    def competitor_benchmark_many(self, brands, max_concurrency=8, use_cache=True):
+        """
+        Benchmarks many brands on a bounded thread pool at "batch" priority, yielding each
+        brand as soon as its call completes (completion order, not input order).
+
+        Yields:
+            dict: index, brand, result (or error), elapsed_ms and cached (True when the
+                  response cache answered without an upstream call)
+        """
+        pool = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
         try:
-            return json.loads(response)
-        except:
-            return {
-                "market_score": random.randint(60, 85),
-                "trend": random.choice(["up", "down", "stable"]),
-                "market_position": response,
-                "key_strength": "Strong brand recognition",
-                "key_weakness": "Limited innovation"
-            }
+            futures = [pool.submit(self._timed_benchmark, index, brand, use_cache)
+                       for index, brand in enumerate(brands)]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)  # client went away: drop brands not started
+
+    def _timed_benchmark(self, index, brand, use_cache):
+        token = _served_from_cache.set(False)
+        started = time.perf_counter()
+        try:
+            with request_priority("batch"):
+                entry = {"index": index, "brand": brand, "result": self.competitor_benchmark(brand, use_cache)}
+        except Exception as e:
+            entry = {"index": index, "brand": brand, "error": str(e)}
+        entry["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        entry["cached"] = _served_from_cache.get()
+        _served_from_cache.reset(token)
+        return entry
+
+    def _benchmark_prompt(self, brand):
+        return self._structured_prompt("benchmark", "benchmark", brand=brand)
+
+    def _parse_benchmark(self, response):
+        data, errors = json_extract.parse(response, "benchmark")
+        if not errors:
+            return data
+        metrics.record_fallback("benchmark", response)
+        return {
+            "market_score": random.randint(60, 85),
+            "trend": random.choice(["up", "down", "stable"]),
+            "market_position": response,
+            "key_strength": "Strong brand recognition",
+            "key_weakness": "Limited innovation"
+        }
 
     # ===================== MODULE 2: SMART PRICING ENGINE =====================
     def dynamic_price(self, cost, demand_index, competitor_price):
@@ -128,19 +599,14 @@ class AIService:
             return {"error": "Invalid input values"}
 
         # Dynamic pricing algorithm
-        base_margin = 0.4  # 40% margin
+        base_margin = pricing_engine.BASE_MARGIN
         demand_multiplier = demand_index
-        competitor_factor = (competitor_price / cost) * 0.3
+        competitor_factor = (competitor_price / cost) * pricing_engine.COMPETITOR_WEIGHT
 
         optimal_price = cost * (1 + base_margin) * demand_multiplier + competitor_factor
         margin = ((optimal_price - cost) / optimal_price) * 100
 
-        if demand_index > 1.2:
-            reason = "High demand detected - premium pricing recommended"
-        elif demand_index < 0.8:
-            reason = "Low demand - competitive pricing recommended"
-        else:
-            reason = "Stable demand - balanced pricing recommended"
+        reason = pricing_engine.PRICING_REASONS[pricing_engine.demand_reason_code(demand_index)]
 
         return {
             "optimal_price": round(optimal_price, 2),
@@ -149,58 +615,208 @@ class AIService:
             "competitor_analysis": f"Competitor price: ${competitor_price:.2f} - Your optimal: ${optimal_price:.2f}"
         }
 
+    def dynamic_price_batch(self, cost, demand_index, competitor_price):
+        """
+        Vectorized dynamic_price for whole catalogs (equal-length columns).
+        
+        Returns:
+            dict: numpy arrays optimal_price, margin_percent and reason_code
+        """
+        return pricing_engine.optimize_prices(cost, demand_index, competitor_price)
+
     # ===================== MODULE 3: COMPLIANCE & RISK MONITORING =====================
-    def compliance_check(self, text):
-        """Checks marketing text for legal, GDPR, and claim risks."""
-        prompt = (f"Review this marketing text for compliance issues in JSON format:\n\n"
-                  f"\"{text}\"\n\n"
-                  f"Return ONLY valid JSON with these exact keys:\n"
-                  f"{{ \"risk_level\": \"low/medium/high\", \"flagged_phrases\": [list], \"suggestions\": [list], \"gdpr_compliant\": true/false }}")
-        response = self._call_groq(prompt)
-        try:
-            return json.loads(response)
-        except:
-            return {
-                "risk_level": "low",
-                "flagged_phrases": [],
-                "suggestions": ["Review marketing claims against regulations"],
-                "gdpr_compliant": True
-            }
+    @metrics.track_method()
+    def compliance_check(self, text, use_cache=True, review=None):
+        """
+        Checks marketing text for legal, GDPR, and claim risks.
+        The rule pre-screen runs first; the LLM is asked for a nuanced review only when a
+        rule fires (COMPLIANCE_LLM_REVIEW=flagged) or review=True. Responses include the
+        rule "matches" (with offsets) and "path" ("rules" or "llm").
+        """
+        screen, needs_review = self._screen_compliance(text, review)
+        if not needs_review:
+            return screen
+        if self._batchable("compliance", text):
+            response = self._submit_classification("compliance", text, use_cache).result()
+        else:
+            response = self._call_json(self._compliance_prompt(text), "compliance", use_cache=use_cache)
+        return self._review_compliance(screen, response)
 
-    # ===================== MODULE 4: AI CHATBOT =====================
-    def ai_chat_response(self, message, history=None):
-        """24/7 AI chatbot for customer inquiries."""
-        if history is None:
-            history = []
+    def _screen_compliance(self, text, review=None):
+        """-> (rule assessment, whether the LLM should review the text)."""
+        screen = self.compliance_rules.assess(text)
+        if review is None:
+            review = self.compliance_llm_review == "always" or (
+                self.compliance_llm_review == "flagged" and bool(screen["matches"]))
+        if not review:
+            with self._stats_lock:
+                self.compliance_paths["rules"] += 1
+            screen["path"] = "rules"
+        return screen, review
 
-        system_prompt = ("You are a helpful AI business assistant for an AI growth platform. "
-                        "Answer questions about business growth, AI capabilities, and product features. "
-                        "Keep responses concise and professional.")
+    def _review_compliance(self, screen, response):
+        """
+        Merges the LLM review into the rule assessment: the higher risk level wins, flagged
+        phrases and suggestions are combined and either side can mark the text non-GDPR-compliant.
+        """
+        with self._stats_lock:
+            self.compliance_paths["llm"] += 1
+        review = self._parse_compliance(response)
+        rank = compliance_rules.SEVERITY_RANK
+        flagged = {}
+        for phrase in screen["flagged_phrases"] + list(review["flagged_phrases"]):
+            flagged.setdefault(str(phrase).lower(), phrase)  # rule spans keep the text's casing
+        risk_level = review["risk_level"] if rank.get(review["risk_level"], 0) > rank[screen["risk_level"]] \
+            else screen["risk_level"]
+        return dict(
+            review,
+            risk_level=risk_level,
+            flagged_phrases=list(flagged.values()),
+            suggestions=list(dict.fromkeys(screen["suggestions"] + list(review["suggestions"]))),
+            gdpr_compliant=bool(screen["gdpr_compliant"] and review["gdpr_compliant"]),
+            matches=screen["matches"],
+            path="llm"
+        )
 
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history
-        for msg in history:
-            messages.append(msg)
-        
-        # Add current message
-        messages.append({"role": "user", "content": message})
+    def compliance_check_batch(self, assets, workers=1, chunk_size=compliance_scan.CHUNK_SIZE):
+        """
+        Rules-only scan of many (id, text) assets; with workers > 1 up to workers chunks at a
+        time go to the service's shared scan pool.
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        Returns:
+            generator: JSONL text chunks, one result line per asset in input order
+        """
+        pool = self._compliance_scan_pool() if workers > 1 else None
+        return compliance_scan.stream_scan(assets, self.compliance_rules, workers, chunk_size, pool)
 
-        data = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 0.7
+    def _compliance_scan_pool(self):
+        with self._scan_pool_lock:
+            if self._scan_pool is None:
+                self._scan_pool = compliance_scan.scan_pool(self.compliance_rules, os.cpu_count() or 1)
+            return self._scan_pool
+
+    def compliance_stats(self):
+        """Rule set size/version and how many checks each path answered."""
+        with self._stats_lock:
+            paths = dict(self.compliance_paths)
+        return dict(self.compliance_rules.stats(), llm_review=self.compliance_llm_review, paths=paths)
+
+    def _compliance_prompt(self, text):
+        return self._structured_prompt("compliance", "compliance", text=text)
+
+    def _parse_compliance(self, response):
+        data, errors = json_extract.parse(response, "compliance")
+        if not errors:
+            return data
+        metrics.record_fallback("compliance", response)
+        return {
+            "risk_level": "low",
+            "flagged_phrases": [],
+            "suggestions": ["Review marketing claims against regulations"],
+            "gdpr_compliant": True
         }
 
+    # ===================== MICRO-BATCHED CLASSIFICATION =====================
+    # Metrics label of the upstream calls a module's micro-batches make
+    CLASSIFICATION_METHODS = {"sentiment": "analyze_sentiment", "compliance": "compliance_check"}
+
+    def _batchable(self, module, text):
+        return module in self.micro_batchers and len(text) <= self.micro_batch_max_chars
+
+    def _classification_prompt(self, module, text):
+        return self._sentiment_prompt(text) if module == "sentiment" else self._compliance_prompt(text)
+
+    def _submit_classification(self, module, text, use_cache=True):
+        """
+        Future with the reply text for one short sentiment/compliance text. The response
+        cache is keyed on the single-item prompt (batched and unbatched calls share entries);
+        on a miss the text is queued on the module's micro-batcher along with the caller's
+        rate-limit priority, which the batch thread cannot see.
+        """
+        prompt = self._classification_prompt(module, text)
+        request_key, cached = self._cache_lookup([{"role": "user", "content": prompt}], 0.7, use_cache,
+                                                 self.json_mode)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        return self.micro_batchers[module].submit((text, prompt, request_key, use_cache, current_priority()))
+
+    def _run_classification_batch(self, module, items):
+        """
+        MicroBatcher callback for [(text, prompt, cache key, use_cache, priority)] -> reply text
+        per item. Two or more items go upstream as one indexed prompt and the reply is split
+        per item; a lone item, and any item the batch reply left out or got wrong, is sent on
+        its own. Those single calls run concurrently (at most one batch worth) and reuse the
+        cache key _submit_classification already looked up, so the miss is not counted twice.
+        The batch call waits for rate-limit budget at the most urgent priority among its items
+        (an interactive request is never queued behind batch work because it shares a batch);
+        single calls keep their own item's priority.
+        """
+        # Runs on a micro-batcher thread, so the callers' track_method label is not visible here
+        with metrics.method_label(self.CLASSIFICATION_METHODS[module]):
+            replies = [None] * len(items)
+            if len(items) > 1:
+                priority = min((item[4] for item in items), key=PRIORITIES.__getitem__)
+                response = self._call_groq(self._batch_prompt(module, [item[0] for item in items]),
+                                           priority=priority, json_mode=self.json_mode)
+                if json_extract.is_upstream_error(response):
+                    return [response] * len(items)
+                replies = self._split_batch_reply(module, response, len(items))
+            for (_, _, request_key, use_cache, _), reply in zip(items, replies):
+                if reply is not None:
+                    self._cache_store(request_key, reply, use_cache)
+
+            def single(item):
+                _, prompt, request_key, use_cache, priority = item
+                response = self._call_groq(prompt, use_cache=use_cache, priority=priority, json_mode=self.json_mode,
+                                           request_key=request_key)
+                return self._repair_json(response, module, use_cache, priority=priority)
+
+            missing = [i for i, reply in enumerate(replies) if reply is None]
+            if len(missing) == 1:
+                replies[missing[0]] = single(items[missing[0]])
+            elif missing:
+                with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+                    for i, reply in zip(missing, pool.map(single, [items[i] for i in missing])):
+                        replies[i] = reply
+            return replies
+
+    def _batch_prompt(self, module, texts):
+        items = "\n".join(f"[{index}] {json.dumps(text, ensure_ascii=False)}" for index, text in enumerate(texts))
+        return self._structured_prompt(f"{module}_batch", f"{module}_batch", items=items, count=len(texts))
+
+    def _split_batch_reply(self, module, response, count):
+        """Single-item reply texts (JSON) from a batch reply, None where an item is missing or invalid."""
+        replies = [None] * count
+        data, errors = json_extract.parse(response, f"{module}_batch")
+        if errors:
+            metrics.record_parse_failure(f"{module}_batch")
+            return replies
+        for entry in data["results"]:
+            try:
+                index = int(entry.get("index"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < count and replies[index] is None:
+                item, item_errors = json_extract.validate({k: v for k, v in entry.items() if k != "index"}, module)
+                if not item_errors:
+                    replies[index] = json.dumps(item)
+        return replies
+
+    def micro_batch_stats(self):
+        if not self.micro_batchers:
+            return None
+        return dict({name: batcher.stats() for name, batcher in self.micro_batchers.items()},
+                    max_chars=self.micro_batch_max_chars)
+
+    # ===================== MODULE 4: AI CHATBOT =====================
+    @metrics.track_method()
+    def ai_chat_response(self, message, history=None):
+        """24/7 AI chatbot for customer inquiries."""
+        messages = self._chat_messages(message, history)
         try:
-            resp = requests.post(self.api_url, json=data, headers=headers)
-            resp.raise_for_status()
-            response_text = resp.json()['choices'][0]['message']['content']
+            response_text = self._post_chat(messages, timeout="chat", priority="interactive")
             return {
                 "response": response_text,
                 "status": "success"
@@ -211,224 +827,416 @@ class AIService:
                 "status": "error"
             }
 
+    @metrics.track_method()
+    def ai_chat_response_stream(self, message, history=None):
+        """Streaming variant of ai_chat_response -> (event, data) tuples."""
+        return self._stream_events(self._chat_messages(message, history),
+                                   lambda text: {"response": text, "status": "success"},
+                                   timeout="chat", priority="interactive")
+
+    def ai_chat_session_response(self, session_id, message):
+        """
+        ai_chat_response with server-side history: the client only sends the new message.
+        A falsy session_id starts a new session; the id is returned in the result.
+        """
+        session_id = session_id or self.chat_sessions.new_session_id()
+        result = self.ai_chat_response(message, self.chat_sessions.history(session_id))
+        if result["status"] == "success":
+            self.chat_sessions.record_turn(session_id, message, result["response"])
+            self._compact_chat_session(session_id)
+        result["session_id"] = session_id
+        return result
+
+    def ai_chat_session_stream(self, session_id, message):
+        """Streaming variant of ai_chat_session_response -> (event, data) tuples."""
+        session_id = session_id or self.chat_sessions.new_session_id()
+        for event, data in self.ai_chat_response_stream(message, self.chat_sessions.history(session_id)):
+            if event == "done":
+                self.chat_sessions.record_turn(session_id, message, data["response"])
+                data = dict(data, session_id=session_id)
+            yield event, data
+        # Runs after "done" has been sent, so it never delays the reply
+        self._compact_chat_session(session_id)
+
+    def end_chat_session(self, session_id):
+        self.chat_sessions.delete(session_id)
+
+    @metrics.track_method("chat_summary")
+    def _compact_chat_session(self, session_id):
+        """Folds the oldest turns into the rolling summary once the session is over its token budget."""
+        pending = self.chat_sessions.pending_compaction(session_id)
+        if pending is None:
+            return
+        summary, turns = pending
+        try:
+            new_summary = self._post_chat(self._chat_summary_messages(summary, turns), temperature=0.2)
+        except Exception as e:
+            print(f"DEBUG: Chat summary failed, using truncated transcript -> {e}")
+            metrics.record_fallback("chat_summary", "AI Error")
+            new_summary = self._fallback_chat_summary(summary, turns)
+        self.chat_sessions.apply_compaction(session_id, new_summary, turns)
+
+    def _chat_summary_messages(self, summary, turns):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turns)
+        prompt = self.prompts.render("chat_summary", summary=summary or "(none)", transcript=transcript)
+        return [{"role": "user", "content": prompt}]
+
+    def _fallback_chat_summary(self, summary, turns):
+        transcript = " ".join(f"{m['role']}: {m['content']}" for m in turns)
+        return f"{summary} {transcript}".strip()[-600:]
+
+    def _chat_messages(self, message, history=None):
+        if history is None:
+            history = []
+
+        messages = [{"role": "system", "content": self.prompts.render("chat_system")}]
+        
+        # Add conversation history
+        for msg in history:
+            messages.append(msg)
+        
+        # Add current message
+        messages.append({"role": "user", "content": message})
+        return messages
+
     # ===================== MODULE 5: PREDICTIVE CUSTOMER ANALYTICS =====================
+    @metrics.track_method()
     def predict_behavior(self, history_data):
         """Predicts customer behavior and optimal touchpoints."""
-        prompt = (f"Analyze customer behavior data and predict in JSON format:\n"
-                  f"Data: {history_data}\n\n"
-                  f"Return ONLY valid JSON with these exact keys:\n"
-                  f"{{ \"churn_risk\": \"high/medium/low\", \"churn_probability\": 0-100, \"next_best_action\": \"action\", \"campaign_timing\": \"timing\", \"recommended_channel\": \"channel\" }}")
-        response = self._call_groq(prompt)
-        try:
-            return json.loads(response)
-        except:
-            return {
-                "churn_risk": "medium",
-                "churn_probability": random.randint(20, 70),
-                "next_best_action": response,
-                "campaign_timing": "Immediate - within 7 days",
-                "recommended_channel": "Email or SMS"
-            }
+        response = self._call_json(self._prediction_prompt(history_data), "prediction")
+        return self._parse_prediction(response, history_data)
+
+    def _prediction_prompt(self, history_data):
+        return self._structured_prompt("prediction", "prediction", history_data=history_data)
+
+    def _parse_prediction(self, response, history_data=None):
+        """Falls back to the local churn model (structured history) or its typical-customer prior."""
+        data, errors = json_extract.parse(response, "prediction")
+        if not errors:
+            return data
+        metrics.record_fallback("prediction", response)
+        fallback = churn_model.predict_one(history_data)
+        if not json_extract.is_upstream_error(response):
+            fallback["next_best_action"] = response
+        return fallback
+
+    def predict_behavior_batch(self, customers, narrate_top_n=0, max_concurrency=4):
+        """
+        Scores many structured customer records with the vectorized churn model. The LLM
+        writes next-best-action text only for the narrate_top_n most likely high-risk
+        churners, at most max_concurrency calls at a time; everyone else gets the playbook.
+
+        Returns:
+            tuple: (churn_model.score_customers arrays, {row index: LLM action})
+        """
+        result, top = self._score_churn_batch(customers, narrate_top_n)
+        actions = self.narrate_churn([(customers[i], result["churn_probability"][i], result["top_driver"][i])
+                                      for i in top], max_concurrency)
+        return result, {i: action for i, action in zip(top, actions) if action}
+
+    def _score_churn_batch(self, customers, narrate_top_n):
+        """Model part of the batch predictor -> (score arrays, indices of customers to narrate)."""
+        result = churn_model.score_customers(churn_model.columns_from_records(customers), count=len(customers))
+        return result, churn_model.high_risk_indices(result, narrate_top_n).tolist()
+
+    def narrate_churn(self, customers, max_concurrency=4):
+        """
+        LLM next-best-action text for (record, churn probability, top driver) tuples, in order.
+        Items whose reply is unusable are None, so callers keep the playbook action.
+        """
+        if not customers:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            return list(pool.map(lambda customer: self._narrate_customer(*customer), customers))
+
+    def _churn_narrative_prompt(self, record, probability, driver):
+        history = f"{json.dumps(record, default=str)} (model churn probability {int(probability)}%, main driver: {driver})"
+        return self._prediction_prompt(history)
+
+    @metrics.track_method("predict_behavior_batch")
+    def _narrate_customer(self, record, probability, driver):
+        response = self._call_json(self._churn_narrative_prompt(record, probability, driver), "prediction",
+                                   priority="batch")
+        return self._churn_action(response)
+
+    def _churn_action(self, response):
+        data, errors = json_extract.parse(response, "prediction")
+        if errors:
+            metrics.record_fallback("prediction", response)
+            return None
+        return {key: data[key] for key in ("next_best_action", "campaign_timing", "recommended_channel")}
 
     # ===================== MODULE 6: ADVANCED PERSONALIZATION ENGINE =====================
+    @metrics.track_method()
     def recommend_products(self, user_profile):
-        """AI-powered product recommendations based on user profile."""
-        prompt = (f"Generate product recommendations in JSON format:\n"
-                  f"User Profile: {user_profile}\n\n"
-                  f"Return ONLY valid JSON with this exact key:\n"
-                  f"{{ \"recommended_products\": [{{'name': 'product', 'reason': 'why', 'priority': 'high/medium/low'}}] }}")
-        response = self._call_groq(prompt)
+        """
+        AI-powered product recommendations based on user profile. With a product index the
+        profile first retrieves the closest catalog products and the LLM only ranks and
+        explains those; without one it recommends freely. A profile that only describes a
+        role x industry x size segment is answered from the segment cache while its entry
+        is fresh, and generated from the segment's canonical profile otherwise.
+        """
+        segment, cached = self._segment_lookup(user_profile)
+        if cached is not None:
+            return cached
+        return self._recommend(segment, user_profile)[0]
+
+    def _recommend(self, segment, user_profile):
+        """Live recommendation -> (result, whether it was stored for the segment)."""
+        profile = segment_cache.segment_profile(segment) if segment else user_profile
+        index, candidates = self._catalog_candidates(profile)
+        response = None
+        if index is None:
+            response = self._call_json(self._recommendation_prompt(profile), "recommendations")
+        elif candidates:
+            response = self._call_json(self._catalog_prompt(profile, candidates), "catalog_recommendations")
+        return self._finish_recommendation(segment, index, candidates, response)
+
+    def _finish_recommendation(self, segment, index, candidates, response):
+        """Parses the reply for either path; segment results that came from the LLM are stored."""
+        if index is None:
+            result = self._parse_recommendations(response)
+            usable = not json_extract.parse(response, "recommendations")[1]
+        else:
+            result = self._rank_candidates(index, candidates, response)
+            usable = result["catalog"]["ranked_by"] == "llm" or not candidates
+        if segment is None:
+            return result, False
+        if usable:
+            self.segment_store.put(segment, self._segment_fingerprint(index), result)
+        return dict(result, segment=segment), usable
+
+    def _segment_lookup(self, user_profile):
+        """(segment key or None, fresh cached result or None)."""
+        segment = segment_cache.segment_key(user_profile) if self.segment_store is not None else None
+        if segment is None:
+            return None, None
+        cached = self.segment_store.get(segment, self.segment_fingerprint())
+        return segment, dict(cached, segment=segment) if cached is not None else None
+
+    def segment_fingerprint(self):
+        return self._segment_fingerprint(self.current_product_index())
+
+    def _segment_fingerprint(self, index):
+        """Everything a segment's recommendations depend on: catalog, prompt texts, model, settings."""
+        digests = self.prompts.digests()
+        return segment_cache.fingerprint({
+            "catalog": index.version if index is not None else None,
+            "prompts": {name: digests[name] for name in segment_cache.PROMPT_TEMPLATES},
+            "model": self.model,
+            "json_mode": self.json_mode,
+            "candidates": self.personalize_candidates,
+            "recommendations": self.personalize_recommendations
+        })
+
+    @metrics.track_method("recommend_products")
+    def refresh_segment(self, segment):
+        """Regenerates one segment's recommendations at batch priority -> True when stored."""
         try:
-            result = json.loads(response)
-            return result
-        except:
-            return {
-                "recommended_products": [
-                    {"name": "AI Analytics Suite", "reason": response, "priority": "high"},
-                    {"name": "Predictive CRM", "reason": "Enhanced customer insights", "priority": "medium"}
-                ]
-            }
+            with request_priority("batch"):
+                return self._recommend(segment, None)[1]
+        except Exception as e:
+            print(f"DEBUG: Segment refresh failed for {segment} -> {e}")
+            return False
+
+    def refresh_segments(self, segments=None, include_known=False, force=False, max_concurrency=4, progress=None):
+        """
+        Incremental segment precompute. Regenerates the given segments (or every stored
+        segment, plus all known segments with include_known) whose entry is missing or was
+        generated under another catalog/prompt fingerprint; force regenerates the given
+        segments regardless.
+
+        Returns:
+            dict: summary (segments, refreshed, failed, seconds, fingerprint)
+        """
+        if self.segment_store is None:
+            raise ValueError("Segment cache is disabled (SEGMENT_CACHE_BACKEND=none)")
+        segments = segment_cache.validate_segments(segments or [])
+        current = self.segment_fingerprint()
+        if segments and force:
+            todo = segments
+        elif segments:
+            todo = [segment for segment in self.segment_store.outdated(current, segments) if segment in segments]
+        else:
+            todo = self.segment_store.outdated(current, segment_cache.known_segments() if include_known else ())
+        summary = segment_cache.precompute(self, todo, max_concurrency, progress)
+        return dict(summary, segments=len(todo), fingerprint=current)
+
+    def segment_stats(self):
+        return self.segment_store.stats(self.segment_fingerprint()) if self.segment_store is not None else None
+
+    def _catalog_candidates(self, user_profile):
+        """(index, top-k retrieved products), or (None, None) when no catalog has been indexed."""
+        index = self.current_product_index()  # may be swapped by a catalog upload mid-request
+        if index is None:
+            return None, None
+        return index, index.search(user_profile, self.personalize_candidates)
+
+    def _catalog_prompt(self, user_profile, candidates):
+        lines = "\n".join(f"{c['id']} | {c['name']} | {c['category'] or '-'} | {c['description'] or '-'}"
+                          for c in candidates)
+        return self._structured_prompt("catalog_recommendations", "catalog_recommendations",
+                                       user_profile=user_profile, candidates=lines,
+                                       count=min(self.personalize_recommendations, len(candidates)))
+
+    def _rank_candidates(self, index, candidates, response):
+        """
+        Keeps the LLM's picks that are real candidates (matched by id, then by name) with the
+        catalog name and retrieval score; when none survive, the best retrieved candidates
+        are returned in retrieval order with their matched terms as the reason.
+        """
+        by_id = {c["id"]: c for c in candidates}
+        by_name = {c["name"].lower(): c for c in candidates}
+        picked = {}
+        data, errors = json_extract.parse(response, "catalog_recommendations") if response is not None else ({}, [])
+        for item in data.get("recommended_products", []) if not errors else []:
+            candidate = (by_id.get(str(item.get("id", "")).strip())
+                         or by_name.get(str(item.get("name", "")).strip().lower()))
+            if candidate and candidate["id"] not in picked and len(picked) < self.personalize_recommendations:
+                picked[candidate["id"]] = {"id": candidate["id"], "name": candidate["name"],
+                                           "reason": item.get("reason", ""),
+                                           "priority": str(item.get("priority", "medium")).lower(),
+                                           "score": candidate["score"]}
+        ranked_by = "llm" if picked else "retrieval"
+        if not picked and response is not None:
+            metrics.record_fallback("catalog_recommendations", response)
+            for rank, candidate in enumerate(candidates[:self.personalize_recommendations]):
+                picked[candidate["id"]] = {
+                    "id": candidate["id"], "name": candidate["name"],
+                    "reason": f"Matches your profile: {', '.join(candidate['matched_terms'])}",
+                    "priority": "high" if rank == 0 else "medium" if rank < 3 else "low",
+                    "score": candidate["score"]
+                }
+        return {
+            "recommended_products": list(picked.values()),
+            "catalog": {"version": index.version, "candidates": len(candidates), "ranked_by": ranked_by}
+        }
+
+    def rebuild_product_index(self, records, dim=product_index.DEFAULT_DIM):
+        """Builds the product index from catalog records and starts serving it (returns its stats)."""
+        with self._catalog_lock:  # one build at a time writes the index files
+            self.product_index = product_index.ProductIndex.build(records, self.product_index_path, dim)
+            self._product_index_stamp = self._index_stamp()
+            return self.product_index.stats()
+
+    def _index_stamp(self):
+        try:
+            return os.stat(os.path.join(self.product_index_path, "meta.json")).st_mtime_ns
+        except OSError:
+            return None
+
+    def current_product_index(self):
+        """
+        The product index, reopened when its files changed since this process loaded them
+        (e.g. another gunicorn worker served the catalog upload). meta.json is replaced
+        last by a build, so a new mtime means a complete index is on disk; one stat per call.
+        """
+        stamp = self._index_stamp()
+        if stamp is not None and stamp != self._product_index_stamp:
+            with self._catalog_lock:
+                if stamp != self._product_index_stamp:
+                    try:
+                        self.product_index = product_index.ProductIndex(self.product_index_path)
+                        self._product_index_stamp = stamp
+                    except (OSError, ValueError) as e:
+                        print(f"DEBUG: Product index reload failed, serving the loaded one -> {e}")
+        return self.product_index
+
+    def _recommendation_prompt(self, user_profile):
+        return self._structured_prompt("recommendations", "recommendations", user_profile=user_profile)
+
+    def _parse_recommendations(self, response):
+        data, errors = json_extract.parse(response, "recommendations")
+        if not errors:
+            return data
+        metrics.record_fallback("recommendations", response)
+        return {
+            "recommended_products": [
+                {"name": "AI Analytics Suite", "reason": response, "priority": "high"},
+                {"name": "Predictive CRM", "reason": "Enhanced customer insights", "priority": "medium"}
+            ]
+        }
 
     # ===================== LEGACY FUNCTIONS =====================
+    @metrics.track_method()
     def generate_campaign(self, product, audience, platform):
-        prompt = (f"Act as a Marketing Manager. Create a campaign for:\n"
-                  f"Product: {product}\nAudience: {audience}\nPlatform: {platform}\n"
-                  f"Include: Strategy, Content Ideas, and KPIs.")
-        return self._call_groq(prompt)
+        return self._call_groq(self._legacy_campaign_prompt(product, audience, platform))
 
+    @metrics.track_method()
     def generate_pitch(self, product, customer):
-        prompt = (f"Act as a Sales Expert. Write a SPIN sales pitch for:\n"
-                  f"Product: {product}\nCustomer: {customer}\n"
-                  f"Include: Elevator Pitch, Value Prop, and Closing.")
-        return self._call_groq(prompt)
+        return self._call_groq(self._legacy_pitch_prompt(product, customer))
 
+    @metrics.track_method()
     def score_lead(self, name, budget, need, urgency):
-        prompt = (f"Act as a Lead Scorer. Analyze:\n"
-                  f"Name: {name}\nBudget: {budget}\nNeed: {need}\nUrgency: {urgency}\n"
-                  f"Output: Score (0-100), Conversion Probability %, and Reasoning.")
-        return self._call_groq(prompt)
+        return self._call_groq(self._legacy_lead_prompt(name, budget, need, urgency))
+
+    def _legacy_campaign_prompt(self, product, audience, platform):
+        return self.prompts.render("legacy_campaign", product=product, audience=audience, platform=platform)
+
+    def _legacy_pitch_prompt(self, product, customer):
+        return self.prompts.render("legacy_pitch", product=product, customer=customer)
+
+    def _legacy_lead_prompt(self, name, budget, need, urgency):
+        return self.prompts.render("legacy_lead", name=name, budget=budget, need=need, urgency=urgency)
 
     # ===================== GENERATOR HUB: MODULE 1 - AI MARKETING STRATEGIST =====================
+    @metrics.track_method()
     def generate_marketing_campaign_strategy(self, product_details, linkedin_demographics):
         """
         AI Marketing Strategist using multi-shot prompting with structured JSON output.
         Generates campaign objectives, content ideas, ad copy, and CTAs.
         """
-        prompt = f"""You are an expert B2B marketing strategist. Generate a structured marketing campaign in VALID JSON format.
-
-PRODUCT DETAILS:
-{product_details}
-
-TARGET LINKEDIN DEMOGRAPHICS:
-{linkedin_demographics}
-
-Return ONLY valid JSON (no markdown, no extra text) with this exact structure:
-{{
-    "campaign_objectives": [
-        "objective 1",
-        "objective 2",
-        "objective 3"
-    ],
-    "content_ideas": [
-        {{
-            "id": 1,
-            "title": "content title",
-            "format": "article/case study/infographic",
-            "key_message": "main message",
-            "engagement_angle": "why it matters to audience"
-        }},
-        {{
-            "id": 2,
-            "title": "content title",
-            "format": "article/case study/infographic",
-            "key_message": "main message",
-            "engagement_angle": "why it matters to audience"
-        }},
-        {{
-            "id": 3,
-            "title": "content title",
-            "format": "article/case study/infographic",
-            "key_message": "main message",
-            "engagement_angle": "why it matters to audience"
-        }},
-        {{
-            "id": 4,
-            "title": "content title",
-            "format": "article/case study/infographic",
-            "key_message": "main message",
-            "engagement_angle": "why it matters to audience"
-        }},
-        {{
-            "id": 5,
-            "title": "content title",
-            "format": "article/case study/infographic",
-            "key_message": "main message",
-            "engagement_angle": "why it matters to audience"
-        }}
-    ],
-    "ad_copy_variations": [
-        {{
-            "variation": 1,
-            "headline": "compelling headline",
-            "body": "persuasive body copy",
-            "tone": "professional/casual/urgent"
-        }},
-        {{
-            "variation": 2,
-            "headline": "compelling headline",
-            "body": "persuasive body copy",
-            "tone": "professional/casual/urgent"
-        }},
-        {{
-            "variation": 3,
-            "headline": "compelling headline",
-            "body": "persuasive body copy",
-            "tone": "professional/casual/urgent"
-        }}
-    ],
-    "platform_specific_ctas": {{
-        "linkedin": "CTA optimized for LinkedIn",
-        "email": "CTA optimized for Email campaigns",
-        "web": "CTA optimized for Website"
-    }},
-    "campaign_timeline": "suggested timeline in weeks",
-    "expected_kpis": {{
-        "click_through_rate": "estimated %",
-        "conversion_rate": "estimated %",
-        "lead_quality_score": "1-10 scale"
-    }}
-}}"""
-        
-        response = self._call_groq(prompt)
-        try:
-            return json.loads(response)
-        except:
-            return {"error": "Failed to parse response", "raw_response": response}
+        response = self._call_json(self._marketing_strategy_prompt(product_details, linkedin_demographics),
+                                   "campaign", timeout="generator")
+        return self._parse_structured(response, "campaign")
+
+    @metrics.track_method()
+    def generate_marketing_campaign_strategy_stream(self, product_details, linkedin_demographics):
+        """Streaming variant of generate_marketing_campaign_strategy -> (event, data) tuples."""
+        prompt = self._marketing_strategy_prompt(product_details, linkedin_demographics)
+        return self._stream_events(
+            self._json_stream_messages(prompt),
+            lambda text: self._parse_structured(self._repair_json(text, "campaign", timeout="generator"), "campaign"),
+            timeout="generator")
+
+    def _marketing_strategy_prompt(self, product_details, linkedin_demographics):
+        return self._structured_prompt("campaign", "campaign", product_details=product_details,
+                                       linkedin_demographics=linkedin_demographics)
+
+    def _parse_structured(self, response, module):
+        data, errors = json_extract.parse(response, module)
+        if not errors:
+            return data
+        metrics.record_fallback(module, response)
+        return {"error": "Failed to parse response", "raw_response": response}
 
     # ===================== GENERATOR HUB: MODULE 2 - B2B SALES PITCH ARCHITECT =====================
+    @metrics.track_method()
     def generate_sales_pitch(self, prospect_title, company_tier, product_info=""):
         """
         B2B Sales Pitch Architect generates personalized sales pitches.
         Input: Prospect Title, Company Tier
         Output: 30-second pitch, pain-point differentiators, strategic CTA
         """
-        prompt = f"""You are an elite B2B sales strategist. Create a targeted sales pitch in VALID JSON format.
-
-PROSPECT PROFILE:
-- Title: {prospect_title}
-- Company Tier: {company_tier}
-{f"- Product/Service Info: {product_info}" if product_info else ""}
-
-Generate ONLY valid JSON (no markdown) with this exact structure:
-{{
-    "elevator_pitch_30sec": "A concise, compelling 30-second pitch tailored to this prospect",
-    "pain_point_analysis": {{
-        "primary_pain": "main pain point for this role/company tier",
-        "secondary_pains": [
-            "pain point 2",
-            "pain point 3"
-        ]
-    }},
-    "differentiators": [
-        {{
-            "differentiator": "unique value proposition",
-            "benefits_for_role": "specific benefits for {prospect_title}",
-            "impact": "quantified business impact"
-        }},
-        {{
-            "differentiator": "unique value proposition",
-            "benefits_for_role": "specific benefits for {prospect_title}",
-            "impact": "quantified business impact"
-        }},
-        {{
-            "differentiator": "unique value proposition",
-            "benefits_for_role": "specific benefits for {prospect_title}",
-            "impact": "quantified business impact"
-        }}
-    ],
-    "strategic_cta": {{
-        "immediate_next_step": "What to ask/do immediately",
-        "suggested_angle": "How to position the next step",
-        "objection_handler": "How to handle likely objections"
-    }},
-    "discovery_questions": [
-        "question 1 to ask prospect",
-        "question 2 to ask prospect",
-        "question 3 to ask prospect"
-    ],
-    "social_proof_angles": [
-        "case study angle relevant to this prospect",
-        "testimonial angle relevant to this prospect"
-    ]
-}}"""
-        
-        response = self._call_groq(prompt)
-        try:
-            return json.loads(response)
-        except:
-            return {"error": "Failed to parse response", "raw_response": response}
+        response = self._call_json(self._sales_pitch_prompt(prospect_title, company_tier, product_info),
+                                   "pitch", timeout="generator")
+        return self._parse_structured(response, "pitch")
+
+    @metrics.track_method()
+    def generate_sales_pitch_stream(self, prospect_title, company_tier, product_info=""):
+        """Streaming variant of generate_sales_pitch -> (event, data) tuples."""
+        prompt = self._sales_pitch_prompt(prospect_title, company_tier, product_info)
+        return self._stream_events(
+            self._json_stream_messages(prompt),
+            lambda text: self._parse_structured(self._repair_json(text, "pitch", timeout="generator"), "pitch"),
+            timeout="generator")
+
+    def _sales_pitch_prompt(self, prospect_title, company_tier, product_info=""):
+        return self._structured_prompt("pitch", "pitch", prospect_title=prospect_title, company_tier=company_tier,
+                                       product_line=f"- Product/Service Info: {product_info}" if product_info else "")
 
     # ===================== GENERATOR HUB: MODULE 3 - INTELLIGENT LEAD SCORER =====================
+    @metrics.track_method()
     def intelligent_lead_score(self, budget, timeline, urgency, additional_context=""):
         """
         Intelligent Lead Scorer using hybrid approach:
@@ -436,107 +1244,98 @@ Generate ONLY valid JSON (no markdown) with this exact structure:
         - LLM for detailed reasoning
         Output: Lead Score (0-100), Reasoning, Conversion Probability
         """
-        # Step 1: Deterministic Weighted Scoring Algorithm
-        score = 0
-        weights = {
-            "budget": 0.40,
-            "timeline": 0.35,
-            "urgency": 0.25
+        calculated_score, conversion_prob = self._deterministic_lead_score(budget, timeline, urgency)
+        reasoning_prompt = self._lead_reasoning_prompt(budget, timeline, urgency, additional_context,
+                                                       calculated_score, conversion_prob)
+        response = self._call_json(reasoning_prompt, "lead_score")
+        return self._parse_lead_score(response, calculated_score, conversion_prob)
+
+    @metrics.track_method()
+    def intelligent_lead_score_stream(self, budget, timeline, urgency, additional_context=""):
+        """
+        Streaming variant of intelligent_lead_score. The deterministic score is sent
+        first as a "score" event, before the LLM reasoning starts streaming.
+        """
+        calculated_score, conversion_prob = self._deterministic_lead_score(budget, timeline, urgency)
+        yield "score", {"lead_score": calculated_score, "conversion_probability": conversion_prob}
+        reasoning_prompt = self._lead_reasoning_prompt(budget, timeline, urgency, additional_context,
+                                                       calculated_score, conversion_prob)
+        yield from self._stream_events(
+            self._json_stream_messages(reasoning_prompt),
+            lambda text: self._parse_lead_score(self._repair_json(text, "lead_score"), calculated_score,
+                                                conversion_prob))
+
+    def _deterministic_lead_score(self, budget, timeline, urgency):
+        """Step 1: Deterministic Weighted Scoring Algorithm -> (lead score, conversion probability)"""
+        return lead_scoring.score_lead(budget, timeline, urgency)
+
+    def _lead_reasoning_prompt(self, budget, timeline, urgency, additional_context,
+                               calculated_score, conversion_prob):
+        """Step 2: LLM for Detailed Reasoning"""
+        return self._structured_prompt(
+            "lead_score", "lead_reasoning", budget=budget, timeline=timeline, urgency=urgency,
+            context_line=f"- Additional Context: {additional_context}" if additional_context else "",
+            lead_score=calculated_score, conversion_probability=conversion_prob)
+
+    def _parse_lead_score(self, response, calculated_score, conversion_prob):
+        data, errors = json_extract.parse(response, "lead_score")
+        if not errors:
+            # The compact prompt states the score instead of asking the model to echo it back
+            data.setdefault("lead_score", calculated_score)
+            data.setdefault("conversion_probability", conversion_prob)
+            return data
+        metrics.record_fallback("lead_score", response)
+        # Fallback if JSON parsing fails
+        return {
+            "lead_score": calculated_score,
+            "conversion_probability": conversion_prob,
+            "reasoning": response,
+            "key_strengths": ["High interest", "Qualified budget"],
+            "risk_factors": [],
+            "recommended_action": "Contact immediately",
+            "sales_strategy": "Focus on value proposition"
         }
+
+    def intelligent_lead_score_batch(self, leads, reasoning_top_n=0, max_concurrency=4):
+        """
+        Scores many leads in one pass with the vectorized deterministic scorer.
+        LLM reasoning is generated only for the reasoning_top_n highest scoring
+        leads, at most max_concurrency calls at a time.
         
-        # Parse and score budget
-        try:
-            budget_val = float(''.join(filter(lambda x: x.isdigit() or x == '.', str(budget).lower().replace('k', '000').replace('m', '000000'))))
-            if budget_val < 10000:
-                budget_score = 30
-            elif budget_val < 50000:
-                budget_score = 60
-            else:
-                budget_score = 100
-        except:
-            budget_score = 50
-        
-        # Score timeline
-        timeline_lower = str(timeline).lower()
-        if "now" in timeline_lower or "immediate" in timeline_lower or "urgent" in timeline_lower:
-            timeline_score = 100
-        elif "week" in timeline_lower or "this" in timeline_lower or "month" in timeline_lower:
-            timeline_score = 80
-        elif "quarter" in timeline_lower:
-            timeline_score = 60
-        elif "year" in timeline_lower or "next" in timeline_lower:
-            timeline_score = 30
-        else:
-            timeline_score = 50
-        
-        # Score urgency
-        urgency_lower = str(urgency).lower()
-        if "high" in urgency_lower or "critical" in urgency_lower:
-            urgency_score = 100
-        elif "medium" in urgency_lower:
-            urgency_score = 65
-        elif "low" in urgency_lower:
-            urgency_score = 30
-        else:
-            urgency_score = 50
-        
-        # Calculate weighted score
-        calculated_score = int(
-            (budget_score * weights["budget"]) +
-            (timeline_score * weights["timeline"]) +
-            (urgency_score * weights["urgency"])
+        Args:
+            leads (list[dict]): Each with budget, timeline, urgency (+ optional additional_context)
+            
+        Returns:
+            list[dict]: Input leads (same order) with lead_score, conversion_probability
+                        and, for the top leads, a "reasoning" object
+        """
+        results, top = self._score_lead_batch(leads, reasoning_top_n)
+        if len(top):
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+                reasons = list(pool.map(lambda i: self._explain_lead(leads[i], results[i]), top))
+            for i, reasoning in zip(top, reasons):
+                results[i]["reasoning"] = reasoning
+        return results
+
+    def _score_lead_batch(self, leads, reasoning_top_n):
+        """Deterministic part of the batch scorer -> (results, indices of leads to explain)."""
+        scores = lead_scoring.score_leads(
+            [lead.get("budget", "") for lead in leads],
+            [lead.get("timeline", "") for lead in leads],
+            [lead.get("urgency", "") for lead in leads]
         )
-        
-        # Conversion probability based on score
-        if calculated_score >= 80:
-            conversion_prob = 75
-        elif calculated_score >= 60:
-            conversion_prob = 50
-        elif calculated_score >= 40:
-            conversion_prob = 25
-        else:
-            conversion_prob = 10
-        
-        # Step 2: LLM for Detailed Reasoning
-        reasoning_prompt = f"""As a sales analyst, provide a brief, actionable reasoning for this lead score.
-
-LEAD ATTRIBUTES:
-- Budget: {budget}
-- Timeline: {timeline}
-- Urgency Level: {urgency}
-{f"- Additional Context: {additional_context}" if additional_context else ""}
-
-Calculate Lead Score: {calculated_score}/100
-
-Provide ONLY valid JSON (no markdown) with this structure:
-{{
-    "lead_score": {calculated_score},
-    "conversion_probability": {conversion_prob},
-    "reasoning": "1-2 sentence explanation of why this is a {calculated_score}/100 lead",
-    "key_strengths": [
-        "strength 1",
-        "strength 2"
-    ],
-    "risk_factors": [
-        "risk 1",
-        "risk 2"
-    ],
-    "recommended_action": "specific next step for sales team",
-    "sales_strategy": "how to approach this lead"
-}}"""
-        
-        response = self._call_groq(reasoning_prompt)
-        try:
-            result = json.loads(response)
-            return result
-        except:
-            # Fallback if JSON parsing fails
-            return {
-                "lead_score": calculated_score,
-                "conversion_probability": conversion_prob,
-                "reasoning": response,
-                "key_strengths": ["High interest", "Qualified budget"],
-                "risk_factors": [],
-                "recommended_action": "Contact immediately",
-                "sales_strategy": "Focus on value proposition"
-            }
\ No newline at end of file
+        results = [
+            dict(lead, lead_score=score, conversion_probability=prob)
+            for lead, score, prob in zip(leads, scores["lead_score"].tolist(),
+                                         scores["conversion_probability"].tolist())
+        ]
+        top = lead_scoring.top_lead_indices(scores["lead_score"], reasoning_top_n).tolist()
+        return results, top
+
+    @metrics.track_method("intelligent_lead_score_batch")
+    def _explain_lead(self, lead, result):
+        prompt = self._lead_reasoning_prompt(lead.get("budget", ""), lead.get("timeline", ""),
+                                             lead.get("urgency", ""), lead.get("additional_context", ""),
+                                             result["lead_score"], result["conversion_probability"])
+        return self._parse_lead_score(self._call_json(prompt, "lead_score", priority="batch"), result["lead_score"],
+                                      result["conversion_probability"])
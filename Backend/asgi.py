@@ -0,0 +1,172 @@
+"""
+ASGI Entry Point
+Serves the Flask app from an ASGI server (uvicorn) so async views are awaited on the
+server's event loop instead of each inbound request holding a worker thread:
+
+    uvicorn --factory asgi:create_asgi_app --workers 4 --host 0.0.0.0 --port 5000
+
+Under a WSGI server (gunicorn, `python app.py`) Flask runs every async view to completion
+on the request's thread; here only sync views and blocking stream reads use a thread.
+"""
+import io
+import sys
+import asyncio
+import inspect
+from flask import request
+from flask.signals import request_started
+
+_END = object()
+
+
+def _environ(scope, body):
+    """WSGI environ for an ASGI http scope whose body has already been read."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False
+    }
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1")
+        value = value.decode("latin-1")
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        elif name == "content-length":
+            key = "CONTENT_LENGTH"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class ASGIApp:
+    """
+    ASGI callable around a Flask app. It follows Flask's own wsgi_app /
+    full_dispatch_request steps (request context, before/after request hooks, error
+    handlers, teardown) but awaits `async def` views directly. Sync views run via
+    asyncio.to_thread, and streamed bodies (SSE from the *_stream generators) are
+    pulled one chunk at a time in a thread so a slow upstream never blocks the loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type '{scope['type']}'")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        environ = _environ(scope, b"".join(chunks))
+
+        app = self.app
+        ctx = app.request_context(environ)
+        error = None
+        try:
+            ctx.push()
+            try:
+                response = await self._full_dispatch_request()
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+        finally:
+            if error is not None and app.should_ignore_error(error):
+                error = None
+            ctx.pop(error)
+        await self._send_response(response, environ, send)
+
+    async def _full_dispatch_request(self):
+        app = self.app
+        try:
+            request_started.send(app, _async_wrapper=app.ensure_sync)
+            rv = app.preprocess_request()
+            if rv is None:
+                rv = await self._dispatch_request()
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        return app.finalize_request(rv)
+
+    async def _dispatch_request(self):
+        app = self.app
+        if request.routing_exception is not None:
+            app.raise_routing_exception(request)
+        rule = request.url_rule
+        if getattr(rule, "provide_automatic_options", False) and request.method == "OPTIONS":
+            return app.make_default_options_response()
+        view = app.view_functions[rule.endpoint]
+        if inspect.iscoroutinefunction(view):
+            return await view(**request.view_args)
+        # to_thread copies the context, so the request context is visible in the thread
+        return await asyncio.to_thread(view, **request.view_args)
+
+    async def _send_response(self, response, environ, send):
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in response.get_wsgi_headers(environ).items()]
+        })
+        body = response.get_app_iter(environ)
+        try:
+            if response.is_streamed:
+                iterator = iter(body)
+                while True:
+                    chunk = await asyncio.to_thread(next, iterator, _END)
+                    if chunk is _END:
+                        break
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            else:
+                for chunk in body:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+
+
+def create_asgi_app(config=None):
+    """create_app(config) wrapped for an ASGI server (uvicorn --factory asgi:create_asgi_app)."""
+    from app import create_app
+    return ASGIApp(create_app(config))
+
+
+def __getattr__(name):
+    # `uvicorn asgi:app` builds the default app on first access, like app:app does
+    if name == "app":
+        globals()["app"] = create_asgi_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
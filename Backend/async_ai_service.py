@@ -0,0 +1,412 @@
+"""
+Async AI Service
+asyncio counterpart to AIService for high-concurrency callers
+"""
+import os
+import time
+import asyncio
+import threading
+import httpx
+import metrics
+import json_extract
+from resilience import call_with_retries_async
+from ai_service import JSON_OBJECT_FORMAT
+from compliance_scan import CHUNK_SIZE
+from product_index import DEFAULT_DIM
+from segment_cache import segment_profile
+from rate_limiter import current_priority
+
+
+class AsyncAIService:
+    """
+    Async version of every AIService module method.
+
+    Prompts, response parsers and configuration (API key, model, URL) are shared
+    with the wrapped AIService, so both paths always send identical requests.
+    Upstream I/O runs on one background event loop that owns a pooled
+    httpx.AsyncClient; callers on any event loop (Flask async views, batch
+    scripts using asyncio.run) hand their request to that loop and await it,
+    so hundreds of Groq calls can be in flight without a thread for each.
+    """
+
+    def __init__(self, ai_service, max_connections=None, max_keepalive_connections=None):
+        """
+        Args:
+            ai_service (AIService): Sync service whose prompts/parsers/config are reused
+            max_connections (int): Max concurrent upstream connections (GROQ_ASYNC_MAX_CONNECTIONS)
+            max_keepalive_connections (int): Idle connections kept open (GROQ_ASYNC_MAX_KEEPALIVE)
+        """
+        self.ai = ai_service
+        self.max_connections = int(max_connections or os.getenv("GROQ_ASYNC_MAX_CONNECTIONS", 200))
+        self.max_keepalive_connections = int(max_keepalive_connections or
+                                             os.getenv("GROQ_ASYNC_MAX_KEEPALIVE", 50))
+        self._loop = None
+        self._client = None
+        self._loop_lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+
+    # ===================== EVENT LOOP / HTTP CLIENT =====================
+    def _service_loop(self):
+        """Starts (once) the background event loop that owns the shared HTTP client."""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="groq-async-client", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _get_client(self):
+        # Only ever called on the service loop, so no locking is needed
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_keepalive_connections),
+                headers={
+                    "Authorization": f"Bearer {self.ai.api_key}",
+                    "Content-Type": "application/json"
+                },
+                timeout=None
+            )
+        return self._client
+
+    async def _send_once(self, payload, timeout):
+        """Runs on the service loop: performs one HTTP round trip (body fully read)."""
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            connect, read = self.ai.timeouts[timeout]
+            return await self._get_client().post(self.ai.api_url, json=payload,
+                                                 timeout=httpx.Timeout(read, connect=connect))
+        finally:
+            self._in_flight -= 1
+
+    async def _send(self, payload, timeout="default", priority=None):
+        """Async equivalent of AIService._send (shares its retry policy, circuit breaker and rate limiter)."""
+        priority = priority or current_priority()
+        tokens = self.ai._estimate_request_tokens(payload)
+        acquire = None
+        if self.ai.rate_limiter is not None:
+            acquire = lambda: self.ai.rate_limiter.acquire_async(tokens, priority)
+
+        async def attempt():
+            with self.ai._stats_lock:
+                self.ai._upstream_calls += 1
+            future = asyncio.run_coroutine_threadsafe(self._send_once(payload, timeout), self._service_loop())
+            return await asyncio.wrap_future(future)
+
+        started = time.perf_counter()
+        try:
+            resp = await call_with_retries_async(attempt, self.ai.retry_policy, self.ai.circuit_breaker,
+                                                 (httpx.TransportError,), acquire)
+            resp.raise_for_status()
+        except Exception:
+            metrics.observe_upstream(time.perf_counter() - started, "error")
+            raise
+        metrics.observe_upstream(time.perf_counter() - started, "success")
+        return resp
+
+    async def _post_chat(self, messages, temperature=0.7, use_cache=False, timeout="default", priority=None,
+                         json_mode=False):
+        """Async equivalent of AIService._post_chat (shares its response cache and single-flight)."""
+        request_key, cached = self.ai._cache_lookup(messages, temperature, use_cache, json_mode)
+        if cached is not None:
+            return cached
+
+        async def fetch():
+            payload = {
+                "model": self.ai.model,
+                "messages": messages,
+                "temperature": temperature
+            }
+            if json_mode:
+                payload["response_format"] = JSON_OBJECT_FORMAT
+            body = (await self._send(payload, timeout, priority)).json()
+            self.ai._record_usage(payload, body)
+            content = body['choices'][0]['message']['content']
+            self.ai._cache_store(request_key, content, use_cache)
+            return content
+
+        if self.ai.single_flight is None:
+            return await fetch()
+        return await self.ai.single_flight.do_async(request_key, fetch)
+
+    async def _call_groq(self, prompt, use_cache=False, timeout="default", priority=None, json_mode=False):
+        if not self.ai.api_key:
+            return "Error: API Key missing in .env file."
+
+        try:
+            return await self._post_chat([{"role": "user", "content": prompt}], use_cache=use_cache,
+                                         timeout=timeout, priority=priority, json_mode=json_mode)
+        except Exception as e:
+            print(f"DEBUG: Async AI Service Error -> {e}")
+            return f"AI Error: {str(e)}"
+
+    async def _call_json(self, prompt, module, use_cache=False, timeout="default", priority=None):
+        """Async equivalent of AIService._call_json."""
+        response = await self._call_groq(prompt, use_cache=use_cache, timeout=timeout, priority=priority,
+                                         json_mode=self.ai.json_mode)
+        return await self._repair_json(response, module, use_cache, timeout, priority)
+
+    async def _repair_json(self, response, module, use_cache=False, timeout="default", priority=None):
+        """Async equivalent of AIService._repair_json."""
+        errors = json_extract.parse(response, module)[1]
+        if not errors or json_extract.is_upstream_error(response):
+            return response
+        metrics.record_parse_failure(module)
+        try:
+            repaired = await self._post_chat(json_extract.repair_messages(module, response, errors), temperature=0,
+                                             use_cache=use_cache, timeout=timeout, priority=priority,
+                                             json_mode=self.ai.json_mode)
+        except Exception as e:
+            print(f"DEBUG: JSON repair call failed -> {e}")
+            metrics.record_repair(module, False)
+            return response
+        repaired_ok = not json_extract.parse(repaired, module)[1]
+        metrics.record_repair(module, repaired_ok)
+        return repaired if repaired_ok else response
+
+    def connection_stats(self):
+        """In-flight counters for the async client."""
+        return {
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "max_connections": self.max_connections
+        }
+
+    async def aclose(self):
+        """Closes the shared HTTP client (its connections live on the service loop)."""
+        if self._client is not None and self._loop is not None:
+            client, self._client = self._client, None
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), self._loop))
+
+    # ===================== CENTRALIZED LLM HANDLER (Node.js Pattern) =====================
+    @metrics.track_method()
+    async def call_llm_with_system_prompt(self, system_prompt, user_prompt):
+        if not self.ai.api_key:
+            return {"status": "error", "message": "API Key missing in .env file"}
+
+        full_prompt = f"{system_prompt}\n\n{user_prompt}"
+        try:
+            response_text = await self._post_chat([{"role": "user", "content": full_prompt}], timeout="generator")
+            return self.ai._parse_system_prompt_response(response_text)
+        except Exception as e:
+            print(f"DEBUG: API Error in async call_llm_with_system_prompt -> {e}")
+            return {"status": "error", "message": str(e)}
+
+    # ===================== MODULE 1: MARKET INTELLIGENCE =====================
+    @metrics.track_method()
+    async def analyze_sentiment(self, text, use_cache=True, fast_path=None):
+        result = self.ai._lexicon_sentiment(text, fast_path)
+        if result is not None:
+            return result
+        if self.ai._batchable("sentiment", text):
+            # packed with concurrent callers; the batch goes upstream on the sync pooled session
+            response = await asyncio.wrap_future(self.ai._submit_classification("sentiment", text, use_cache))
+        else:
+            response = await self._call_json(self.ai._sentiment_prompt(text), "sentiment", use_cache=use_cache)
+        return self.ai._llm_sentiment(response)
+
+    @metrics.track_method()
+    async def analyze_sentiment_batch(self, texts, escalate_limit=0, max_concurrency=4):
+        result, escalate = self.ai._score_sentiment_batch(texts, escalate_limit)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def escalate_text(i):
+            async with semaphore:
+                response = await self._call_json(self.ai._sentiment_prompt(texts[i]), "sentiment",
+                                                 use_cache=True, priority="batch")
+            result["escalated"][i] = self.ai._llm_sentiment(response)
+
+        await asyncio.gather(*[escalate_text(i) for i in escalate])
+        return result
+
+    @metrics.track_method()
+    async def competitor_benchmark(self, brand, use_cache=True):
+        response = await self._call_json(self.ai._benchmark_prompt(brand), "benchmark", use_cache=use_cache)
+        return self.ai._parse_benchmark(response)
+
+    def competitor_benchmark_many(self, brands, max_concurrency=8, use_cache=True):
+        # Results stream as they complete and Flask streams from sync generators,
+        # so the fan-out runs on the sync pooled session
+        return self.ai.competitor_benchmark_many(brands, max_concurrency, use_cache)
+
+    # ===================== MODULE 2: SMART PRICING ENGINE =====================
+    async def dynamic_price(self, cost, demand_index, competitor_price):
+        # Pure arithmetic - no upstream call to await
+        return self.ai.dynamic_price(cost, demand_index, competitor_price)
+
+    async def dynamic_price_batch(self, cost, demand_index, competitor_price):
+        return self.ai.dynamic_price_batch(cost, demand_index, competitor_price)
+
+    # ===================== MODULE 3: COMPLIANCE & RISK MONITORING =====================
+    @metrics.track_method()
+    async def compliance_check(self, text, use_cache=True, review=None):
+        screen, needs_review = self.ai._screen_compliance(text, review)
+        if not needs_review:
+            return screen
+        if self.ai._batchable("compliance", text):
+            response = await asyncio.wrap_future(self.ai._submit_classification("compliance", text, use_cache))
+        else:
+            response = await self._call_json(self.ai._compliance_prompt(text), "compliance", use_cache=use_cache)
+        return self.ai._review_compliance(screen, response)
+
+    def compliance_check_batch(self, assets, workers=1, chunk_size=CHUNK_SIZE):
+        # CPU-bound rule scan streamed by the response - nothing to await
+        return self.ai.compliance_check_batch(assets, workers, chunk_size)
+
+    # ===================== MODULE 4: AI CHATBOT =====================
+    @metrics.track_method()
+    async def ai_chat_response(self, message, history=None):
+        messages = self.ai._chat_messages(message, history)
+        try:
+            response_text = await self._post_chat(messages, timeout="chat", priority="interactive")
+            return {
+                "response": response_text,
+                "status": "success"
+            }
+        except Exception as e:
+            return {
+                "response": f"AI Chatbot Error: {str(e)}",
+                "status": "error"
+            }
+
+    def ai_chat_response_stream(self, message, history=None):
+        # Flask streams from sync generators, so streams run on the sync pooled session
+        return self.ai.ai_chat_response_stream(message, history)
+
+    async def ai_chat_session_response(self, session_id, message):
+        sessions = self.ai.chat_sessions
+        session_id = session_id or sessions.new_session_id()
+        result = await self.ai_chat_response(message, sessions.history(session_id))
+        if result["status"] == "success":
+            sessions.record_turn(session_id, message, result["response"])
+            await self._compact_chat_session(session_id)
+        result["session_id"] = session_id
+        return result
+
+    def ai_chat_session_stream(self, session_id, message):
+        return self.ai.ai_chat_session_stream(session_id, message)
+
+    async def end_chat_session(self, session_id):
+        self.ai.end_chat_session(session_id)
+
+    @metrics.track_method("chat_summary")
+    async def _compact_chat_session(self, session_id):
+        pending = self.ai.chat_sessions.pending_compaction(session_id)
+        if pending is None:
+            return
+        summary, turns = pending
+        try:
+            new_summary = await self._post_chat(self.ai._chat_summary_messages(summary, turns), temperature=0.2)
+        except Exception as e:
+            print(f"DEBUG: Chat summary failed, using truncated transcript -> {e}")
+            metrics.record_fallback("chat_summary", "AI Error")
+            new_summary = self.ai._fallback_chat_summary(summary, turns)
+        self.ai.chat_sessions.apply_compaction(session_id, new_summary, turns)
+
+    # ===================== MODULE 5: PREDICTIVE CUSTOMER ANALYTICS =====================
+    @metrics.track_method()
+    async def predict_behavior(self, history_data):
+        response = await self._call_json(self.ai._prediction_prompt(history_data), "prediction")
+        return self.ai._parse_prediction(response, history_data)
+
+    @metrics.track_method()
+    async def predict_behavior_batch(self, customers, narrate_top_n=0, max_concurrency=4):
+        result, top = self.ai._score_churn_batch(customers, narrate_top_n)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        actions = {}
+
+        async def narrate(i):
+            prompt = self.ai._churn_narrative_prompt(customers[i], result["churn_probability"][i],
+                                                     result["top_driver"][i])
+            async with semaphore:
+                response = await self._call_json(prompt, "prediction", priority="batch")
+            action = self.ai._churn_action(response)
+            if action:
+                actions[i] = action
+
+        await asyncio.gather(*[narrate(i) for i in top])
+        return result, actions
+
+    # ===================== MODULE 6: ADVANCED PERSONALIZATION ENGINE =====================
+    @metrics.track_method()
+    async def recommend_products(self, user_profile):
+        segment, cached = self.ai._segment_lookup(user_profile)
+        if cached is not None:
+            return cached
+        profile = segment_profile(segment) if segment else user_profile
+        index, candidates = self.ai._catalog_candidates(profile)
+        response = None
+        if index is None:
+            response = await self._call_json(self.ai._recommendation_prompt(profile), "recommendations")
+        elif candidates:
+            response = await self._call_json(self.ai._catalog_prompt(profile, candidates), "catalog_recommendations")
+        return self.ai._finish_recommendation(segment, index, candidates, response)[0]
+
+    def rebuild_product_index(self, records, dim=DEFAULT_DIM):
+        # CPU/disk-bound catalog build - nothing to await
+        return self.ai.rebuild_product_index(records, dim)
+
+    # ===================== LEGACY FUNCTIONS =====================
+    @metrics.track_method()
+    async def generate_campaign(self, product, audience, platform):
+        return await self._call_groq(self.ai._legacy_campaign_prompt(product, audience, platform))
+
+    @metrics.track_method()
+    async def generate_pitch(self, product, customer):
+        return await self._call_groq(self.ai._legacy_pitch_prompt(product, customer))
+
+    @metrics.track_method()
+    async def score_lead(self, name, budget, need, urgency):
+        return await self._call_groq(self.ai._legacy_lead_prompt(name, budget, need, urgency))
+
+    # ===================== GENERATOR HUB =====================
+    @metrics.track_method()
+    async def generate_marketing_campaign_strategy(self, product_details, linkedin_demographics):
+        response = await self._call_json(
+            self.ai._marketing_strategy_prompt(product_details, linkedin_demographics), "campaign", timeout="generator")
+        return self.ai._parse_structured(response, "campaign")
+
+    def generate_marketing_campaign_strategy_stream(self, product_details, linkedin_demographics):
+        # Flask streams from sync generators, so streams run on the sync pooled session
+        return self.ai.generate_marketing_campaign_strategy_stream(product_details, linkedin_demographics)
+
+    @metrics.track_method()
+    async def generate_sales_pitch(self, prospect_title, company_tier, product_info=""):
+        response = await self._call_json(
+            self.ai._sales_pitch_prompt(prospect_title, company_tier, product_info), "pitch", timeout="generator")
+        return self.ai._parse_structured(response, "pitch")
+
+    def generate_sales_pitch_stream(self, prospect_title, company_tier, product_info=""):
+        return self.ai.generate_sales_pitch_stream(prospect_title, company_tier, product_info)
+
+    @metrics.track_method()
+    async def intelligent_lead_score(self, budget, timeline, urgency, additional_context=""):
+        calculated_score, conversion_prob = self.ai._deterministic_lead_score(budget, timeline, urgency)
+        reasoning_prompt = self.ai._lead_reasoning_prompt(budget, timeline, urgency, additional_context,
+                                                          calculated_score, conversion_prob)
+        response = await self._call_json(reasoning_prompt, "lead_score")
+        return self.ai._parse_lead_score(response, calculated_score, conversion_prob)
+
+    def intelligent_lead_score_stream(self, budget, timeline, urgency, additional_context=""):
+        return self.ai.intelligent_lead_score_stream(budget, timeline, urgency, additional_context)
+
+    @metrics.track_method()
+    async def intelligent_lead_score_batch(self, leads, reasoning_top_n=0, max_concurrency=4):
+        results, top = self.ai._score_lead_batch(leads, reasoning_top_n)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def explain(i):
+            lead, result = leads[i], results[i]
+            prompt = self.ai._lead_reasoning_prompt(lead.get("budget", ""), lead.get("timeline", ""),
+                                                    lead.get("urgency", ""), lead.get("additional_context", ""),
+                                                    result["lead_score"], result["conversion_probability"])
+            async with semaphore:
+                response = await self._call_json(prompt, "lead_score", priority="batch")
+            result["reasoning"] = self.ai._parse_lead_score(response, result["lead_score"],
+                                                            result["conversion_probability"])
+
+        await asyncio.gather(*[explain(i) for i in top])
+        return results
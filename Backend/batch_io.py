@@ -0,0 +1,53 @@
+"""
+Batch Request I/O
+Reads record batches from JSON arrays or CSV uploads for the bulk endpoints
+"""
+import io
+import csv
+
+
+def read_csv_records(text):
+    """Parses CSV text (with a header row) into a list of dicts."""
+    reader = csv.DictReader(io.StringIO(text))
+    return [{k.strip(): (v or '').strip() for k, v in row.items() if k} for row in reader]
+
+
+def records_from_request(req, key):
+    """
+    Extracts (records, options) from a Flask request.
+
+    Accepted inputs:
+        - JSON array of objects
+        - JSON object {key: [objects], ...options}
+        - multipart upload with a CSV "file" field (options from form/query)
+        - raw text/csv body (options from the query string)
+
+    Raises:
+        ValueError: when no records can be read
+    """
+    options = dict(req.args)
+    upload = req.files.get('file')
+    if upload is not None:
+        options.update(req.form)
+        return read_csv_records(upload.read().decode('utf-8-sig')), options
+
+    if req.mimetype in ('text/csv', 'application/csv'):
+        return read_csv_records(req.get_data(as_text=True)), options
+
+    data = req.get_json(silent=True)
+    if isinstance(data, list):
+        return data, options
+    if isinstance(data, dict) and isinstance(data.get(key), list):
+        options.update({k: v for k, v in data.items() if k != key})
+        return data[key], options
+    raise ValueError(f"Expected a JSON array, a JSON object with '{key}', or a CSV upload")
+
+
+def int_option(options, name, default, minimum=0, maximum=None):
+    """Reads an integer option, clamped to [minimum, maximum]."""
+    try:
+        value = int(options.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer")
+    value = max(minimum, value)
+    return min(value, maximum) if maximum is not None else value
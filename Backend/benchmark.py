@@ -0,0 +1,331 @@
+"""
+Load-Test Benchmark
+Drives every API endpoint at fixed concurrency against the mock Groq server and
+reports latency percentiles, throughput and memory - offline and reproducible
+
+Usage:
+    python benchmark.py                                   # in-process app + mock upstream
+    python benchmark.py --concurrency 32 --requests 400 --output results.json
+    python benchmark.py --baseline results.json           # exit 1 on a p95 regression
+    python benchmark.py --target http://localhost:5000    # an already running server
+"""
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from mock_groq_server import MockConfig, start_mock_server
+
+LEADS = [{"budget": b, "timeline": t, "urgency": u}
+         for b in ("$5k", "$25k", "$120k") for t in ("now", "this quarter", "next year") for u in ("high", "low")]
+
+
+def _lead_batch(i):
+    return {"leads": [dict(lead, additional_context=f"batch {i}") for lead in LEADS * 25],
+            "reasoning_top_n": 3, "max_concurrency": 3}
+
+
+def _sentiment_batch(i):
+    reviews = ["Great product, love it", "Not worth the price, support was slow",
+               "Arrived on a Tuesday", "Good features but the app crashes a lot"]
+    return {"reviews": [{"id": k, "feedback": f"{reviews[k % 4]} (#{i}-{k})"} for k in range(2000)],
+            "escalate_limit": 3, "max_concurrency": 3}
+
+
+def _compliance_batch(i):
+    copies = ["Guaranteed results in 30 days", "Join our forecasting webinar", "Enter your email for early access"]
+    return {"assets": [{"id": k, "text": f"{copies[k % 3]} (#{i}-{k})"} for k in range(1000)]}
+
+
+def _churn_batch(i):
+    return {"customers": [{"customer_id": f"c{i}-{k}", "days_since_last_login": k % 90, "logins_30d": k % 31,
+                           "support_tickets_90d": k % 5, "plan_change": -1 if k % 7 == 0 else 0}
+                          for k in range(2000)],
+            "narrate_top_n": 3, "max_concurrency": 3}
+
+
+def _catalog(i):
+    areas = ["Pipeline forecasting", "Email automation", "Social listening", "Lead scoring", "Churn analytics"]
+    return {"products": [{"id": f"sku-{k}", "name": f"{areas[k % 5]} {k // 5}", "category": "SaaS",
+                          "description": f"{areas[k % 5]} for sales and marketing teams of {k % 900 + 10}"}
+                         for k in range(500)]}
+
+
+def _pricing_batch(i):
+    n = 2000
+    return {"cost": [10 + (k % 90) for k in range(n)],
+            "demand_index": [0.6 + (k % 9) * 0.1 for k in range(n)],
+            "competitor_price": [25 + (k % 70) + i % 3 for k in range(n)]}
+
+
+# name, method, path, body(i) -> payload; request i varies the text so the
+# response cache and single-flight do not turn the run into a cache benchmark
+SCENARIOS = [
+    ("health", "GET", "/api/health", None),
+    ("home", "GET", "/", None),
+    ("dashboard", "GET", "/dashboard", None),
+    ("generator_hub_test", "GET", "/generator-hub-test", None),
+    ("sentiment", "POST", "/api/market/sentiment",
+     lambda i: {"feedback": f"Great product, support resolved my ticket in {i % 97} minutes (#{i})"}),
+    ("sentiment_llm", "POST", "/api/market/sentiment",
+     lambda i: {"feedback": f"Support resolved my ticket in {i % 97} minutes (#{i})", "fast_path": False}),
+    ("sentiment_batch", "POST", "/api/market/sentiment/batch", _sentiment_batch),
+    ("benchmark", "POST", "/api/market/benchmark", lambda i: {"brand": f"Brand {i}"}),
+    ("benchmark_many", "POST", "/api/market/benchmark",
+     lambda i: {"brands": [f"Brand {i}-{k}" for k in range(20)], "max_concurrency": 8}),
+    ("pricing", "POST", "/api/pricing/optimize",
+     lambda i: {"cost": 50 + i % 10, "demand_index": 1.1, "competitor_price": 95}),
+    ("pricing_batch", "POST", "/api/pricing/optimize/batch", _pricing_batch),
+    ("compliance", "POST", "/api/compliance/check",
+     lambda i: {"marketing_text": f"Guaranteed results in {i % 30 + 1} days or your money back (#{i})"}),
+    ("compliance_batch", "POST", "/api/compliance/check/batch", _compliance_batch),
+    ("compliance_rules_only", "POST", "/api/compliance/check",
+     lambda i: {"marketing_text": f"Join our {i % 30 + 1}-minute webinar on pipeline forecasting (#{i})"}),
+    ("chat", "POST", "/api/chat", lambda i: {"message": f"What plans do you offer for a team of {i % 50 + 2}?"}),
+    ("chat_stream", "POST", "/api/chat",
+     lambda i: {"message": f"Summarize your pricing tiers (#{i})", "stream": True}),
+    ("chat_session", "POST", "/api/chat", lambda i: {"message": f"Do you support SSO? (#{i})", "session_id": f"bench-{i}"}),
+    ("chat_session_delete", "DELETE", "/api/chat/session/bench-{i}", None),
+    ("predict", "POST", "/api/predict/customer",
+     lambda i: {"history_data": f"Last login {i % 60} days ago, 3 support tickets, plan downgraded"}),
+    ("predict_batch", "POST", "/api/predict/customer/batch", _churn_batch),
+    ("personalize", "POST", "/api/personalize",
+     lambda i: {"user_profile": f"VP Sales at a {i % 900 + 100}-person SaaS company evaluating forecasting tools"}),
+    ("personalize_segment", "POST", "/api/personalize",
+     lambda i: {"user_profile": {"role": "VP Sales", "industry": "SaaS", "company_size": i % 900 + 100}}),
+    ("personalize_segments_refresh", "POST", "/api/personalize/segments/refresh",
+     lambda i: {"segments": ["sales/saas/mid"], "force": True, "max_concurrency": 1}),
+    ("personalize_catalog", "POST", "/api/personalize/catalog", _catalog),
+    ("legacy_campaign", "POST", "/api/campaign",
+     lambda i: {"product": f"CRM add-on {i}", "audience": "SMB owners", "platform": "LinkedIn"}),
+    ("legacy_pitch", "POST", "/api/pitch", lambda i: {"product": f"Analytics {i}", "customer": "Retail chain"}),
+    ("legacy_score", "POST", "/api/score",
+     lambda i: {"name": f"Lead {i}", "budget": "$40k", "need": "Forecasting", "urgency": "high"}),
+    ("marketing_campaign", "POST", "/api/generator/marketing-campaign",
+     lambda i: {"product_details": f"AI email platform v{i}", "linkedin_demographics": "B2B marketing directors"}),
+    ("marketing_campaign_stream", "POST", "/api/generator/marketing-campaign",
+     lambda i: {"product_details": f"AI email platform v{i}", "linkedin_demographics": "B2B marketing directors",
+                "stream": True}),
+    ("marketing_campaign_job", "POST", "/api/generator/marketing-campaign",
+     lambda i: {"product_details": f"AI email platform v{i}", "linkedin_demographics": "B2B marketing directors",
+                "async": True}),
+    ("sales_pitch", "POST", "/api/generator/sales-pitch",
+     lambda i: {"prospect_title": "CFO", "company_tier": "Enterprise", "product_info": f"Forecasting {i}"}),
+    ("lead_score", "POST", "/api/generator/lead-score",
+     lambda i: {"budget": "$80k", "timeline": "this quarter", "urgency": "high", "additional_context": f"#{i}"}),
+    ("lead_score_batch", "POST", "/api/generator/lead-score/batch", _lead_batch),
+    ("generate_campaign", "POST", "/api/generate-campaign",
+     lambda i: {"productDetails": f"Sales enablement tool {i}", "audience": "Sales managers"}),
+    ("generate_pitch", "POST", "/api/generate-pitch",
+     lambda i: {"title": "Head of Operations", "companyTier": "Mid-Market", "productInfo": f"Automation {i}"}),
+    ("score_lead", "POST", "/api/score-lead",
+     lambda i: {"budget": "$15k", "timeline": "next month", "urgency": "medium", "context": f"#{i}"}),
+]
+
+
+# The legacy routes read request.form rather than JSON
+FORM_SCENARIOS = {"legacy_campaign", "legacy_pitch", "legacy_score"}
+
+# Route prefixes that only make sense with an id returned by another scenario
+FOLLOW_UP_PREFIXES = ("/api/jobs/",)
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (Linux), else peak RSS."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+def uncovered_routes(flask_app):
+    """Routes registered in the app that no scenario exercises."""
+    covered = [(method, path.split("{")[0]) for _, method, path, _ in SCENARIOS]
+    missing = []
+    for rule in flask_app.url_map.iter_rules():
+        if rule.endpoint == "static":
+            continue
+        prefix = rule.rule.split("<")[0]
+        if prefix in FOLLOW_UP_PREFIXES:
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            # A scenario path like /api/chat/session/bench-{i} covers /api/chat/session/<session_id>
+            exact = "<" not in rule.rule
+            if not any(m == method and (p == prefix if exact else p.startswith(prefix)) for m, p in covered):
+                missing.append(f"{method} {rule.rule}")
+    return sorted(set(missing))
+
+
+class _Client(threading.local):
+    def __init__(self):
+        self.session = requests.Session()
+
+
+def _one_request(client, base_url, method, path, body, as_form=False):
+    started = time.perf_counter()
+    first_byte = None
+    payload = {"data": body} if as_form else {"json": body}
+    with client.session.request(method, base_url + path, stream=True, timeout=120, **payload) as resp:
+        for chunk in resp.iter_content(chunk_size=None):
+            if first_byte is None and chunk:
+                first_byte = time.perf_counter() - started
+        ok = 200 <= resp.status_code < 300
+    total = time.perf_counter() - started
+    return total, (first_byte if first_byte is not None else total), ok
+
+
+def run_scenario(base_url, scenario, total_requests, concurrency, warmup):
+    name, method, path, body_fn = scenario
+    client = _Client()
+
+    def call(i):
+        body = body_fn(i) if body_fn else None
+        try:
+            return _one_request(client, base_url, method, path.format(i=i), body, name in FORM_SCENARIOS)
+        except requests.RequestException:
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(-warmup, 0)))
+        rss_before = rss_mb()
+        started = time.perf_counter()
+        results = list(pool.map(call, range(total_requests)))
+        elapsed = time.perf_counter() - started
+    rss_after = rss_mb()
+
+    done = [r for r in results if r is not None]
+    latencies = np.array([r[0] for r in done]) * 1000
+    ttfb = np.array([r[1] for r in done]) * 1000
+    errors = total_requests - sum(1 for r in done if r[2])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+    return {
+        "scenario": name,
+        "method": method,
+        "path": path,
+        "requests": total_requests,
+        "errors": errors,
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(float(latencies.mean()), 2) if len(latencies) else None,
+        "ttfb_p50_ms": round(float(np.percentile(ttfb, 50)), 2) if len(ttfb) else None,
+        "rss_mb": None if rss_after is None else round(rss_after, 1),
+        "rss_delta_mb": None if rss_after is None or rss_before is None else round(rss_after - rss_before, 1)
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Returns scenarios whose p95 grew by more than max_regression (fraction) over the baseline."""
+    previous = {row["scenario"]: row for row in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        old = previous.get(row["scenario"])
+        if not old or not old.get("p95_ms"):
+            continue
+        change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"]
+        row["p95_change"] = round(change, 3)
+        if change > max_regression:
+            regressions.append(row["scenario"])
+    return regressions
+
+
+def print_table(results):
+    header = f"{'scenario':<28}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ttfb p50':>10}{'errors':>8}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        change = f"  ({row['p95_change']:+.0%} p95)" if "p95_change" in row else ""
+        print(f"{row['scenario']:<28}{row['throughput_rps']:>9}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['ttfb_p50_ms'] or '-':>10}{row['errors']:>8}{row['rss_mb'] or '-':>9}{change}")
+
+
+def start_local_app():
+    """Creates the app (after GROQ_API_URL is set) and serves it on a background thread."""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no per-request access log
+    flask_app = create_app()
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    server.socket.listen(1024)
+    threading.Thread(target=server.serve_forever, name="benchmark-app", daemon=True).start()
+    return flask_app, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every endpoint against a mock Groq upstream")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=16, help="unmeasured requests per scenario")
+    parser.add_argument("--only", default="", help="comma-separated scenario names")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="mock upstream mean latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--target", help="benchmark a running server instead of an in-process app")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="previous --output file to compare p95 against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed p95 growth (fraction)")
+    args = parser.parse_args()
+
+    flask_app = None
+    base_url = args.target
+    if base_url is None:
+        _, mock_url = start_mock_server(config=MockConfig(args.latency_ms, args.jitter_ms, args.error_rate,
+                                                          seed=args.seed))
+        os.environ["GROQ_API_URL"] = mock_url
+        os.environ.setdefault("GROQ_API_KEY", "mock-key")
+        flask_app, base_url = start_local_app()
+        missing = uncovered_routes(flask_app)
+        if missing:
+            print(f"WARNING: no benchmark scenario for: {', '.join(missing)}")
+
+    selected = [s for s in SCENARIOS if not args.only or s[0] in args.only.split(",")]
+    print(f"Benchmarking {len(selected)} scenarios at concurrency {args.concurrency} "
+          f"({args.requests} requests each) against {base_url}")
+    results = []
+    for scenario in selected:
+        results.append(run_scenario(base_url, scenario, args.requests, args.concurrency, args.warmup))
+        print(f"  {scenario[0]}: p95 {results[-1]['p95_ms']} ms, {results[-1]['errors']} errors")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+    print()
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if regressions:
+        print(f"\nREGRESSION: p95 grew more than {args.max_regression:.0%} for {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
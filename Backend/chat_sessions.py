@@ -0,0 +1,151 @@
+"""
+Chat Session Store
+Server-side conversation history with a token-bounded window and rolling summary
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from tokens import estimate_message_tokens
+
+
+class ChatSessionStore:
+    """
+    Keeps each session as {"summary": str, "messages": [...]}.
+
+    Sessions live in an in-memory LRU (max_sessions); with db_path set they are
+    also written through to SQLite, so evicted or pre-restart sessions reload
+    on demand. When a session's recent messages exceed token_budget the oldest
+    turns are folded into the summary (see pending_compaction/apply_compaction),
+    which keeps the prompt sent per turn roughly constant in size.
+    """
+
+    def __init__(self, max_sessions=1000, token_budget=1500, keep_recent=4, db_path=None):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                " session_id TEXT PRIMARY KEY, summary TEXT NOT NULL,"
+                " messages TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def new_session_id():
+        return uuid.uuid4().hex
+
+    # ===================== STORAGE =====================
+    def _load(self, session_id):
+        """Returns the session dict (creating an empty one), refreshing its LRU position."""
+        session = self._sessions.get(session_id)
+        if session is None and self._conn is not None:
+            row = self._conn.execute(
+                "SELECT summary, messages FROM chat_sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None:
+                session = {"summary": row[0], "messages": json.loads(row[1])}
+        if session is None:
+            session = {"summary": "", "messages": []}
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def _save(self, session_id, session):
+        if self._conn is not None:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, summary, messages, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, session["summary"], json.dumps(session["messages"]), time.time()))
+            self._conn.commit()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+
+    # ===================== HISTORY WINDOW =====================
+    def history(self, session_id):
+        """History to send upstream: the rolling summary (if any) plus the recent messages."""
+        with self._lock:
+            session = self._load(session_id)
+            history = []
+            if session["summary"]:
+                history.append({"role": "system",
+                                 "content": f"Summary of the earlier conversation: {session['summary']}"})
+            history.extend(session["messages"])
+            return history
+
+    def record_turn(self, session_id, user_message, assistant_message):
+        with self._lock:
+            session = self._load(session_id)
+            session["messages"].append({"role": "user", "content": user_message})
+            session["messages"].append({"role": "assistant", "content": assistant_message})
+            self._save(session_id, session)
+
+    def pending_compaction(self, session_id):
+        """
+        Returns (previous_summary, turns_to_fold) when the recent window is over the
+        token budget, else None. The oldest messages are folded first; the last
+        keep_recent messages always stay verbatim.
+        """
+        with self._lock:
+            session = self._load(session_id)
+            messages = session["messages"]
+            fold = 0
+            while (len(messages) - fold > self.keep_recent and
+                   estimate_message_tokens(messages[fold:]) > self.token_budget):
+                # whole user/assistant turns, but never into the last keep_recent messages
+                fold = min(fold + 2, len(messages) - self.keep_recent)
+            if fold == 0:
+                return None
+            return session["summary"], messages[:fold]
+
+    def apply_compaction(self, session_id, new_summary, folded_turns):
+        """
+        Replaces folded_turns (as returned by pending_compaction) with new_summary.
+        Skipped if a concurrent compaction already folded those messages.
+        """
+        with self._lock:
+            session = self._load(session_id)
+            if session["messages"][:len(folded_turns)] != folded_turns:
+                return
+            session["summary"] = new_summary
+            session["messages"] = session["messages"][len(folded_turns):]
+            self._save(session_id, session)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions_in_memory": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "token_budget": self.token_budget,
+                "persistent": self._conn is not None
+            }
+
+
+def build_chat_session_store():
+    """
+    Builds the session store configured in the environment:
+        CHAT_SESSION_MAX = sessions kept in memory (default 1000)
+        CHAT_HISTORY_TOKEN_BUDGET = recent-history budget per turn (default 1500)
+        CHAT_KEEP_RECENT = messages never folded into the summary (default 4)
+        CHAT_SESSION_DB = SQLite file for persistence (unset = memory only)
+    """
+    return ChatSessionStore(
+        max_sessions=int(os.getenv("CHAT_SESSION_MAX", 1000)),
+        token_budget=int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 1500)),
+        keep_recent=int(os.getenv("CHAT_KEEP_RECENT", 4)),
+        db_path=os.getenv("CHAT_SESSION_DB") or None
+    )
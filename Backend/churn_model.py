@@ -0,0 +1,285 @@
+"""
+Churn Model
+Vectorized logistic churn scorer over structured customer history records, a rule
+playbook for next-best-actions, and a chunked file pipeline for whole customer bases
+
+Usage:
+    python churn_model.py customers.csv --output churn.csv
+    python churn_model.py customers.csv --output churn.jsonl --narrate-top-n 500   # LLM actions for the riskiest
+"""
+import io
+import os
+import csv
+import sys
+import json
+import heapq
+import time
+import argparse
+import itertools
+import numpy as np
+from pricing_engine import to_float_array
+
+# feature -> (value for a typical customer, log-scaled, coefficient). Contributions are
+# measured against the typical customer, who churns at BASE_RATE; missing values count
+# as typical. Hand-set weights (no training data ships with the app) - the ordering of
+# customers matters more than the calibration.
+FEATURES = {
+    "days_since_last_login": (7.0, True, 0.9),
+    "logins_30d": (12.0, True, -0.6),
+    "support_tickets_90d": (1.0, True, 0.5),
+    "tenure_months": (18.0, True, -0.45),
+    "payment_failures_90d": (0.0, False, 0.7),
+    "plan_change": (0.0, False, -0.9),          # -1 downgrade, 0 none, +1 upgrade
+    "nps": (7.0, False, -0.25),                 # 0-10
+    "spend_change_pct": (0.0, False, -0.012),   # % change in monthly spend
+}
+BASE_RATE = 0.15
+
+# Upper bounds applied before scoring so one extreme value cannot dominate
+CLIPS = {"payment_failures_90d": 5, "days_since_last_login": 365, "support_tickets_90d": 50}
+
+PLAN_CHANGES = {"downgrade": -1, "downgraded": -1, "upgrade": 1, "upgraded": 1, "none": 0, "same": 0, "": 0}
+
+HIGH_RISK = 60
+MEDIUM_RISK = 30
+
+# Deterministic next-best-action per main risk driver: (action, channel)
+PLAYBOOK = {
+    "days_since_last_login": ("Re-engagement email with the features released since their last login", "Email"),
+    "logins_30d": ("Offer a guided onboarding session to rebuild weekly usage", "In-app message"),
+    "support_tickets_90d": ("Customer success call to close out open support issues", "Phone"),
+    "tenure_months": ("New-customer check-in with a quick-win tutorial", "Email"),
+    "payment_failures_90d": ("Billing reminder with a one-click payment update link", "Email"),
+    "plan_change": ("Account review to understand the downgrade and present a retention offer", "Phone"),
+    "nps": ("Account manager follow-up on their low NPS feedback", "Phone"),
+    "spend_change_pct": ("Usage review with an ROI summary and a tailored bundle offer", "Email"),
+    "none": ("Keep in the regular nurture program and invite to the referral program", "Email"),
+}
+CAMPAIGN_TIMING = {"high": "Within 48 hours", "medium": "Within 7 days", "low": "Next regular campaign"}
+
+ID_COLUMNS = ("customer_id", "id")
+OUTPUT_FIELDS = ("id", "churn_probability", "churn_risk", "top_driver", "next_best_action",
+                 "recommended_channel", "campaign_timing", "action_source")
+
+
+def _feature_array(values, name):
+    if name == "plan_change":
+        values = [PLAN_CHANGES.get(v.strip().lower(), v) if isinstance(v, str) else v for v in values]
+    return to_float_array(values)
+
+
+def score_customers(columns, count=None):
+    """
+    Scores whole columns in one NumPy pass.
+
+    Args:
+        columns (dict): feature name -> list/array (missing features count as typical)
+
+    Returns:
+        dict: "churn_probability" (int64 0-100), "churn_risk" and "top_driver" (arrays of str;
+              top_driver is the feature adding the most risk, "none" when nothing does)
+    """
+    if count is None:
+        count = max((len(values) for values in columns.values()), default=0)
+    logit = np.full(count, np.log(BASE_RATE / (1 - BASE_RATE)))
+    contributions = np.zeros((len(FEATURES), count))
+    for row, (name, (typical, log_scaled, coefficient)) in enumerate(FEATURES.items()):
+        if name not in columns:
+            continue
+        values = _feature_array(columns[name], name)
+        if len(values) != count:
+            raise ValueError(f"'{name}' has {len(values)} values, expected {count}")
+        values = np.where(np.isfinite(values), values, typical)
+        if name in CLIPS:
+            values = np.clip(values, None, CLIPS[name])
+        if log_scaled:
+            contributions[row] = coefficient * (np.log1p(np.maximum(values, 0)) - np.log1p(typical))
+        else:
+            contributions[row] = coefficient * (values - typical)
+    logit += contributions.sum(axis=0)
+
+    probability = np.rint(100 / (1 + np.exp(-logit))).astype(np.int64)
+    names = np.array(list(FEATURES) + ["none"])
+    strongest = contributions.argmax(axis=0) if count else np.zeros(0, dtype=np.int64)
+    driver = np.where(contributions.max(axis=0, initial=0) > 0.05, strongest, len(FEATURES)) if count else strongest
+    return {
+        "churn_probability": probability,
+        "churn_risk": np.select([probability >= HIGH_RISK, probability >= MEDIUM_RISK], ["high", "medium"],
+                                default="low"),
+        "top_driver": names[driver]
+    }
+
+
+def columns_from_records(records):
+    return {name: [record.get(name) for record in records] for name in FEATURES
+            if any(name in record for record in records)}
+
+
+def record_ids(records, offset=0):
+    column = next((name for name in ID_COLUMNS if records and name in records[0]), None)
+    return [record.get(column, offset + i) if column else offset + i for i, record in enumerate(records)]
+
+
+def predict_one(history):
+    """
+    Model prediction for one customer in the predict_behavior response shape. history may
+    be a dict of FEATURES fields; anything else (free text) scores as a typical customer.
+    """
+    record = history if isinstance(history, dict) else {}
+    result = score_customers(columns_from_records([record]), count=1)
+    risk = str(result["churn_risk"][0])
+    action, channel = PLAYBOOK[str(result["top_driver"][0])]
+    return {
+        "churn_risk": risk,
+        "churn_probability": int(result["churn_probability"][0]),
+        "next_best_action": action,
+        "campaign_timing": CAMPAIGN_TIMING[risk],
+        "recommended_channel": channel
+    }
+
+
+def high_risk_indices(result, limit):
+    """Indices (ascending) of the `limit` most likely churners among the high-risk rows."""
+    high = np.flatnonzero(result["churn_risk"] == "high")
+    if limit <= 0 or not len(high):
+        return high[:0]
+    chosen = high[np.argsort(-result["churn_probability"][high], kind="stable")[:limit]]
+    return np.sort(chosen)
+
+
+def churn_rows(ids, result, narratives=None):
+    """Yields one output dict per customer; narratives {row index: LLM action} override the playbook."""
+    narratives = narratives or {}
+    rows = zip(ids, result["churn_probability"].tolist(), result["churn_risk"].tolist(),
+               result["top_driver"].tolist())
+    for i, (row_id, probability, risk, driver) in enumerate(rows):
+        action, channel = PLAYBOOK[driver]
+        row = {"id": row_id, "churn_probability": probability, "churn_risk": risk, "top_driver": driver,
+               "next_best_action": action, "recommended_channel": channel,
+               "campaign_timing": CAMPAIGN_TIMING[risk], "action_source": "playbook"}
+        if i in narratives:
+            row.update(narratives[i], action_source="llm")
+        yield row
+
+
+def _write_rows(rows, output_format, header=False):
+    buffer = io.StringIO()
+    if output_format == "csv":
+        writer = csv.DictWriter(buffer, OUTPUT_FIELDS, lineterminator="\n")
+        if header:
+            writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            buffer.write(json.dumps(row))
+            buffer.write("\n")
+    return buffer.getvalue()
+
+
+def stream_churn_rows(ids, result, output_format="ndjson", chunk_size=5000, narratives=None):
+    """Yields batch results as NDJSON lines or CSV, chunk_size rows at a time."""
+    rows = churn_rows(ids, result, narratives)
+    header = True
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield _write_rows(chunk, output_format, header)
+        header = False
+
+
+def _read_records(path, chunk_size):
+    """CSV (header row) or NDJSON records, chunk_size at a time, without loading the whole file."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".ndjson", ".jsonl")):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def score_file(input_path, output_path, chunk_size=50000, narrate=None, narrate_top_n=0, progress=None):
+    """
+    Scores a customer file chunk by chunk, appending each scored chunk to output_path
+    (CSV, or NDJSON for .jsonl/.ndjson names) so memory stays flat for any file size.
+
+    The narrate_top_n most likely high-risk churners are tracked across the whole file; when
+    narrate is given, they are passed to it after the scan as a list of (record, probability,
+    top driver) and its LLM actions are written to <output_path>.actions.jsonl.
+
+    Returns:
+        dict: summary (customers, by_risk, narrated, seconds)
+    """
+    started = time.perf_counter()
+    output_format = "ndjson" if output_path.lower().endswith((".ndjson", ".jsonl")) else "csv"
+    by_risk = {"high": 0, "medium": 0, "low": 0}
+    riskiest = []  # min-heap of (probability, -row, id, record, driver)
+    total = 0
+    with open(output_path, "w", encoding="utf-8", newline="") as out:
+        for records in _read_records(input_path, chunk_size):
+            result = score_customers(columns_from_records(records), count=len(records))
+            ids = record_ids(records, total)
+            out.write(_write_rows(churn_rows(ids, result), output_format, header=total == 0))
+            for risk, count in zip(*np.unique(result["churn_risk"], return_counts=True)):
+                by_risk[str(risk)] += int(count)
+            for i in high_risk_indices(result, narrate_top_n).tolist():
+                entry = (int(result["churn_probability"][i]), -(total + i), ids[i], records[i],
+                         str(result["top_driver"][i]))
+                if len(riskiest) < narrate_top_n:
+                    heapq.heappush(riskiest, entry)
+                elif entry[:2] > riskiest[0][:2]:
+                    heapq.heapreplace(riskiest, entry)
+            total += len(records)
+            if progress:
+                progress(total)
+
+    narrated = 0
+    if narrate is not None and riskiest:
+        riskiest.sort(reverse=True)
+        actions = narrate([(record, probability, driver) for probability, _, _, record, driver in riskiest])
+        with open(f"{output_path}.actions.jsonl", "w", encoding="utf-8") as out:
+            for (probability, _, row_id, _, driver), action in zip(riskiest, actions):
+                if action:
+                    narrated += 1
+                    out.write(json.dumps(dict({"id": row_id, "churn_probability": probability,
+                                               "top_driver": driver}, **action)) + "\n")
+    return {
+        "output": output_path,
+        "customers": total,
+        "by_risk": by_risk,
+        "narrated": narrated,
+        "seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a customer base for churn risk")
+    parser.add_argument("input", help="CSV (header row) or NDJSON file of customer history records")
+    parser.add_argument("--output", help="CSV or .jsonl results file (default <input>.churn.csv)")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--narrate-top-n", type=int, default=0,
+                        help="write LLM next-best-actions for this many of the riskiest customers")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="parallel LLM calls for --narrate-top-n")
+    args = parser.parse_args()
+
+    narrate = None
+    if args.narrate_top_n > 0:
+        from dotenv import load_dotenv
+        from ai_service import AIService
+        load_dotenv()
+        ai = AIService()
+        narrate = lambda customers: ai.narrate_churn(customers, args.max_concurrency)
+
+    summary = score_file(args.input, args.output or f"{os.path.splitext(args.input)[0]}.churn.csv",
+                         args.chunk_size, narrate, args.narrate_top_n,
+                         progress=lambda n: print(f"\r  {n} customers scored", end="", file=sys.stderr, flush=True))
+    print(file=sys.stderr)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
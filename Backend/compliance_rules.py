@@ -0,0 +1,232 @@
+"""
+Compliance Rules
+Deterministic pre-screen for compliance_check: a phrase/regex dictionary (claims, GDPR,
+financial promises, pressure tactics) compiled into one Aho-Corasick automaton plus one
+combined regex, returning flagged spans with character offsets
+"""
+import os
+import re
+import json
+import hashlib
+from collections import deque
+
+SEVERITY_RANK = {"low": 1, "medium": 2, "high": 3}
+
+# Each rule flags any of its phrases (case-insensitive, whole words) and/or its regex.
+# COMPLIANCE_RULES_PATH can add rules, replace one by reusing its id, or disable it
+# with "enabled": false.
+DEFAULT_RULES = [
+    {"id": "absolute_guarantee", "category": "claims", "severity": "high",
+     "phrases": ["guaranteed", "guarantee", "guaranteed results", "100% guaranteed", "results guaranteed"],
+     "suggestion": "Remove absolute guarantees or state the exact terms and conditions"},
+    {"id": "risk_free", "category": "claims", "severity": "high",
+     "phrases": ["risk-free", "risk free", "no risk", "zero risk", "100% safe"],
+     "suggestion": "Avoid claiming there is no risk; describe the refund or trial terms instead"},
+    {"id": "health_claim", "category": "claims", "severity": "high",
+     "phrases": ["cure", "cures", "miracle", "clinically proven", "no side effects", "doctor recommended"],
+     "suggestion": "Health claims need substantiation and may be regulated; remove or cite evidence"},
+    {"id": "unsubstantiated_superlative", "category": "claims", "severity": "medium",
+     "phrases": ["#1", "number one", "best in the world", "world's best", "scientifically proven",
+                 "100% effective", "never fails", "instant results", "permanent results"],
+     "suggestion": "Back superlatives and performance claims with a verifiable source"},
+    {"id": "financial_promise", "category": "financial", "severity": "high",
+     "phrases": ["double your money", "guaranteed returns", "guaranteed income", "get rich quick",
+                 "risk-free investment", "financial freedom", "passive income", "no credit check"],
+     "regex": r"\b\d{2,3}\s?% (?:returns?|roi|profit|interest)\b"
+              r"|\bearn \$?\d[\d,]*k? (?:a|per) (?:day|week|month)\b",
+     "suggestion": "Financial promises need risk disclosures; do not promise returns or earnings"},
+    {"id": "personal_data_sharing", "category": "gdpr", "severity": "high",
+     "phrases": ["sell your data", "sell your information", "share your data", "share your information",
+                 "with third parties", "without your consent", "by continuing you agree", "pre-checked"],
+     "suggestion": "Personal data sharing needs an explicit, informed opt-in and a privacy notice link"},
+    {"id": "personal_data_collection", "category": "gdpr", "severity": "medium",
+     "phrases": ["personal data", "tracking cookies", "we track", "collect your data"],
+     "regex": r"\b(?:enter|provide|submit|give us|share) your (?:email|e-mail|phone(?: number)?|home address"
+              r"|date of birth|social security number|location)\b",
+     "suggestion": "State the purpose and legal basis for collecting personal data and link the privacy policy"},
+    {"id": "contact_details_in_copy", "category": "gdpr", "severity": "low",
+     "regex": r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b",
+     "suggestion": "Check that published contact details are not personal data without consent"},
+    {"id": "pressure_tactics", "category": "pressure", "severity": "low",
+     "phrases": ["act now", "limited time only", "last chance", "once in a lifetime", "only today",
+                 "before it's too late"],
+     "suggestion": "Make sure urgency claims are true (real deadline or stock limit)"},
+]
+
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton over lowercased phrases. scan() walks the text once,
+    following failure links on mismatches, so the cost is linear in the text length
+    plus the number of matches regardless of how many phrases are loaded.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] += (index,)
+
+        # Breadth-first: a state's failure link is the longest proper suffix that is also a prefix
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def scan(self, text):
+        """Yields (start, end, phrase index) for every occurrence in (lowercased) text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for index in out[state]:
+                    yield position + 1 - len(self.phrases[index]), position + 1, index
+
+    def __len__(self):
+        return len(self._goto)
+
+
+def _lowercase(text):
+    """Lowercases without changing offsets (a few characters lowercase to two)."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(char.lower()[:1] for char in text)
+
+
+def _whole_word(text, start, end):
+    """Phrase boundaries that are word characters must not continue into a neighbouring word."""
+    if start > 0 and text[start].isalnum() and text[start - 1].isalnum():
+        return False
+    if end < len(text) and text[end - 1].isalnum() and text[end].isalnum():
+        return False
+    return True
+
+
+class RuleSet:
+    """
+    Compiled rule dictionary. Phrases from every rule share one PhraseAutomaton; the
+    regexes are joined into one alternation of named groups (rule regexes must not use
+    named groups themselves). Overlapping hits keep the leftmost, longest span.
+    """
+
+    def __init__(self, rules):
+        self.rules = {}
+        phrases = []
+        self._phrase_rules = []
+        regexes = []
+        for rule in rules:
+            if not rule.get("enabled", True):
+                continue
+            rule_id = rule["id"]
+            if rule.get("severity") not in SEVERITY_RANK:
+                raise ValueError(f"Rule '{rule_id}': severity must be one of {'/'.join(SEVERITY_RANK)}")
+            self.rules[rule_id] = rule
+            for phrase in rule.get("phrases", ()):
+                phrases.append(_lowercase(phrase.strip()))
+                self._phrase_rules.append(rule_id)
+            if rule.get("regex"):
+                try:
+                    re.compile(rule["regex"])
+                except re.error as e:
+                    raise ValueError(f"Rule '{rule_id}': invalid regex ({e})")
+                regexes.append((f"r{len(regexes)}", rule_id, rule["regex"]))
+        self.automaton = PhraseAutomaton(phrases)
+        self._regex_rules = {group: rule_id for group, rule_id, _ in regexes}
+        self._regex = re.compile("|".join(f"(?P<{group}>{pattern})" for group, _, pattern in regexes),
+                                 re.IGNORECASE) if regexes else None
+        self.version = hashlib.sha1(json.dumps(list(self.rules.values()), sort_keys=True).encode()).hexdigest()[:12]
+
+    def scan(self, text):
+        """
+        Returns:
+            list[dict]: {rule, category, severity, phrase (as written in text), start, end}
+                        sorted by start offset, without overlaps
+        """
+        if not text:
+            return []
+        lowered = _lowercase(text)
+        hits = [(start, end, self._phrase_rules[index])
+                for start, end, index in self.automaton.scan(lowered) if _whole_word(lowered, start, end)]
+        if self._regex is not None:
+            hits += [(match.start(), match.end(), self._regex_rules[match.lastgroup])
+                     for match in self._regex.finditer(text) if match.end() > match.start()]
+
+        matches = []
+        covered_to = 0
+        for start, end, rule_id in sorted(hits, key=lambda hit: (hit[0], -hit[1])):
+            if start < covered_to:
+                continue
+            covered_to = end
+            rule = self.rules[rule_id]
+            matches.append({"rule": rule_id, "category": rule["category"], "severity": rule["severity"],
+                            "phrase": text[start:end], "start": start, "end": end})
+        return matches
+
+    def assess(self, text):
+        """
+        scan() summarized in the compliance_check response shape: highest matched severity
+        as risk_level ("low" when nothing matched), one suggestion per fired rule and
+        gdpr_compliant false when a medium/high GDPR rule fired.
+        """
+        matches = self.scan(text)
+        fired = list(dict.fromkeys(match["rule"] for match in matches))
+        severity = max((SEVERITY_RANK[match["severity"]] for match in matches), default=1)
+        return {
+            "risk_level": next(level for level, rank in SEVERITY_RANK.items() if rank == severity),
+            "flagged_phrases": list(dict.fromkeys(match["phrase"] for match in matches)),
+            "suggestions": [self.rules[rule_id]["suggestion"] for rule_id in fired if self.rules[rule_id].get("suggestion")],
+            "gdpr_compliant": not any(match["category"] == "gdpr" and match["severity"] != "low" for match in matches),
+            "matches": matches
+        }
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "rules": len(self.rules),
+            "phrases": len(self._phrase_rules),
+            "regex_rules": len(self._regex_rules),
+            "automaton_states": len(self.automaton)
+        }
+
+
+def merge_rules(base, overrides):
+    """Rules from overrides replace base rules with the same id; new ids are appended."""
+    merged = {rule["id"]: rule for rule in base}
+    for rule in overrides:
+        merged[rule["id"]] = dict(merged.get(rule["id"], {}), **rule)
+    return list(merged.values())
+
+
+def build_rule_set():
+    """
+    Builds the rule set configured in the environment:
+        COMPLIANCE_RULES_PATH = JSON file with a list of rules merged over DEFAULT_RULES (optional)
+    """
+    rules = DEFAULT_RULES
+    path = os.getenv("COMPLIANCE_RULES_PATH")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            rules = merge_rules(DEFAULT_RULES, json.load(f))
+    return RuleSet(rules)
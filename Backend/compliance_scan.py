@@ -0,0 +1,267 @@
+"""
+Bulk Compliance Scanner
+Re-scans whole asset libraries (newline-delimited JSON or a directory of text files)
+with the compliance rules on a process pool, writing JSONL results incrementally and
+resuming from a checkpoint after an interruption
+
+Usage:
+    python compliance_scan.py ads.ndjson --output ads.compliance.jsonl --workers 8
+    python compliance_scan.py ./ad_copies/ --rules rules.json        # re-run the same command to resume
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from compliance_rules import RuleSet, build_rule_set
+
+# Fields checked (in order) for the asset text when no text field is given
+TEXT_FIELDS = ("text", "marketing_text", "copy", "body", "content")
+TEXT_SUFFIXES = (".txt", ".md", ".html", ".htm")
+
+CHUNK_SIZE = 200
+
+
+# ===================== INPUT =====================
+def assets_from_records(records, text_field=None):
+    """Yields (id, text) from strings or dicts ("id" or the row number; text None when missing)."""
+    for number, record in enumerate(records):
+        if isinstance(record, str):
+            yield number, record
+            continue
+        if not isinstance(record, dict):
+            yield number, None
+            continue
+        field = text_field or next((name for name in TEXT_FIELDS if name in record), None)
+        text = record.get(field) if field else None
+        yield record.get("id", number), text if isinstance(text, str) else None
+
+
+def _ndjson_records(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None  # reported as an error row, keeps the numbering stable
+
+
+def iter_ndjson(path, text_field=None):
+    with open(path, encoding="utf-8") as f:
+        yield from assets_from_records(_ndjson_records(f), text_field)
+
+
+def iter_directory(path):
+    """Text files under path (recursively, sorted so resumes see the same order) -> (relative path, text)."""
+    files = sorted(os.path.relpath(os.path.join(root, name), path)
+                   for root, _, names in os.walk(path) for name in names
+                   if name.lower().endswith(TEXT_SUFFIXES))
+    for name in files:
+        with open(os.path.join(path, name), encoding="utf-8", errors="replace") as f:
+            yield name, f.read()
+
+
+def iter_assets(source, text_field=None):
+    return iter_directory(source) if os.path.isdir(source) else iter_ndjson(source, text_field)
+
+
+# ===================== SCANNING =====================
+def scan_result(rule_set, asset_id, text):
+    if text is None:
+        return {"id": asset_id, "error": "No text found", "rules_version": rule_set.version}
+    return dict({"id": asset_id}, **rule_set.assess(text), rules_version=rule_set.version)
+
+
+_worker_rules = None
+
+
+def _init_worker(rules):
+    global _worker_rules
+    _worker_rules = RuleSet(rules)
+
+
+def _scan_chunk(chunk):
+    return [scan_result(_worker_rules, asset_id, text) for asset_id, text in chunk]
+
+
+def _chunks(assets, chunk_size):
+    assets = iter(assets)
+    while True:
+        chunk = list(itertools.islice(assets, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def scan_pool(rule_set, workers):
+    """Spawned process pool whose workers compile rule_set once; reusable across scans."""
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(list(rule_set.rules.values()),))
+
+
+def scan_chunks(assets, rule_set, workers=1, chunk_size=CHUNK_SIZE, pool=None):
+    """
+    Yields one list of results per chunk of assets, in input order.
+
+    With workers > 1 chunks are scanned in other processes compiled with the same rules,
+    reading the input lazily. A shared pool (from scan_pool, e.g. the app's) is left
+    running and holds at most workers chunks of this scan at a time; without one a pool
+    of workers processes is spawned for this scan, with workers * 4 chunks in flight.
+    """
+    chunks = _chunks(assets, max(1, chunk_size))
+    if workers <= 1:
+        for chunk in chunks:
+            yield [scan_result(rule_set, asset_id, text) for asset_id, text in chunk]
+        return
+
+    own_pool = pool is None
+    if own_pool:
+        pool = scan_pool(rule_set, workers)
+    in_flight = workers * 4 if own_pool else workers
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(pool.submit(_scan_chunk, chunk))
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_pool:
+            pool.shutdown(cancel_futures=True)
+
+
+def stream_scan(assets, rule_set, workers=1, chunk_size=CHUNK_SIZE, pool=None):
+    """JSONL text, one chunk of result lines at a time (for streaming responses)."""
+    for results in scan_chunks(assets, rule_set, workers, chunk_size, pool):
+        yield "".join(json.dumps(result) + "\n" for result in results)
+
+
+# ===================== CHECKPOINTED FILE OUTPUT =====================
+# Settings a checkpoint is only valid for: resuming with any of them changed would mix
+# results of different inputs or rules in one output file
+CHECKPOINT_KEYS = ("source", "text_field", "rules_version")
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(path, state):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def scan_to_file(source, output_path, rule_set, workers=1, chunk_size=CHUNK_SIZE, text_field=None,
+                 resume=True, progress=None):
+    """
+    Scans every asset in source and appends the results to output_path (JSONL).
+
+    After each chunk is flushed to disk, <output_path>.checkpoint records the source,
+    text field and rules version the scan runs with, how many assets are done and the
+    output size. A later run with the same source, text field and rules version truncates
+    anything written after the last checkpoint and continues from there. A checkpoint
+    written with different settings (or one missing any of them) is not resumed: the scan
+    starts over and the summary lists the differing settings under "checkpoint_mismatch".
+
+    Returns:
+        dict: summary (scanned, resumed_from, flagged, by_risk, errors, checkpoint_mismatch, seconds)
+    """
+    checkpoint_path = f"{output_path}.checkpoint"
+    state = {"source": os.path.abspath(source), "text_field": text_field, "rules_version": rule_set.version,
+             "done": 0, "offset": 0, "flagged": 0, "errors": 0, "by_risk": {"low": 0, "medium": 0, "high": 0},
+             "complete": False}
+    previous = _read_checkpoint(checkpoint_path) if resume else None
+    mismatch = []
+    if previous and os.path.exists(output_path):
+        mismatch = [key for key in CHECKPOINT_KEYS if key not in previous or previous[key] != state[key]]
+        if not mismatch:
+            state = dict(previous, complete=False)
+    resumed_from = state["done"]
+
+    started = time.perf_counter()
+    assets = itertools.islice(iter_assets(source, text_field), resumed_from, None)
+    with open(output_path, "r+b" if resumed_from else "wb") as out:
+        out.truncate(state["offset"])
+        out.seek(state["offset"])
+        for results in scan_chunks(assets, rule_set, workers, chunk_size):
+            out.write("".join(json.dumps(result) + "\n" for result in results).encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            for result in results:
+                if "error" in result:
+                    state["errors"] += 1
+                    continue
+                state["by_risk"][result["risk_level"]] += 1
+                state["flagged"] += bool(result["matches"])
+            state["done"] += len(results)
+            state["offset"] = out.tell()
+            _write_checkpoint(checkpoint_path, state)
+            if progress:
+                progress(state)
+    state["complete"] = True
+    _write_checkpoint(checkpoint_path, state)
+    return {
+        "output": output_path,
+        "rules_version": rule_set.version,
+        "scanned": state["done"] - resumed_from,
+        "resumed_from": resumed_from,
+        "total": state["done"],
+        "flagged": state["flagged"],
+        "by_risk": state["by_risk"],
+        "errors": state["errors"],
+        "checkpoint_mismatch": mismatch,
+        "seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+def default_workers():
+    """COMPLIANCE_SCAN_WORKERS (default 1 = scan in the calling process)."""
+    return max(1, int(os.getenv("COMPLIANCE_SCAN_WORKERS", 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a marketing asset library with the compliance rules")
+    parser.add_argument("source", help="NDJSON file (one asset per line) or a directory of text files")
+    parser.add_argument("--output", help="JSONL results file (default <source>.compliance.jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="assets per task and checkpoint")
+    parser.add_argument("--text-field", help=f"NDJSON field with the text (default: first of {', '.join(TEXT_FIELDS)})")
+    parser.add_argument("--rules", help="JSON rules file (overrides COMPLIANCE_RULES_PATH)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and scan from the start")
+    args = parser.parse_args()
+
+    if args.rules:
+        os.environ["COMPLIANCE_RULES_PATH"] = args.rules
+    output = args.output or f"{args.source.rstrip(os.sep)}.compliance.jsonl"
+
+    def progress(state):
+        print(f"\r  {state['done']} scanned, {state['flagged']} flagged", end="", file=sys.stderr, flush=True)
+
+    summary = scan_to_file(args.source, output, build_rule_set(), args.workers, args.chunk_size,
+                           args.text_field, resume=not args.restart, progress=progress)
+    print(file=sys.stderr)
+    if summary["checkpoint_mismatch"]:
+        print(f"Checkpoint was for a different {', '.join(summary['checkpoint_mismatch'])}; scanned from the start",
+              file=sys.stderr)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Background Job Queue
+SQLite-backed queue and worker pool for long-running generator requests, so a
+client can submit, disconnect and fetch the result later (poll or SSE)
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import metrics
+from rate_limiter import request_priority
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+# How often idle workers and SSE watchers re-read the database when nothing notified them
+# (covers jobs submitted by another process sharing the file)
+POLL_INTERVAL = 1.0
+
+# Jobs claimed by this process and not finished yet. recover() must not requeue them even
+# though their owner is our own pid; a running row with our pid that is not in here was left
+# by an earlier process that happened to have the same pid (e.g. pid 1 in a container).
+_claimed_here = set()
+_claimed_lock = threading.Lock()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class JobStore:
+    """
+    Jobs table in a SQLite file; every state change is committed before it is reported.
+    Several processes on one host (e.g. gunicorn workers) may share the file: claims are
+    atomic and each running job records the pid that owns it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, owner INTEGER,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs(status, created_at)")
+
+    def create(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, time.time()))
+        return job_id
+
+    def claim(self):
+        """Atomically moves the oldest queued job to running -> (id, kind, payload) or None."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (QUEUED,)).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, owner = ?, attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, time.time(), os.getpid(), row["id"]))
+                    with _claimed_lock:
+                        _claimed_here.add(row["id"])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return None if row is None else (row["id"], row["kind"], json.loads(row["payload"]))
+
+    def finish(self, job_id, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED if error is not None else SUCCEEDED,
+                 None if result is None else json.dumps(result), error, time.time(), job_id))
+        with _claimed_lock:
+            _claimed_here.discard(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row["id"],
+            "type": row["kind"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
+        if row["status"] == SUCCEEDED:
+            job["result"] = json.loads(row["result"])
+        elif row["status"] == FAILED:
+            job["error"] = row["error"]
+        return job
+
+    def recover(self, max_attempts):
+        """
+        Called at startup: running jobs whose owning process has exited go back to the queue,
+        or fail once they have been attempted max_attempts times. Jobs running in this process
+        (another JobQueue on the same file) are left alone. Returns how many were requeued.
+        """
+        requeued = 0
+        with self._lock, _claimed_lock:
+            rows = self._conn.execute("SELECT id, owner, attempts FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+            for row in rows:
+                if row["owner"] == os.getpid():
+                    if row["id"] in _claimed_here:
+                        continue  # running on one of our own worker threads
+                elif row["owner"] is not None and _process_alive(row["owner"]):
+                    continue  # still being worked on by another process sharing the file
+                if row["attempts"] >= max_attempts:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                        (FAILED, "Interrupted by a restart too many times", time.time(), row["id"]))
+                else:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL WHERE id = ?",
+                        (QUEUED, row["id"]))
+                    requeued += 1
+        return requeued
+
+    def purge(self, older_than):
+        """Deletes finished jobs that finished before the given timestamp."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (*FINISHED, older_than)).rowcount
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+class JobQueue:
+    """
+    Runs submitted jobs on a pool of worker threads.
+
+    handlers maps a job type to a callable taking the job's JSON payload and returning a
+    JSON-serializable result; an exception marks the job failed with its message. Jobs
+    run at "batch" rate-limit priority so queued work never delays interactive requests.
+    At start() running jobs left behind by an exited process are queued again.
+    """
+
+    def __init__(self, store, handlers, workers=4, max_attempts=3, retention=86400):
+        self.store = store
+        self.handlers = dict(handlers)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._changed = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+    def start(self):
+        if self._threads:
+            return
+        self.store.recover(self.max_attempts)
+        if self.retention:
+            self.store.purge(time.time() - self.retention)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Lets running jobs finish and stops the workers (queued jobs stay in the database)."""
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopping = False
+
+    def submit(self, kind, payload):
+        """Persists a job and wakes a worker -> job id."""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job type '{kind}'")
+        job_id = self.store.create(kind, payload)
+        self._notify()
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _work(self):
+        while not self._stopping:
+            claimed = self.store.claim()
+            if claimed is None:
+                with self._changed:
+                    if not self._stopping:
+                        self._changed.wait(POLL_INTERVAL)
+                continue
+            job_id, kind, payload = claimed
+            self._notify()  # queued -> running
+            try:
+                # Worker threads start with an empty context: set the priority and the
+                # metrics label (the job type) for upstream calls no tracked method labels
+                with request_priority("batch"), metrics.method_label(kind):
+                    result = self.handlers[kind](payload)
+                self.store.finish(job_id, result=result)
+            except Exception as e:
+                print(f"DEBUG: Job {job_id} ({kind}) failed -> {e}")
+                self.store.finish(job_id, error=str(e) or type(e).__name__)
+            self._notify()
+
+    def events(self, job_id, heartbeat=15.0):
+        """
+        (event, data) tuples for sse_response: "status" on connect, on every change and
+        every heartbeat seconds while waiting, then "done" (succeeded) or "error" (failed).
+        """
+        last_status = None
+        last_sent = 0.0
+        while True:
+            job = self.store.get(job_id)
+            if job is None:
+                yield "error", {"job_id": job_id, "error": "Unknown job"}
+                return
+            if job["status"] in FINISHED:
+                yield ("done" if job["status"] == SUCCEEDED else "error"), job
+                return
+            if job["status"] != last_status or time.monotonic() - last_sent >= heartbeat:
+                last_status = job["status"]
+                last_sent = time.monotonic()
+                yield "status", job
+            with self._changed:
+                self._changed.wait(POLL_INTERVAL)
+
+    def stats(self):
+        return {
+            "workers": len(self._threads),
+            "path": self.store.path,
+            "jobs": self.store.counts()
+        }
+
+
+def build_job_queue(handlers, path=None):
+    """
+    Builds the job queue configured in the environment (workers are started by start()):
+        JOB_DB_PATH = SQLite file when path is not given (default Backend/jobs.sqlite3)
+        JOB_WORKERS = worker threads (default 4)
+        JOB_MAX_ATTEMPTS = runs before a job interrupted by restarts is failed (default 3)
+        JOB_RETENTION_SECONDS = finished jobs older than this are purged at start (default 86400, 0 = keep)
+    """
+    default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3")
+    return JobQueue(JobStore(path or os.getenv("JOB_DB_PATH", default_path)), handlers,
+                    workers=int(os.getenv("JOB_WORKERS", 4)),
+                    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", 3)),
+                    retention=int(os.getenv("JOB_RETENTION_SECONDS", 86400)))
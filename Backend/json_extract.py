@@ -0,0 +1,298 @@
+"""
+JSON Extraction
+Pulls the first balanced JSON object out of LLM output and validates it
+against a per-module schema
+"""
+import re
+import json
+import functools
+
+# Characters that can change the scan state; everything else is skipped by the regex engine
+_STRUCTURAL = re.compile(r'[{}"\\]')
+
+# Prefixes of the error strings _call_groq returns instead of raising
+UPSTREAM_ERROR_PREFIXES = ("AI Error", "Error:")
+
+# How much of a broken reply is echoed back in a repair prompt
+REPAIR_ECHO_CHARS = 4000
+
+
+def _field(kind, required=True, enum=None, minimum=None, maximum=None, items=None, fields=None, count=None):
+    """
+    items: element type of an array ("string" or a dict of fields for objects)
+    fields: keys of a nested object; count: expected array length (hint only)
+    """
+    return {"type": kind, "required": required, "enum": enum, "min": minimum, "max": maximum,
+            "items": items, "fields": fields, "count": count}
+
+
+_STRING = _field("string")
+
+# Keys each module's prompt asks for. Extra keys are allowed; enums are matched
+# case-insensitively and numbers may arrive as numeric strings. Nested items/fields
+# are used for the compact prompt hints; validation checks array elements are objects.
+SCHEMAS = {
+    "sentiment": {
+        "sentiment": _field("string", enum=("positive", "neutral", "negative")),
+        "confidence": _field("number", minimum=0, maximum=1),
+        "summary": _field("string")
+    },
+    "benchmark": {
+        "market_score": _field("number", minimum=0, maximum=100),
+        "trend": _field("string", enum=("up", "down", "stable")),
+        "market_position": _field("string"),
+        "key_strength": _field("string"),
+        "key_weakness": _field("string")
+    },
+    "compliance": {
+        "risk_level": _field("string", enum=("low", "medium", "high")),
+        "flagged_phrases": _field("array", items="string"),
+        "suggestions": _field("array", items="string"),
+        "gdpr_compliant": _field("boolean")
+    },
+    "prediction": {
+        "churn_risk": _field("string", enum=("high", "medium", "low")),
+        "churn_probability": _field("number", minimum=0, maximum=100),
+        "next_best_action": _field("string"),
+        "campaign_timing": _field("string"),
+        "recommended_channel": _field("string")
+    },
+    "recommendations": {
+        "recommended_products": _field("array", items={
+            "name": _STRING, "reason": _STRING, "priority": _field("string", enum=("high", "medium", "low"))
+        })
+    },
+    "catalog_recommendations": {
+        "recommended_products": _field("array", items={
+            "id": _STRING, "name": _STRING, "reason": _STRING,
+            "priority": _field("string", enum=("high", "medium", "low"))
+        })
+    },
+    "campaign": {
+        "campaign_objectives": _field("array", items="string", count=3),
+        "content_ideas": _field("array", count=5, items={
+            "id": _field("number"), "title": _STRING, "format": _field("string", enum=("article", "case study", "infographic")),
+            "key_message": _STRING, "engagement_angle": _STRING
+        }),
+        "ad_copy_variations": _field("array", count=3, items={
+            "variation": _field("number"), "headline": _STRING, "body": _STRING,
+            "tone": _field("string", enum=("professional", "casual", "urgent"))
+        }),
+        "platform_specific_ctas": _field("object", required=False, fields={
+            "linkedin": _STRING, "email": _STRING, "web": _STRING
+        }),
+        "campaign_timeline": _field("string", required=False),
+        "expected_kpis": _field("object", required=False, fields={
+            "click_through_rate": _STRING, "conversion_rate": _STRING, "lead_quality_score": _STRING
+        })
+    },
+    "pitch": {
+        "elevator_pitch_30sec": _field("string"),
+        "pain_point_analysis": _field("object", fields={
+            "primary_pain": _STRING, "secondary_pains": _field("array", items="string", count=2)
+        }),
+        "differentiators": _field("array", count=3, items={
+            "differentiator": _STRING, "benefits_for_role": _STRING, "impact": _STRING
+        }),
+        "strategic_cta": _field("object", fields={
+            "immediate_next_step": _STRING, "suggested_angle": _STRING, "objection_handler": _STRING
+        }),
+        "discovery_questions": _field("array", required=False, items="string", count=3),
+        "social_proof_angles": _field("array", required=False, items="string", count=2)
+    },
+    "lead_score": {
+        "lead_score": _field("number", required=False, minimum=0, maximum=100),
+        "conversion_probability": _field("number", required=False, minimum=0, maximum=100),
+        "reasoning": _field("string"),
+        "key_strengths": _field("array", items="string", count=2),
+        "risk_factors": _field("array", items="string", count=2),
+        "recommended_action": _field("string"),
+        "sales_strategy": _field("string")
+    }
+}
+
+# Micro-batched classification replies: one entry per numbered item, validated item by item
+# against the single-item schema
+SCHEMAS["sentiment_batch"] = {"results": _field("array", items={"index": _field("number"), **SCHEMAS["sentiment"]})}
+SCHEMAS["compliance_batch"] = {"results": _field("array", items={"index": _field("number"), **SCHEMAS["compliance"]})}
+
+
+def is_upstream_error(text):
+    return isinstance(text, str) and text.startswith(UPSTREAM_ERROR_PREFIXES)
+
+
+def _balanced_end(text, start):
+    """
+    Index of the brace closing the object opened at text[start], or None when the text
+    ends first. The regex only stops on braces, quotes and backslashes, tracking
+    string/escape state so braces inside strings do not count.
+    """
+    depth = 0
+    in_string = False
+    escaped_at = -1
+    for match in _STRUCTURAL.finditer(text, start):
+        i = match.start()
+        if i == escaped_at:
+            continue
+        char = match.group()
+        if in_string:
+            if char == "\\":
+                escaped_at = i + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+
+def extract_json(text):
+    """
+    Returns the first balanced JSON object in text (code fences, leading prose and
+    trailing commentary are ignored), or None.
+
+    Candidates start at each "{" in turn. One that never closes, or closes but fails
+    json.loads, is dropped and the scan restarts at the next "{" after its start, so
+    a stray brace in prose or a broken outer object does not hide a valid object later
+    in the text or nested inside it.
+    """
+    if not isinstance(text, str):
+        return None
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            value = json.loads(stripped)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+
+    start = text.find("{")
+    while start != -1:
+        end = _balanced_end(text, start)
+        if end is not None:
+            try:
+                value = json.loads(text[start:end + 1])
+                if isinstance(value, dict):
+                    return value
+            except ValueError:
+                pass
+        start = text.find("{", start + 1)
+    return None
+
+
+def _check_field(name, spec, value, errors):
+    """Validates one field; returns the (possibly normalized) value."""
+    kind = spec["type"]
+    if kind == "string":
+        if not isinstance(value, str):
+            errors.append(f"'{name}' must be a string")
+            return value
+        if spec["enum"]:
+            normalized = value.strip().lower()
+            if normalized not in spec["enum"]:
+                errors.append(f"'{name}' must be one of {'/'.join(spec['enum'])}")
+            return normalized
+        return value
+    if kind == "number":
+        if isinstance(value, str):
+            try:
+                value = float(value.strip().rstrip("%"))
+            except ValueError:
+                errors.append(f"'{name}' must be a number")
+                return value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"'{name}' must be a number")
+            return value
+        if (spec["min"] is not None and value < spec["min"]) or (spec["max"] is not None and value > spec["max"]):
+            errors.append(f"'{name}' must be between {spec['min']} and {spec['max']}")
+        return value
+    if kind == "boolean":
+        if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+            return value.strip().lower() == "true"
+        if not isinstance(value, bool):
+            errors.append(f"'{name}' must be true or false")
+        return value
+    if kind == "array":
+        if not isinstance(value, list):
+            errors.append(f"'{name}' must be an array")
+        elif isinstance(spec["items"], dict) and not all(isinstance(item, dict) for item in value):
+            errors.append(f"'{name}' must be an array of objects")
+    elif kind == "object" and not isinstance(value, dict):
+        errors.append(f"'{name}' must be an object")
+    return value
+
+
+def validate(data, module):
+    """
+    Checks data against SCHEMAS[module].
+
+    Returns:
+        tuple: (normalized data, list of error strings - empty when valid)
+    """
+    schema = SCHEMAS[module]
+    errors = []
+    result = dict(data)
+    for name, spec in schema.items():
+        if name not in data:
+            if spec["required"]:
+                errors.append(f"missing '{name}'")
+            continue
+        result[name] = _check_field(name, spec, data[name], errors)
+    return result, errors
+
+
+def parse(text, module):
+    """extract_json + validate -> (data or None, errors)."""
+    if is_upstream_error(text):
+        return None, [text]
+    data = extract_json(text)
+    if data is None:
+        return None, ["no JSON object found"]
+    return validate(data, module)
+
+
+def _type_hint(spec):
+    if spec["enum"]:
+        return "|".join(spec["enum"])
+    if spec["min"] is not None:
+        return f"{spec['type']} {spec['min']}-{spec['max']}"
+    if spec["type"] == "array" and spec["items"]:
+        items = spec["items"] if isinstance(spec["items"], str) else _fields_hint(spec["items"])
+        return f"[{items}]" + (f" x{spec['count']}" if spec["count"] else "")
+    if spec["type"] == "object" and spec["fields"]:
+        return _fields_hint(spec["fields"])
+    return spec["type"]
+
+
+def _fields_hint(fields):
+    return "{" + ", ".join(f'"{name}": {_type_hint(spec)}{"" if spec["required"] else " (optional)"}'
+                           for name, spec in fields.items()) + "}"
+
+
+@functools.lru_cache(maxsize=None)
+def schema_hint(module):
+    """
+    Compact one-line description of a module's JSON, e.g.
+    {"trend": up|down|stable, "flagged_phrases": [string], "content_ideas": [{...}] x5}
+    Used instead of a pretty-printed example skeleton to keep prompts small.
+    """
+    return _fields_hint(SCHEMAS[module])
+
+
+def repair_messages(module, text, errors):
+    """
+    Chat messages for the repair retry: the broken reply and what was wrong with it,
+    without resending the original (much longer) prompt.
+    """
+    prompt = (f"This reply was supposed to be a single JSON object but could not be used: "
+              f"{'; '.join(errors[:10])}.\n"
+              f"Return ONLY the corrected JSON object (no markdown, no commentary) with these keys:\n"
+              f"{schema_hint(module)}\n\n"
+              f"Reply to fix:\n{text[:REPAIR_ECHO_CHARS]}")
+    return [{"role": "user", "content": prompt}]
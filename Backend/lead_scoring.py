@@ -0,0 +1,157 @@
+"""
+Deterministic Lead Scoring
+Weighted budget/timeline/urgency scorer shared by the single-lead and batch paths
+"""
+import re
+import numpy as np
+
+WEIGHTS = {
+    "budget": 0.40,
+    "timeline": 0.35,
+    "urgency": 0.25
+}
+
+_NON_NUMERIC = re.compile(r"[^0-9.]")
+
+# First amount in the text with an optional magnitude suffix ("$50k", "1.5M", "2 million")
+_AMOUNT = re.compile(r"(\d+(?:\.\d+)?|\.\d+)(?:\s*(k|thousand|mm|m|million|bn|b|billion)\b)?")
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mm": 1e6, "million": 1e6,
+                "b": 1e9, "bn": 1e9, "billion": 1e9}
+
+
+def parse_budget_value(budget, expand_suffixes=True):
+    """
+    Extracts the numeric value of a budget string ("$50k", "1.5M", "250,000").
+    With expand_suffixes=False every non-digit is stripped instead (the Node.js pattern
+    scorer's behaviour, where "1.5M" reads as 1.5).
+    Raises ValueError when no number can be parsed.
+    """
+    text = str(budget).lower()
+    if not expand_suffixes:
+        return float(_NON_NUMERIC.sub('', text))
+    match = _AMOUNT.search(text.replace(',', ''))
+    if match is None:
+        raise ValueError(f"No amount in budget '{budget}'")
+    return float(match.group(1)) * _MULTIPLIERS.get(match.group(2), 1)
+
+
+def _budget_value_or_nan(budget):
+    try:
+        return parse_budget_value(budget)
+    except ValueError:
+        return np.nan
+
+
+def budget_scores(values):
+    """Vectorized budget_score: one parse per distinct value, then the bands in one np.select."""
+    amounts = _score_column(values, _budget_value_or_nan)
+    return np.select([np.isnan(amounts), amounts < 10000, amounts < 50000], [50, 30, 60], default=100)
+
+
+def budget_score(budget):
+    try:
+        budget_val = parse_budget_value(budget)
+    except ValueError:
+        return 50
+    if budget_val < 10000:
+        return 30
+    elif budget_val < 50000:
+        return 60
+    return 100
+
+
+def timeline_score(timeline):
+    timeline_lower = str(timeline).lower()
+    if "now" in timeline_lower or "immediate" in timeline_lower or "urgent" in timeline_lower:
+        return 100
+    elif "week" in timeline_lower or "this" in timeline_lower or "month" in timeline_lower:
+        return 80
+    elif "quarter" in timeline_lower:
+        return 60
+    elif "year" in timeline_lower or "next" in timeline_lower:
+        return 30
+    return 50
+
+
+def urgency_score(urgency):
+    urgency_lower = str(urgency).lower()
+    if "high" in urgency_lower or "critical" in urgency_lower:
+        return 100
+    elif "medium" in urgency_lower:
+        return 65
+    elif "low" in urgency_lower:
+        return 30
+    return 50
+
+
+def conversion_probability(score):
+    if score >= 80:
+        return 75
+    elif score >= 60:
+        return 50
+    elif score >= 40:
+        return 25
+    return 10
+
+
+def score_lead(budget, timeline, urgency):
+    """Scores one lead -> (lead score 0-100, conversion probability %)."""
+    calculated_score = int(
+        (budget_score(budget) * WEIGHTS["budget"]) +
+        (timeline_score(timeline) * WEIGHTS["timeline"]) +
+        (urgency_score(urgency) * WEIGHTS["urgency"])
+    )
+    return calculated_score, conversion_probability(calculated_score)
+
+
+def _score_column(values, scorer):
+    """
+    Applies a scalar scorer to a column by scoring each distinct value once.
+    CRM exports repeat the same budget/timeline/urgency strings heavily, so a
+    hash factorization (value -> code) plus one fancy-index gather turns 50k
+    string parses into a few hundred.
+    """
+    codes_by_value = {}
+    codes = np.fromiter((codes_by_value.setdefault(v, len(codes_by_value)) for v in map(str, values)),
+                        dtype=np.int64)
+    unique_scores = np.fromiter((scorer(v) for v in codes_by_value), dtype=np.float64,
+                                count=len(codes_by_value))
+    return unique_scores[codes]
+
+
+def score_leads(budgets, timelines, urgencies):
+    """
+    Vectorized equivalent of score_lead over whole columns.
+
+    Returns:
+        dict: numpy arrays "lead_score" and "conversion_probability" (int64) plus
+              the component "budget_score", "timeline_score", "urgency_score"
+    """
+    budget_column = budget_scores(budgets).astype(np.float64)
+    timeline_scores = _score_column(timelines, timeline_score)
+    urgency_scores = _score_column(urgencies, urgency_score)
+
+    weighted = ((budget_column * WEIGHTS["budget"]) +
+                (timeline_scores * WEIGHTS["timeline"]) +
+                (urgency_scores * WEIGHTS["urgency"]))
+    lead_scores = weighted.astype(np.int64)  # truncation, same as int() in score_lead
+    probabilities = np.select(
+        [lead_scores >= 80, lead_scores >= 60, lead_scores >= 40],
+        [75, 50, 25],
+        default=10
+    ).astype(np.int64)
+
+    return {
+        "lead_score": lead_scores,
+        "conversion_probability": probabilities,
+        "budget_score": budget_column.astype(np.int64),
+        "timeline_score": timeline_scores.astype(np.int64),
+        "urgency_score": urgency_scores.astype(np.int64)
+    }
+
+
+def top_lead_indices(lead_scores, top_n):
+    """Indices of the top_n highest scores (stable: earlier leads win ties)."""
+    if top_n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.argsort(-lead_scores, kind="stable")[:top_n]
@@ -0,0 +1,280 @@
+"""
+Metrics
+Prometheus text-format instrumentation for routes, upstream LLM calls, token usage,
+cache efficiency and parser fallbacks (METRICS_ENABLED, off by default)
+"""
+import os
+import time
+import bisect
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from json_extract import is_upstream_error
+
+ROUTE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_enabled = None
+_current_method = contextvars.ContextVar("llm_method", default="other")
+
+
+def enabled():
+    """METRICS_ENABLED is read once, after the app has loaded its .env."""
+    global _enabled
+    if _enabled is None:
+        _enabled = os.getenv("METRICS_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on")
+    return _enabled
+
+
+def _escape_label(value):
+    """Label value escaping required by the text format: backslash, double quote and newline."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=ROUTE_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {round(total, 6)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# ===================== METRIC DEFINITIONS =====================
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to response headers per route (streams: until the first byte).",
+    ("route", "method", "status"), ROUTE_BUCKETS)
+llm_upstream_duration = Histogram(
+    "llm_upstream_duration_seconds", "Groq round trip per AIService method, including retries.",
+    ("method", "outcome"), UPSTREAM_BUCKETS)
+llm_tokens = Counter(
+    "llm_tokens_total", "Tokens reported in the Groq usage field.", ("method", "kind"))
+llm_json_parse_failures = Counter(
+    "llm_json_parse_failures_total", "Model replies with no extractable JSON object or failing the module schema.",
+    ("module",))
+llm_json_repairs = Counter(
+    "llm_json_repairs_total", "Repair retries after a parse failure, by outcome.", ("module", "outcome"))
+llm_fallbacks = Counter(
+    "llm_fallback_total", "Responses served from a fallback path instead of the model output.",
+    ("module", "reason"))
+llm_prompt_tokens_saved = Counter(
+    "llm_prompt_tokens_saved_total", "Estimated prompt tokens saved by compact JSON-mode prompts.", ("module",))
+
+_METRICS = (http_request_duration, llm_upstream_duration, llm_tokens, llm_json_parse_failures, llm_json_repairs,
+            llm_fallbacks, llm_prompt_tokens_saved)
+
+
+# ===================== RECORDING HELPERS =====================
+def track_method(name=None):
+    """
+    Labels upstream calls made inside the decorated AIService/AsyncAIService method
+    (sync, async or streaming) with name (default: the method name). Checks one flag
+    and calls straight through when metrics are disabled.
+    """
+    def decorator(fn):
+        label = name or fn.__name__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not enabled():
+                    return await fn(*args, **kwargs)
+                token = _current_method.set(label)
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _current_method.reset(token)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return fn(*args, **kwargs)
+            token = _current_method.set(label)
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                _current_method.reset(token)
+            # Streaming methods return generators whose upstream calls happen while they are consumed
+            return _label_steps(result, label) if inspect.isgenerator(result) else result
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def method_label(label):
+    """
+    Labels upstream calls made inside the block. For work running on another thread
+    (micro-batch runs, job workers), which does not see the submitting caller's label.
+    """
+    token = _current_method.set(label)
+    try:
+        yield
+    finally:
+        _current_method.reset(token)
+
+
+def _label_steps(generator, label):
+    """Re-yields generator, setting the method label around each step only (never between yields)."""
+    try:
+        while True:
+            token = _current_method.set(label)
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                _current_method.reset(token)
+            yield item
+    finally:
+        generator.close()
+
+
+def observe_upstream(seconds, outcome):
+    if enabled():
+        llm_upstream_duration.observe(seconds, _current_method.get(), outcome)
+
+
+def record_usage(usage):
+    if enabled() and usage:
+        method = _current_method.get()
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                llm_tokens.inc(method, kind.replace("_tokens", ""), amount=usage[kind])
+
+
+def record_parse_failure(module):
+    if enabled():
+        llm_json_parse_failures.inc(module)
+
+
+def record_repair(module, repaired):
+    if enabled():
+        llm_json_repairs.inc(module, "repaired" if repaired else "failed")
+
+
+def record_fallback(module, response=None):
+    """Counts a parser serving its fallback, split by upstream errors vs unusable model output."""
+    if enabled():
+        llm_fallbacks.inc(module, "upstream_error" if is_upstream_error(response) else "invalid_json")
+
+
+def record_prompt_savings(module, tokens):
+    if enabled():
+        llm_prompt_tokens_saved.inc(module, amount=tokens)
+
+
+# ===================== EXPOSITION =====================
+def _gauge(name, documentation, value, labels=""):
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name}{labels} {value}"]
+
+
+def _counter(name, documentation, value, labels=""):
+    """A service counter that only grows (name ends in _total so rate() applies)."""
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} counter", f"{name}{labels} {value}"]
+
+
+def _service_lines(ai):
+    """Point-in-time values read from the service's own counters at scrape time (no hot-path cost)."""
+    lines = []
+    if ai.cache is not None:
+        stats = ai.cache.stats()
+        lines += _counter("llm_cache_hits_total", "Response cache hits since start.", stats["hits"])
+        lines += _counter("llm_cache_misses_total", "Response cache misses since start.", stats["misses"])
+        lines += _gauge("llm_cache_hit_ratio", "Response cache hits / lookups.", stats["hit_ratio"])
+    if ai.single_flight is not None:
+        lines += _counter("llm_coalesced_calls_total", "Requests answered by another caller's in-flight call.",
+                          ai.single_flight.stats()["coalesced_calls"])
+    circuit = ai.circuit_breaker.state()
+    lines += _gauge("llm_circuit_open", "1 while the upstream circuit breaker is not closed.",
+                    int(circuit["state"] != "closed"))
+    if ai.rate_limiter is not None:
+        lines += _gauge("llm_rate_limit_queued", "Calls waiting for RPM/TPM budget.", ai.rate_limiter.stats()["queued"])
+    return lines
+
+
+def render(ai=None):
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+    if ai is not None:
+        lines += _service_lines(ai)
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app, ai):
+    """Registers timing hooks and GET /metrics when METRICS_ENABLED is set; otherwise does nothing."""
+    if not enabled():
+        return
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_route(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            http_request_duration.observe(time.perf_counter() - started, route, request.method,
+                                          response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render(ai), mimetype=CONTENT_TYPE)
@@ -0,0 +1,119 @@
+"""
+Micro-Batcher
+Collects concurrent short requests over a few-millisecond window and hands them to a
+batch function in one call, then resolves each caller's future with its own result
+"""
+import os
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    submit() queues an item and returns a concurrent.futures.Future. A collector thread
+    closes a batch when it holds max_batch_size items or max_wait seconds after its
+    first item arrived, whichever comes first, and runs run_batch(items) on a small
+    worker pool (so the next window fills while a batch is upstream).
+
+    run_batch returns one result per item, in order; an exception instance in that list
+    fails only its own caller, an exception raised by run_batch fails the whole batch.
+    Threaded callers wait on future.result(), coroutines on asyncio.wrap_future(future).
+    """
+
+    def __init__(self, name, run_batch, max_batch_size=8, max_wait=0.005, max_in_flight=4):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self._cond = threading.Condition()
+        self._pending = []  # (item, future)
+        self._window_started = 0.0
+        self._executor = ThreadPoolExecutor(max(1, max_in_flight), thread_name_prefix=f"microbatch-{name}")
+        self._collector = None
+        self.items = 0
+        self.batches = 0
+        self.full_batches = 0
+        self.largest_batch = 0
+
+    def submit(self, item):
+        future = Future()
+        with self._cond:
+            if self._collector is None:
+                self._collector = threading.Thread(target=self._collect, name=f"microbatch-{self.name}-collector",
+                                                   daemon=True)
+                self._collector.start()
+            if not self._pending:
+                self._window_started = time.monotonic()
+            self._pending.append((item, future))
+            self._cond.notify()
+        return future
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._window_started + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                if self._pending:
+                    self._window_started = time.monotonic()
+                self.items += len(batch)
+                self.batches += 1
+                self.full_batches += len(batch) == self.max_batch_size
+                self.largest_batch = max(self.largest_batch, len(batch))
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch):
+        try:
+            results = self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(batch)} items")
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        with self._cond:
+            items, batches, pending = self.items, self.batches, len(self._pending)
+            full, largest = self.full_batches, self.largest_batch
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "items": items,
+            "batches": batches,
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "full_batches": full,
+            "largest_batch": largest,
+            "pending": pending
+        }
+
+
+def build_micro_batchers(run_batches):
+    """
+    Builds one batcher per name in run_batches ({name: run_batch}) as configured in the
+    environment, or {} when micro-batching is off:
+        LLM_MICRO_BATCH = true/false (default false)
+        LLM_MICRO_BATCH_MAX_SIZE = items per batch (default 8)
+        LLM_MICRO_BATCH_MAX_WAIT_MS = collection window after the first item (default 5)
+        LLM_MICRO_BATCH_IN_FLIGHT = batches upstream at once per batcher (default 4)
+    """
+    if os.getenv("LLM_MICRO_BATCH", "false").strip().lower() not in ("1", "true", "yes", "on"):
+        return {}
+    max_batch_size = int(os.getenv("LLM_MICRO_BATCH_MAX_SIZE", 8))
+    max_wait = float(os.getenv("LLM_MICRO_BATCH_MAX_WAIT_MS", 5)) / 1000
+    max_in_flight = int(os.getenv("LLM_MICRO_BATCH_IN_FLIGHT", 4))
+    return {name: MicroBatcher(name, run_batch, max_batch_size, max_wait, max_in_flight)
+            for name, run_batch in run_batches.items()}
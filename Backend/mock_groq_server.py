@@ -0,0 +1,256 @@
+"""
+Mock Groq Server
+OpenAI/Groq-compatible chat completions stub for offline benchmarking and development
+
+Usage:
+    python mock_groq_server.py --port 8765 --latency-ms 150 --error-rate 0.02
+    GROQ_API_URL=http://127.0.0.1:8765/openai/v1/chat/completions GROQ_API_KEY=mock python app.py
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tokens import estimate_message_tokens, estimate_tokens
+
+# Canned replies keyed by a phrase from each module's prompt (first match wins),
+# shaped like the JSON the real model is asked for so the parsers take their normal path
+FIXTURES = [
+    # Micro-batched prompts list one '[index] "text"' line per item; reply with one result each
+    ("each numbered customer feedback item", lambda prompt: {"results": [
+        {"index": i, "sentiment": "positive", "confidence": 0.87, "summary": "Customer is satisfied."}
+        for i in _item_indices(prompt)]}),
+    ("each numbered marketing text", lambda prompt: {"results": [
+        {"index": i, "risk_level": "medium", "flagged_phrases": ["guaranteed results"],
+         "suggestions": ["Qualify performance claims with evidence"], "gdpr_compliant": True}
+        for i in _item_indices(prompt)]}),
+    ("Analyze the sentiment", {
+        "sentiment": "positive", "confidence": 0.87,
+        "summary": "Customer is satisfied with product quality and support response times."
+    }),
+    ("Provide market intelligence", {
+        "market_score": 78, "trend": "up",
+        "market_position": "Challenger brand gaining share in the mid-market segment",
+        "key_strength": "Fast product iteration", "key_weakness": "Limited enterprise references"
+    }),
+    ("Review this marketing text for compliance", {
+        "risk_level": "medium", "flagged_phrases": ["guaranteed results"],
+        "suggestions": ["Qualify performance claims with evidence"], "gdpr_compliant": True
+    }),
+    ("Analyze customer behavior data", {
+        "churn_risk": "medium", "churn_probability": 42,
+        "next_best_action": "Offer a guided onboarding session", "campaign_timing": "Within 7 days",
+        "recommended_channel": "Email"
+    }),
+    ("Generate product recommendations", {
+        "recommended_products": [
+            {"name": "AI Analytics Suite", "reason": "Matches reporting needs", "priority": "high"},
+            {"name": "Predictive CRM", "reason": "Fits team size", "priority": "medium"}
+        ]
+    }),
+    ("Update the running summary", "Customer asked about pricing tiers and SSO; agent offered a demo next week."),
+    ("expert B2B marketing strategist", {
+        "campaign_objectives": ["Grow qualified pipeline", "Increase demo requests", "Build category authority"],
+        "content_ideas": [
+            {"id": i, "title": f"Content idea {i}", "format": "article", "key_message": "Measurable ROI",
+             "engagement_angle": "Peer benchmarks"} for i in range(1, 6)
+        ],
+        "ad_copy_variations": [
+            {"variation": i, "headline": f"Headline {i}", "body": "Cut reporting time in half.",
+             "tone": "professional"} for i in range(1, 4)
+        ]
+    }),
+    ("elite B2B sales strategist", {
+        "elevator_pitch_30sec": "We help revenue teams forecast accurately without spreadsheet work.",
+        "pain_point_analysis": {"primary_pain": "Unreliable forecasts", "secondary_pains": ["Manual reporting"]},
+        "differentiators": [
+            {"differentiator": "Automated forecasting", "benefits_for_role": "Fewer surprises",
+             "impact": "15% better forecast accuracy"}
+        ],
+        "strategic_cta": {"immediate_next_step": "Book a 20 minute demo", "suggested_angle": "Quarter-end risk",
+                          "objection_handler": "Start with a two-week pilot"},
+        "discovery_questions": ["How do you build the forecast today?"]
+    }),
+    ("As a sales analyst", {
+        "reasoning": "Budget and timeline are both strong signals.",
+        "key_strengths": ["Qualified budget", "Near-term timeline"], "risk_factors": ["Single stakeholder"],
+        "recommended_action": "Schedule discovery call this week", "sales_strategy": "Lead with ROI case study"
+    }),
+]
+
+DEFAULT_REPLY = ("Thanks for reaching out! Our platform combines market intelligence, pricing, compliance "
+                 "and personalization in one dashboard. Would you like a walkthrough of any module?")
+
+
+def _item_indices(prompt):
+    return [int(index) for index in re.findall(r"^\[(\d+)\] ", prompt, re.MULTILINE)]
+
+
+def reply_for(messages):
+    """Picks the canned reply for a request from its last user message."""
+    prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    for marker, reply in FIXTURES:
+        if marker in prompt:
+            if callable(reply):
+                reply = reply(prompt)
+            return reply if isinstance(reply, str) else json.dumps(reply)
+    return DEFAULT_REPLY
+
+
+class MockConfig:
+    def __init__(self, latency_ms=100.0, jitter_ms=20.0, error_rate=0.0, error_statuses=(429, 503),
+                 stream_chunk_ms=5.0, seed=1234):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.stream_chunk_ms = stream_chunk_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def sample(self):
+        """-> (latency seconds, error status or None); one seeded RNG keeps runs reproducible."""
+        with self._lock:
+            self.requests += 1
+            latency = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            status = None
+            if self.error_rate and self._rng.random() < self.error_rate:
+                status = self._rng.choice(self.error_statuses)
+                self.errors += 1
+            return latency, status
+
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = MockConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, {"requests": self.config.requests, "errors": self.config.errors})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        latency, error_status = self.config.sample()
+        time.sleep(latency)
+        if error_status is not None:
+            headers = {"Retry-After": "1"} if error_status == 429 else None
+            self._send_json(error_status, {"error": {"message": "Injected mock error", "type": "mock_error"}},
+                            headers)
+            return
+
+        messages = request.get("messages", [])
+        content = reply_for(messages)
+        usage = {
+            "prompt_tokens": estimate_message_tokens(messages),
+            "completion_tokens": estimate_tokens(content)
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if request.get("stream"):
+            self._stream(request, content)
+            return
+        self._send_json(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _stream(self, request, content):
+        """Server-Sent Events in the OpenAI chunk format, one word per chunk, ending with [DONE]."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = word if i == len(words) - 1 else word + " "
+            chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "model": request.get("model", "mock"),
+                     "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            if self.config.stream_chunk_ms:
+                time.sleep(self.config.stream_chunk_ms / 1000)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class MockGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients closing a stream right after [DONE] is normal, not worth a traceback
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def start_mock_server(host="127.0.0.1", port=0, config=None):
+    """
+    Starts the mock server on a daemon thread.
+
+    Returns:
+        tuple: (server, chat completions URL) - call server.shutdown() to stop it
+    """
+    handler = type("ConfiguredMockGroqHandler", (MockGroqHandler,), {"config": config or MockConfig()})
+    server = MockGroqServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="mock-groq", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/openai/v1/chat/completions"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI/Groq-compatible mock chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="mean upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="latency standard deviation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing")
+    parser.add_argument("--error-statuses", default="429,503", help="comma-separated statuses to inject")
+    parser.add_argument("--stream-chunk-ms", type=float, default=5.0, help="delay between streamed chunks")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate,
+                        [int(s) for s in args.error_statuses.split(",") if s.strip()],
+                        args.stream_chunk_ms, args.seed)
+    server, url = start_mock_server(args.host, args.port, config)
+    print(f"Mock Groq server listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Smart Pricing Engine - Batch Calculations
+Vectorized version of AIService.dynamic_price for whole catalogs
+"""
+import io
+import csv
+import json
+import numpy as np
+
+BASE_MARGIN = 0.4  # 40% margin
+COMPETITOR_WEIGHT = 0.3
+HIGH_DEMAND = 1.2
+LOW_DEMAND = 0.8
+
+PRICING_REASONS = {
+    "high_demand": "High demand detected - premium pricing recommended",
+    "low_demand": "Low demand - competitive pricing recommended",
+    "stable_demand": "Stable demand - balanced pricing recommended",
+    "invalid_input": "Invalid input values"
+}
+
+COLUMNS = ("cost", "demand_index", "competitor_price")
+
+
+def demand_reason_code(demand_index):
+    if demand_index > HIGH_DEMAND:
+        return "high_demand"
+    elif demand_index < LOW_DEMAND:
+        return "low_demand"
+    return "stable_demand"
+
+
+def to_float_array(values):
+    """Converts a column to float64; unparseable entries become NaN."""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                out[i] = np.nan
+        return out
+
+
+def optimize_prices(cost, demand_index, competitor_price):
+    """
+    Computes optimal prices for whole columns in one NumPy pass.
+    Same formula as AIService.dynamic_price; rows with missing, non-numeric or
+    zero cost/price get NaN outputs and the "invalid_input" reason code.
+
+    Returns:
+        dict: "optimal_price", "margin_percent" (float64 arrays, rounded to cents)
+              and "reason_code" (array of str)
+    """
+    cost = to_float_array(cost)
+    demand_index = to_float_array(demand_index)
+    competitor_price = to_float_array(competitor_price)
+    if not (len(cost) == len(demand_index) == len(competitor_price)):
+        raise ValueError("cost, demand_index and competitor_price must have the same length")
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        competitor_factor = (competitor_price / cost) * COMPETITOR_WEIGHT
+        optimal_price = cost * (1 + BASE_MARGIN) * demand_index + competitor_factor
+        margin = ((optimal_price - cost) / optimal_price) * 100
+
+    invalid = ~(np.isfinite(optimal_price) & np.isfinite(margin))
+    optimal_price[invalid] = np.nan
+    margin[invalid] = np.nan
+
+    reason_code = np.select(
+        [invalid, demand_index > HIGH_DEMAND, demand_index < LOW_DEMAND],
+        ["invalid_input", "high_demand", "low_demand"],
+        default="stable_demand"
+    )
+    return {
+        "optimal_price": np.round(optimal_price, 2),
+        "margin_percent": np.round(margin, 2),
+        "reason_code": reason_code
+    }
+
+
+def read_pricing_columns(req):
+    """
+    Reads columnar pricing input from a Flask request.
+
+    Accepted inputs:
+        - JSON object of equal-length arrays: {"cost": [...], "demand_index": [...],
+          "competitor_price": [...], "sku": optional [...]}
+        - JSON array of row objects
+        - CSV upload ("file" field) or text/csv body with a header row
+        - Parquet upload ("file" field named *.parquet, requires pyarrow)
+
+    Returns:
+        dict: column name -> list (sku is optional)
+    """
+    upload = req.files.get('file')
+    if upload is not None and upload.filename and upload.filename.lower().endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet uploads require the optional 'pyarrow' package")
+        return pq.read_table(io.BytesIO(upload.read())).to_pydict()
+
+    if upload is not None:
+        return _csv_columns(upload.read().decode('utf-8-sig'))
+    if req.mimetype in ('text/csv', 'application/csv'):
+        return _csv_columns(req.get_data(as_text=True))
+
+    data = req.get_json(silent=True)
+    if isinstance(data, list):
+        return {name: [row.get(name) for row in data] for name in COLUMNS + ("sku",)}
+    if isinstance(data, dict):
+        return data
+    raise ValueError("Expected columnar JSON, a JSON array of rows, or a CSV/Parquet upload")
+
+
+def _csv_columns(text):
+    reader = csv.reader(io.StringIO(text))
+    header = [h.strip() for h in next(reader, [])]
+    columns = {name: [] for name in header}
+    for row in reader:
+        for name, value in zip(header, row):
+            columns[name].append(value)
+    return columns
+
+
+def stream_price_rows(columns, result, output_format="ndjson", chunk_size=5000):
+    """
+    Yields the batch result as NDJSON lines or CSV, chunk_size rows at a time,
+    so large catalogs stream back without building one huge response body.
+    """
+    count = len(result["optimal_price"])
+    skus = columns.get("sku")
+    if skus is None or len(skus) != count:
+        skus = range(count)
+    optimal_price = result["optimal_price"]
+    margin = result["margin_percent"]
+    reason_code = result["reason_code"]
+
+    if output_format == "csv":
+        yield "sku,optimal_price,margin_percent,reason_code\n"
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        buffer = io.StringIO()
+        rows = zip(skus[start:stop], optimal_price[start:stop].tolist(),
+                   margin[start:stop].tolist(), reason_code[start:stop].tolist())
+        if output_format == "csv":
+            writer = csv.writer(buffer, lineterminator="\n")
+            for sku, price, pct, code in rows:
+                writer.writerow([sku, "" if price != price else price, "" if pct != pct else pct, code])
+        else:
+            for sku, price, pct, code in rows:
+                buffer.write(json.dumps({
+                    "sku": sku,
+                    "optimal_price": None if price != price else price,
+                    "margin_percent": None if pct != pct else pct,
+                    "reason_code": code,
+                    "pricing_reason": PRICING_REASONS[code]
+                }))
+                buffer.write("\n")
+        yield buffer.getvalue()
@@ -0,0 +1,232 @@
+"""
+Product Index
+Catalog ingestion into a compact on-disk vector index (hashed TF-IDF, memory-mapped
+float32 matrix) and millisecond top-k retrieval of personalization candidates
+
+Usage:
+    python product_index.py catalog.csv                  # -> Backend/product_index/
+    python product_index.py catalog.ndjson --output /data/product_index --dim 4096
+"""
+import os
+import re
+import csv
+import json
+import math
+import time
+import zlib
+import hashlib
+import argparse
+from collections import Counter
+import numpy as np
+
+DEFAULT_DIM = 2048
+BUILD_CHUNK = 10000
+
+# Product fields embedded into the vector (name counts twice) and kept for prompts
+TEXT_FIELDS = ("name", "name", "category", "tags", "description")
+KEPT_FIELDS = ("id", "name", "category", "description")
+DESCRIPTION_CHARS = 240
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the this to was we with you your"
+    .split())
+
+
+def tokenize(text):
+    """
+    Lowercased words, stopwords and bare numbers dropped (a headcount in a profile is not
+    a product feature). Unigrams only: bigrams multiply hash collisions.
+    """
+    return [word for word in _TOKEN.findall(str(text).lower()) if word not in STOPWORDS and not word.isdigit()]
+
+
+def _profile_text(profile):
+    if isinstance(profile, dict):
+        return " ".join(f"{key} {value}" for key, value in profile.items())
+    return str(profile)
+
+
+def _hashed_counts(tokens, dim):
+    """Signed feature hashing: token -> (bucket, +1/-1) with a process-independent hash (crc32)."""
+    buckets = Counter()
+    for token, count in Counter(tokens).items():
+        h = zlib.crc32(token.encode("utf-8"))
+        buckets[h % dim] += (1 + math.log(count)) * (1 if h & 0x80000000 else -1)
+    return buckets
+
+
+def _product_text(product):
+    return " ".join(str(product.get(field) or "") for field in TEXT_FIELDS)
+
+
+def normalize_products(records):
+    """Catalog records -> product dicts with a string id and the KEPT_FIELDS (name is required)."""
+    products = []
+    seen = set()
+    for number, record in enumerate(records):
+        if not isinstance(record, dict) or not str(record.get("name") or "").strip():
+            raise ValueError(f"Product {number + 1} has no name")
+        product_id = str(record.get("id") if record.get("id") not in (None, "") else number + 1)
+        if product_id in seen:
+            raise ValueError(f"Duplicate product id '{product_id}'")
+        seen.add(product_id)
+        product = {field: str(record.get(field) or "").strip() for field in KEPT_FIELDS}
+        product["id"] = product_id
+        product["description"] = product["description"][:DESCRIPTION_CHARS]
+        product["tags"] = str(record.get("tags") or "")
+        products.append(product)
+    return products
+
+
+def catalog_version(products):
+    payload = json.dumps(products, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class ProductIndex:
+    """
+    Files in the index directory:
+        vectors.npy   float32 (products x dim) L2-normalized TF-IDF rows, opened memory-mapped
+        idf.npy       float32 (dim) inverse document frequency per hash bucket
+        products.json product metadata in row order
+        meta.json     dim, count, catalog version, build time
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "products.json"), encoding="utf-8") as f:
+            self.products = json.load(f)
+        self.dim = self.meta["dim"]
+        self.version = self.meta["version"]
+        self.idf = np.load(os.path.join(path, "idf.npy"))
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        if self.vectors.shape != (self.meta["count"], self.dim) or len(self.products) != self.meta["count"]:
+            raise ValueError(f"Index files in {path} are from different builds (rebuild in progress?)")
+
+    @classmethod
+    def build(cls, records, path, dim=DEFAULT_DIM):
+        """
+        Embeds a catalog and writes the index files (each written to a temp name and then
+        renamed, meta.json last, so a running reader never sees a half-written file).
+        """
+        products = normalize_products(records)
+        if not products:
+            raise ValueError("Catalog is empty")
+        os.makedirs(path, exist_ok=True)
+        counts = [_hashed_counts(tokenize(_product_text(product)), dim) for product in products]
+        document_frequency = np.zeros(dim, dtype=np.float64)
+        for buckets in counts:
+            document_frequency[list(buckets)] += 1
+        idf = (np.log((1 + len(products)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        vectors_tmp = os.path.join(path, "vectors.tmp.npy")
+        vectors = np.lib.format.open_memmap(vectors_tmp, mode="w+", dtype=np.float32, shape=(len(products), dim))
+        for start in range(0, len(products), BUILD_CHUNK):
+            block = np.zeros((min(BUILD_CHUNK, len(products) - start), dim), dtype=np.float32)
+            for row, buckets in enumerate(counts[start:start + BUILD_CHUNK]):
+                block[row, list(buckets)] = list(buckets.values())
+            block *= idf
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            vectors[start:start + len(block)] = block / np.where(norms > 0, norms, 1)
+        vectors.flush()
+        del vectors
+
+        idf_tmp = os.path.join(path, "idf.tmp.npy")
+        np.save(idf_tmp, idf)
+        meta = {"dim": dim, "count": len(products), "version": catalog_version(products), "built_at": time.time()}
+        for name, payload in (("products.json", products),
+                              ("meta.json", meta)):
+            with open(os.path.join(path, f"{name}.tmp"), "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+        os.replace(vectors_tmp, os.path.join(path, "vectors.npy"))
+        os.replace(idf_tmp, os.path.join(path, "idf.npy"))
+        os.replace(os.path.join(path, "products.json.tmp"), os.path.join(path, "products.json"))
+        os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+        return cls(path)
+
+    def embed(self, text):
+        buckets = _hashed_counts(tokenize(text), self.dim)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        vector[list(buckets)] = list(buckets.values())
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def search(self, profile, k=8):
+        """
+        Top-k products by cosine similarity to the profile (string or dict).
+
+        Returns:
+            list[dict]: product fields + "score" (0-1) + "matched_terms", best first;
+                        products sharing no word with the profile are left out
+        """
+        query_tokens = tokenize(_profile_text(profile))
+        query = self.embed(_profile_text(profile))
+        if not query.any():
+            return []
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        query_words = set(query_tokens)
+        results = []
+        for row in top.tolist():
+            if scores[row] <= 0:
+                break
+            product = self.products[row]
+            matched = [word for word in dict.fromkeys(tokenize(_product_text(product))) if word in query_words]
+            if not matched:
+                continue  # similarity from hash collisions only
+            results.append(dict(product, score=round(float(scores[row]), 4), matched_terms=matched[:5]))
+        return results
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "products": len(self.products),
+            "dim": self.dim,
+            "version": self.version,
+            "matrix_mb": round(self.vectors.nbytes / 1e6, 1)
+        }
+
+
+def default_index_path():
+    return os.getenv("PRODUCT_INDEX_PATH",
+                     os.path.join(os.path.dirname(os.path.abspath(__file__)), "product_index"))
+
+
+def load_product_index(path=None):
+    """Opens the index at path (default PRODUCT_INDEX_PATH, Backend/product_index) or returns None if none was built."""
+    path = path or default_index_path()
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return ProductIndex(path)
+
+
+def read_catalog(path):
+    """Catalog records from a CSV (header row), NDJSON or JSON array file."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".ndjson", ".jsonl")):
+            return [json.loads(line) for line in f if line.strip()]
+        if path.lower().endswith(".json"):
+            return json.load(f)
+        return list(csv.DictReader(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the personalization product index from a catalog")
+    parser.add_argument("catalog", help="CSV, NDJSON or JSON array of products (id, name, category, tags, description)")
+    parser.add_argument("--output", default=None, help="index directory (default PRODUCT_INDEX_PATH or Backend/product_index)")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM, help="hash buckets per vector")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = ProductIndex.build(read_catalog(args.catalog), args.output or default_index_path(), args.dim)
+    print(json.dumps(dict(index.stats(), seconds=round(time.perf_counter() - started, 2)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
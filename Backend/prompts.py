@@ -0,0 +1,417 @@
+"""
+Prompt Registry
+Versioned prompt templates compiled once at startup, with cached token counts for
+their static text and per-template prompt-size stats
+"""
+import hashlib
+import string
+import threading
+from tokens import estimate_tokens
+
+
+class PromptTemplate:
+    """
+    A str.format-style template ({field} placeholders, {{ }} for literal braces) split
+    once into literal text and field slots. render() fills the slots and joins once;
+    the token estimate of the static text is computed here, so the size of a prompt
+    is known from the field values alone.
+    """
+
+    def __init__(self, name, version, text):
+        self.name = name
+        self.version = version
+        # Hash of the template text: output cached under it goes stale whenever the
+        # wording changes, whether or not the version was bumped
+        self.digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        self._parts = []
+        self._slots = []  # (index in _parts, field name)
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            if literal:
+                self._parts.append(literal)
+            if field is not None:
+                if not field.isidentifier() or spec or conversion:
+                    raise ValueError(f"Prompt '{name}': only plain {{field}} placeholders are supported, "
+                                     f"got {{{field}}}")
+                self._slots.append((len(self._parts), field))
+                self._parts.append("")
+        self.fields = tuple(dict.fromkeys(field for _, field in self._slots))
+        self.static_text = "".join(part for i, part in enumerate(self._parts)
+                                   if i not in {index for index, _ in self._slots})
+        self.static_tokens = estimate_tokens(self.static_text)
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.rendered_tokens = 0
+        self.max_tokens = 0
+
+    def render(self, **fields):
+        """Fills every placeholder (KeyError for a missing field) and records the prompt size."""
+        if not self._slots:
+            self._record(self.static_tokens)
+            return self.static_text
+        parts = self._parts.copy()
+        tokens = self.static_tokens
+        for index, name in self._slots:
+            value = fields[name]
+            if not isinstance(value, str):
+                value = str(value)
+            parts[index] = value
+            tokens += estimate_tokens(value)
+        self._record(tokens)
+        return "".join(parts)
+
+    def estimate(self, **fields):
+        """Token estimate of render(**fields) without building the string or recording stats."""
+        return self.static_tokens + sum(estimate_tokens(str(fields[name])) for _, name in self._slots)
+
+    def _record(self, tokens):
+        with self._lock:
+            self.renders += 1
+            self.rendered_tokens += tokens
+            if tokens > self.max_tokens:
+                self.max_tokens = tokens
+
+    def stats(self):
+        with self._lock:
+            renders, total, largest = self.renders, self.rendered_tokens, self.max_tokens
+        return {
+            "name": self.name,
+            "version": self.version,
+            "static_tokens": self.static_tokens,
+            "renders": renders,
+            "avg_tokens": round(total / renders, 1) if renders else 0.0,
+            "max_tokens": largest,
+            "total_tokens": total
+        }
+
+
+class PromptRegistry:
+    """Templates by name; several versions of a name may be registered, the highest is used by default."""
+
+    def __init__(self, templates=()):
+        self._templates = {}
+        for template in templates:
+            self.register(template)
+
+    def register(self, template):
+        versions = self._templates.setdefault(template.name, {})
+        if template.version in versions:
+            raise ValueError(f"Prompt '{template.name}' v{template.version} is already registered")
+        versions[template.version] = template
+        return template
+
+    def get(self, name, version=None):
+        versions = self._templates[name]
+        return versions[max(versions) if version is None else version]
+
+    def render(self, template_name, /, **fields):
+        # Positional-only, so a template may have a {name} field
+        return self.get(template_name).render(**fields)
+
+    def digests(self):
+        """{name: text hash of the current version} - changes whenever a template's text does."""
+        return {name: self.get(name).digest for name in self._templates}
+
+    def stats(self):
+        """Per-template prompt sizes, largest total first (where trimming pays off most)."""
+        templates = [template.stats() for versions in self._templates.values() for template in versions.values()]
+        return sorted(templates, key=lambda entry: (-entry["total_tokens"], -entry["static_tokens"], entry["name"]))
+
+
+# ===================== TEMPLATES =====================
+# Bump the version (and keep the old entry if anything pins it) when a template's wording
+# changes; caches are keyed on the template text's digest, so they tell old output from new
+# even when a bump is missed.
+TEMPLATES = (
+    # ===================== MODULES 1-6 =====================
+    PromptTemplate("sentiment", 1, """Analyze the sentiment of this customer feedback in JSON format:
+
+"{text}"
+
+Return ONLY valid JSON with these exact keys:
+{{ "sentiment": "positive/neutral/negative", "confidence": 0.0-1.0, "summary": "brief analysis" }}"""),
+    PromptTemplate("sentiment_task", 1, 'Analyze the sentiment of this customer feedback:\n\n"{text}"'),
+    PromptTemplate("benchmark", 1, """Provide market intelligence on '{brand}' in JSON format:
+Return ONLY valid JSON with these exact keys:
+{{ "market_score": 0-100, "trend": "up/down/stable", "market_position": "description", "key_strength": "strength", "key_weakness": "weakness" }}"""),
+    PromptTemplate("benchmark_task", 1, "Provide market intelligence on '{brand}'."),
+    PromptTemplate("compliance", 1, """Review this marketing text for compliance issues in JSON format:
+
+"{text}"
+
+Return ONLY valid JSON with these exact keys:
+{{ "risk_level": "low/medium/high", "flagged_phrases": [list], "suggestions": [list], "gdpr_compliant": true/false }}"""),
+    PromptTemplate("compliance_task", 1, 'Review this marketing text for compliance issues:\n\n"{text}"'),
+    # Micro-batched classification: {items} is one '[index] "text"' line per item
+    PromptTemplate("sentiment_batch", 1, """Analyze the sentiment of each numbered customer feedback item below in JSON format:
+
+{items}
+
+Return ONLY valid JSON with one entry per item ({count} entries), index = the item number:
+{{ "results": [{{ "index": 0, "sentiment": "positive/neutral/negative", "confidence": 0.0-1.0, "summary": "brief analysis" }}] }}"""),
+    PromptTemplate("sentiment_batch_task", 1,
+                   "Analyze the sentiment of each numbered customer feedback item below ({count} items, "
+                   "one result per index):\n\n{items}"),
+    PromptTemplate("compliance_batch", 1, """Review each numbered marketing text below for compliance issues in JSON format:
+
+{items}
+
+Return ONLY valid JSON with one entry per text ({count} entries), index = the text number:
+{{ "results": [{{ "index": 0, "risk_level": "low/medium/high", "flagged_phrases": [list], "suggestions": [list], "gdpr_compliant": true/false }}] }}"""),
+    PromptTemplate("compliance_batch_task", 1,
+                   "Review each numbered marketing text below for compliance issues ({count} texts, "
+                   "one result per index):\n\n{items}"),
+    PromptTemplate("prediction", 1, """Analyze customer behavior data and predict in JSON format:
+Data: {history_data}
+
+Return ONLY valid JSON with these exact keys:
+{{ "churn_risk": "high/medium/low", "churn_probability": 0-100, "next_best_action": "action", "campaign_timing": "timing", "recommended_channel": "channel" }}"""),
+    PromptTemplate("prediction_task", 1, "Analyze customer behavior data and predict churn.\nData: {history_data}"),
+    PromptTemplate("recommendations", 1, """Generate product recommendations in JSON format:
+User Profile: {user_profile}
+
+Return ONLY valid JSON with this exact key:
+{{ "recommended_products": [{{'name': 'product', 'reason': 'why', 'priority': 'high/medium/low'}}] }}"""),
+    PromptTemplate("recommendations_task", 1, "Generate product recommendations.\nUser Profile: {user_profile}"),
+    PromptTemplate("catalog_recommendations", 1, """Generate product recommendations in JSON format from the catalog candidates below.
+User Profile: {user_profile}
+
+Candidates (id | name | category | description):
+{candidates}
+
+Recommend up to {count} of these candidates, best fit first. Do not suggest products that are not listed.
+Return ONLY valid JSON with this exact key:
+{{ "recommended_products": [{{'id': 'candidate id', 'name': 'product', 'reason': 'why', 'priority': 'high/medium/low'}}] }}"""),
+    PromptTemplate("catalog_recommendations_task", 1,
+                   "Generate product recommendations: pick up to {count} of these catalog candidates, best fit first "
+                   "(listed products only, ids as strings).\nUser Profile: {user_profile}\n"
+                   "Candidates (id | name | category | description):\n{candidates}"),
+
+    # ===================== CHATBOT =====================
+    PromptTemplate("chat_system", 1,
+                   "You are a helpful AI business assistant for an AI growth platform. "
+                   "Answer questions about business growth, AI capabilities, and product features. "
+                   "Keep responses concise and professional."),
+    PromptTemplate("chat_summary", 1,
+                   "Update the running summary of this customer conversation. Keep facts, names, numbers, "
+                   "open questions and commitments; drop pleasantries. Reply with the summary only, "
+                   "at most 120 words.\n\n"
+                   "Current summary: {summary}\n\n"
+                   "New messages:\n{transcript}"),
+
+    # ===================== LEGACY =====================
+    PromptTemplate("legacy_campaign", 1, """Act as a Marketing Manager. Create a campaign for:
+Product: {product}
+Audience: {audience}
+Platform: {platform}
+Include: Strategy, Content Ideas, and KPIs."""),
+    PromptTemplate("legacy_pitch", 1, """Act as a Sales Expert. Write a SPIN sales pitch for:
+Product: {product}
+Customer: {customer}
+Include: Elevator Pitch, Value Prop, and Closing."""),
+    PromptTemplate("legacy_lead", 1, """Act as a Lead Scorer. Analyze:
+Name: {name}
+Budget: {budget}
+Need: {need}
+Urgency: {urgency}
+Output: Score (0-100), Conversion Probability %, and Reasoning."""),
+
+    # ===================== GENERATOR HUB =====================
+    PromptTemplate("campaign", 1, """You are an expert B2B marketing strategist. Generate a structured marketing campaign in VALID JSON format.
+
+PRODUCT DETAILS:
+{product_details}
+
+TARGET LINKEDIN DEMOGRAPHICS:
+{linkedin_demographics}
+
+Return ONLY valid JSON (no markdown, no extra text) with this exact structure:
+{{
+    "campaign_objectives": [
+        "objective 1",
+        "objective 2",
+        "objective 3"
+    ],
+    "content_ideas": [
+        {{
+            "id": 1,
+            "title": "content title",
+            "format": "article/case study/infographic",
+            "key_message": "main message",
+            "engagement_angle": "why it matters to audience"
+        }},
+        {{
+            "id": 2,
+            "title": "content title",
+            "format": "article/case study/infographic",
+            "key_message": "main message",
+            "engagement_angle": "why it matters to audience"
+        }},
+        {{
+            "id": 3,
+            "title": "content title",
+            "format": "article/case study/infographic",
+            "key_message": "main message",
+            "engagement_angle": "why it matters to audience"
+        }},
+        {{
+            "id": 4,
+            "title": "content title",
+            "format": "article/case study/infographic",
+            "key_message": "main message",
+            "engagement_angle": "why it matters to audience"
+        }},
+        {{
+            "id": 5,
+            "title": "content title",
+            "format": "article/case study/infographic",
+            "key_message": "main message",
+            "engagement_angle": "why it matters to audience"
+        }}
+    ],
+    "ad_copy_variations": [
+        {{
+            "variation": 1,
+            "headline": "compelling headline",
+            "body": "persuasive body copy",
+            "tone": "professional/casual/urgent"
+        }},
+        {{
+            "variation": 2,
+            "headline": "compelling headline",
+            "body": "persuasive body copy",
+            "tone": "professional/casual/urgent"
+        }},
+        {{
+            "variation": 3,
+            "headline": "compelling headline",
+            "body": "persuasive body copy",
+            "tone": "professional/casual/urgent"
+        }}
+    ],
+    "platform_specific_ctas": {{
+        "linkedin": "CTA optimized for LinkedIn",
+        "email": "CTA optimized for Email campaigns",
+        "web": "CTA optimized for Website"
+    }},
+    "campaign_timeline": "suggested timeline in weeks",
+    "expected_kpis": {{
+        "click_through_rate": "estimated %",
+        "conversion_rate": "estimated %",
+        "lead_quality_score": "1-10 scale"
+    }}
+}}"""),
+    PromptTemplate("campaign_task", 1,
+                   "You are an expert B2B marketing strategist. Generate a structured marketing campaign.\n\n"
+                   "PRODUCT DETAILS:\n{product_details}\n\n"
+                   "TARGET LINKEDIN DEMOGRAPHICS:\n{linkedin_demographics}"),
+    PromptTemplate("pitch", 1, """You are an elite B2B sales strategist. Create a targeted sales pitch in VALID JSON format.
+
+PROSPECT PROFILE:
+- Title: {prospect_title}
+- Company Tier: {company_tier}
+{product_line}
+
+Generate ONLY valid JSON (no markdown) with this exact structure:
+{{
+    "elevator_pitch_30sec": "A concise, compelling 30-second pitch tailored to this prospect",
+    "pain_point_analysis": {{
+        "primary_pain": "main pain point for this role/company tier",
+        "secondary_pains": [
+            "pain point 2",
+            "pain point 3"
+        ]
+    }},
+    "differentiators": [
+        {{
+            "differentiator": "unique value proposition",
+            "benefits_for_role": "specific benefits for {prospect_title}",
+            "impact": "quantified business impact"
+        }},
+        {{
+            "differentiator": "unique value proposition",
+            "benefits_for_role": "specific benefits for {prospect_title}",
+            "impact": "quantified business impact"
+        }},
+        {{
+            "differentiator": "unique value proposition",
+            "benefits_for_role": "specific benefits for {prospect_title}",
+            "impact": "quantified business impact"
+        }}
+    ],
+    "strategic_cta": {{
+        "immediate_next_step": "What to ask/do immediately",
+        "suggested_angle": "How to position the next step",
+        "objection_handler": "How to handle likely objections"
+    }},
+    "discovery_questions": [
+        "question 1 to ask prospect",
+        "question 2 to ask prospect",
+        "question 3 to ask prospect"
+    ],
+    "social_proof_angles": [
+        "case study angle relevant to this prospect",
+        "testimonial angle relevant to this prospect"
+    ]
+}}"""),
+    PromptTemplate("pitch_task", 1,
+                   "You are an elite B2B sales strategist. Create a targeted sales pitch; benefits and impact "
+                   "should be specific to the role and quantified.\n\n"
+                   "PROSPECT PROFILE:\n- Title: {prospect_title}\n- Company Tier: {company_tier}\n{product_line}"),
+    PromptTemplate("lead_reasoning", 1, """As a sales analyst, provide a brief, actionable reasoning for this lead score.
+
+LEAD ATTRIBUTES:
+- Budget: {budget}
+- Timeline: {timeline}
+- Urgency Level: {urgency}
+{context_line}
+
+Calculate Lead Score: {lead_score}/100
+
+Provide ONLY valid JSON (no markdown) with this structure:
+{{
+    "lead_score": {lead_score},
+    "conversion_probability": {conversion_probability},
+    "reasoning": "1-2 sentence explanation of why this is a {lead_score}/100 lead",
+    "key_strengths": [
+        "strength 1",
+        "strength 2"
+    ],
+    "risk_factors": [
+        "risk 1",
+        "risk 2"
+    ],
+    "recommended_action": "specific next step for sales team",
+    "sales_strategy": "how to approach this lead"
+}}"""),
+    PromptTemplate("lead_reasoning_task", 1,
+                   "As a sales analyst, provide a brief, actionable reasoning (1-2 sentences) for this "
+                   "{lead_score}/100 lead with {conversion_probability}% conversion probability.\n\n"
+                   "LEAD ATTRIBUTES:\n- Budget: {budget}\n- Timeline: {timeline}\n- Urgency Level: {urgency}\n"
+                   "{context_line}"),
+
+    # ===================== NODE.JS PATTERN ENDPOINTS (app.py) =====================
+    PromptTemplate("campaign_role", 1, "Act as a LinkedIn Marketing Expert and Strategic Campaign Designer."),
+    PromptTemplate("pitch_role", 1, "Act as an Elite B2B Sales Architect and Sales Strategy Expert."),
+    PromptTemplate("lead_role", 1, "Act as a Sales Analyst and Lead Qualification Expert."),
+    PromptTemplate("lead_explanation", 1, """Explain this lead score in VALID JSON format.
+
+Lead Attributes:
+- Budget: {budget}
+- Timeline: {timeline}
+- Urgency: {urgency}
+- Calculated Score: {lead_score}/100
+
+Return ONLY valid JSON with this exact structure (no markdown wrapping, no extra text):
+{{
+    "lead_score": {lead_score},
+    "conversion_probability": "{conversion_probability}",
+    "reasoning": "1-2 sentence explanation of why this score",
+    "key_strengths": ["strength 1", "strength 2"],
+    "risk_factors": ["risk 1", "risk 2"],
+    "recommended_action": "specific next step to take",
+    "sales_strategy": "how to approach this lead"
+}}"""),
+)
+
+# Compiled once at import; shared by AIService, AsyncAIService and the app routes
+REGISTRY = PromptRegistry(TEMPLATES)
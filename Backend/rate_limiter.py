@@ -0,0 +1,242 @@
+"""
+Client-Side Rate Limiter
+Token buckets for the Groq requests-per-minute / tokens-per-minute quotas,
+with priority queuing and deadline shedding
+"""
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Lower rank is served first; FIFO within a rank
+PRIORITIES = {"interactive": 0, "default": 1, "batch": 2}
+
+# How often a queued async caller re-checks whether it has reached the head of the queue
+ASYNC_POLL_INTERVAL = 0.02
+
+_current_priority = contextvars.ContextVar("llm_request_priority", default="default")
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller waited past its deadline for quota (the request is shed)."""
+
+
+@contextmanager
+def request_priority(priority):
+    """Tags every upstream call made inside the block (this thread/task) with a priority."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}'")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority():
+    return _current_priority.get()
+
+
+class TokenBucket:
+    """Holds up to per_minute units and refills continuously at per_minute / 60 per second."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount units are available (0 when they already are)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # an oversized request waits for a full bucket, not forever
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Corrects an earlier estimate; the bucket may go into debt."""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class RateLimiter:
+    """
+    Enforces RPM and/or TPM budgets shared by the sync and async clients.
+
+    Callers queue in (priority, arrival) order and only the head of the queue may
+    draw from the buckets, so a burst of batch calls cannot starve an interactive
+    chat request that arrives later. A caller still queued after its priority's
+    max wait is removed and gets RateLimitExceeded instead of piling up latency.
+    """
+
+    def __init__(self, rpm=0, tpm=0, max_wait=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = {"interactive": 10.0, "default": 30.0, "batch": 120.0}
+        self.max_wait.update(max_wait or {})
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self.granted = {name: 0 for name in PRIORITIES}
+        self.shed = {name: 0 for name in PRIORITIES}
+        self.wait_seconds = 0.0
+
+    # ===================== QUEUE =====================
+    def _enqueue(self, priority):
+        ticket = (PRIORITIES[priority], next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            self._cond.notify_all()  # a waiting head may no longer be the head
+        return ticket
+
+    def _poll(self, ticket, tokens):
+        """
+        Called with the lock held. Grants and dequeues the ticket when it is at the head
+        and both buckets have room (returns 0.0); otherwise returns the suggested wait,
+        or None when another caller is ahead.
+        """
+        if self._queue[0] != ticket:
+            return None
+        now = time.monotonic()
+        wait = 0.0
+        if self._requests is not None:
+            wait = max(wait, self._requests.wait_time(1, now))
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None:
+            self._tokens.take(tokens)
+        heapq.heappop(self._queue)
+        self._cond.notify_all()
+        return 0.0
+
+    def _grant(self, priority, started):
+        self.granted[priority] += 1
+        self.wait_seconds += time.monotonic() - started
+
+    def _abandon(self, ticket):
+        """Drops a ticket whose caller stopped waiting (shed, interrupted or cancelled)."""
+        with self._cond:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def _shed(self, ticket, priority):
+        """Called with the lock held: drops the ticket and raises."""
+        self._queue.remove(ticket)
+        heapq.heapify(self._queue)
+        self._cond.notify_all()
+        self.shed[priority] += 1
+        raise RateLimitExceeded(
+            f"Rate limit queue wait exceeded {self.max_wait[priority]:.0f}s for {priority} request - shed")
+
+    # ===================== ACQUIRE =====================
+    def acquire(self, tokens=0, priority=None):
+        """Blocks until one request and `tokens` TPM units are available."""
+        priority = priority or current_priority()
+        started = time.monotonic()
+        deadline = started + self.max_wait[priority]
+        ticket = self._enqueue(priority)
+        try:
+            with self._cond:
+                while True:
+                    wait = self._poll(ticket, tokens)
+                    if wait == 0.0:
+                        self._grant(priority, started)
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._shed(ticket, priority)
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+        except BaseException:
+            # A dead ticket left at the head of the queue would block every later caller
+            self._abandon(ticket)
+            raise
+
+    async def acquire_async(self, tokens=0, priority=None):
+        """Async counterpart of acquire(); waits without blocking the event loop."""
+        priority = priority or current_priority()
+        started = time.monotonic()
+        deadline = started + self.max_wait[priority]
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._poll(ticket, tokens)
+                    if wait == 0.0:
+                        self._grant(priority, started)
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._shed(ticket, priority)
+                await asyncio.sleep(min(remaining, ASYNC_POLL_INTERVAL if wait is None else wait))
+        except BaseException:  # including asyncio.CancelledError
+            self._abandon(ticket)
+            raise
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Charges the difference between the TPM estimate and the reported usage."""
+        if self._tokens is None or actual_tokens is None:
+            return
+        with self._cond:
+            self._tokens.adjust(actual_tokens - estimated_tokens)
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            if self._requests is not None:
+                self._requests.wait_time(0, now)
+            if self._tokens is not None:
+                self._tokens.wait_time(0, now)
+            return {
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "requests_available": None if self._requests is None else int(self._requests.tokens),
+                "tokens_available": None if self._tokens is None else int(self._tokens.tokens),
+                "queued": len(self._queue),
+                "granted": dict(self.granted),
+                "shed": dict(self.shed),
+                "total_wait_seconds": round(self.wait_seconds, 2)
+            }
+
+
+def build_rate_limiter():
+    """
+    Builds the limiter configured in the environment, or None when both budgets are 0:
+        GROQ_RPM_LIMIT = requests per minute (default 0 = unlimited)
+        GROQ_TPM_LIMIT = tokens per minute (default 0 = unlimited)
+        GROQ_RATE_LIMIT_WORKERS = processes sharing the account's quota (e.g. gunicorn -w);
+            each process enforces RPM/TPM divided by this (default 1)
+        GROQ_RATE_WAIT_INTERACTIVE / _DEFAULT / _BATCH = max queue wait in seconds
+            before a request is shed (defaults 10 / 30 / 120)
+    """
+    rpm = int(os.getenv("GROQ_RPM_LIMIT", 0))
+    tpm = int(os.getenv("GROQ_TPM_LIMIT", 0))
+    if rpm <= 0 and tpm <= 0:
+        return None
+    # The buckets live in process memory, so N workers would otherwise send N x the quota
+    workers = max(1, int(os.getenv("GROQ_RATE_LIMIT_WORKERS", 1)))
+    rpm = max(1, rpm // workers) if rpm > 0 else 0
+    tpm = max(1, tpm // workers) if tpm > 0 else 0
+    return RateLimiter(rpm=rpm, tpm=tpm, max_wait={
+        "interactive": float(os.getenv("GROQ_RATE_WAIT_INTERACTIVE", 10)),
+        "default": float(os.getenv("GROQ_RATE_WAIT_DEFAULT", 30)),
+        "batch": float(os.getenv("GROQ_RATE_WAIT_BATCH", 120))
+    })
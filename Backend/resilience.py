@@ -0,0 +1,237 @@
+"""
+Upstream Resilience
+Retry with jittered exponential backoff and a circuit breaker for Groq calls
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+
+# 429 = rate limited, 5xx = upstream trouble; other 4xx (bad request, auth) are never retried
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, max_retry_after=30.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Delay before the next attempt (attempt = 1 for the first retry).
+        Full jitter: uniform(0, min(max_delay, base * 2^(attempt-1))). A server-supplied
+        Retry-After wins when it is longer, capped at max_retry_after.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+
+def parse_retry_after(value):
+    """Retry-After header -> seconds (supports delta-seconds and HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive upstream failures;
+    open -> half_open after reset_timeout seconds, letting one probe through;
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    def before_call(self):
+        """
+        Raises CircuitOpenError when the call must fail fast. Returns True when this call
+        is the half-open probe (the caller must end it with a record_* or release_probe()).
+        """
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.rejected_calls += 1
+                    raise CircuitOpenError("Groq upstream circuit is open - failing fast")
+                self._state = "half_open"
+                self._probe_in_flight = False
+            if self._state == "half_open":
+                if self._probe_in_flight:
+                    self.rejected_calls += 1
+                    raise CircuitOpenError("Groq upstream circuit is half-open - probe in flight")
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """
+        Frees the half-open probe slot after a call that ended without an upstream outcome
+        (cancelled, shed, or an unexpected error), so the next call can probe instead.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.times_opened += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def state(self):
+        with self._lock:
+            retry_in = 0.0
+            if self._state == "open":
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_seconds": round(retry_in, 1),
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected_calls
+            }
+
+
+def _next_delay(resp, policy, breaker, attempt):
+    """
+    Classifies a response. Returns None when it should go back to the caller
+    (success, non-retryable error, or attempts exhausted), else the backoff delay.
+    """
+    status = resp.status_code
+    if status >= 500:
+        breaker.record_failure()
+    else:
+        # 2xx/4xx (including 429) mean the upstream is up and answering
+        breaker.record_success()
+    if status not in RETRYABLE_STATUS or attempt >= policy.max_attempts:
+        return None
+    return policy.backoff(attempt, parse_retry_after(resp.headers.get("Retry-After")))
+
+
+def call_with_retries(send, policy, breaker, transport_errors, acquire=None):
+    """
+    Runs send() (returns an HTTP response) under the retry policy and circuit breaker.
+    The final response is returned as-is so the caller's raise_for_status() reports it.
+    Any other exception from send() is re-raised after releasing the breaker's probe slot.
+
+    acquire() (e.g. rate limiter budget) runs before each attempt, outside the breaker:
+    a long queue wait never holds the half-open probe and a shed request
+    (RateLimitExceeded) is not an upstream outcome.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if acquire is not None:
+            acquire()
+        probe = breaker.before_call()
+        try:
+            resp = send()
+        except transport_errors:
+            breaker.record_failure()
+            if attempt >= policy.max_attempts:
+                raise
+            time.sleep(policy.backoff(attempt))
+            continue
+        except BaseException:
+            if probe:
+                breaker.release_probe()
+            raise
+        delay = _next_delay(resp, policy, breaker, attempt)
+        if delay is None:
+            return resp
+        resp.close()
+        time.sleep(delay)
+
+
+async def call_with_retries_async(send, policy, breaker, transport_errors, acquire=None):
+    """Async counterpart of call_with_retries; send and acquire are coroutine functions."""
+    attempt = 0
+    while True:
+        attempt += 1
+        if acquire is not None:
+            await acquire()
+        probe = breaker.before_call()
+        try:
+            resp = await send()
+        except transport_errors:
+            breaker.record_failure()
+            if attempt >= policy.max_attempts:
+                raise
+            await asyncio.sleep(policy.backoff(attempt))
+            continue
+        except BaseException:  # including asyncio.CancelledError
+            if probe:
+                breaker.release_probe()
+            raise
+        delay = _next_delay(resp, policy, breaker, attempt)
+        if delay is None:
+            return resp
+        await asyncio.sleep(delay)
+
+
+def build_retry_policy():
+    """GROQ_MAX_ATTEMPTS, GROQ_BACKOFF_BASE, GROQ_BACKOFF_MAX, GROQ_RETRY_AFTER_MAX"""
+    return RetryPolicy(
+        max_attempts=int(os.getenv("GROQ_MAX_ATTEMPTS", 3)),
+        base_delay=float(os.getenv("GROQ_BACKOFF_BASE", 0.5)),
+        max_delay=float(os.getenv("GROQ_BACKOFF_MAX", 8.0)),
+        max_retry_after=float(os.getenv("GROQ_RETRY_AFTER_MAX", 30.0))
+    )
+
+
+def build_circuit_breaker():
+    """GROQ_BREAKER_THRESHOLD, GROQ_BREAKER_RESET_SECONDS"""
+    return CircuitBreaker(
+        failure_threshold=int(os.getenv("GROQ_BREAKER_THRESHOLD", 5)),
+        reset_timeout=float(os.getenv("GROQ_BREAKER_RESET_SECONDS", 30.0))
+    )
+
+
+def build_timeouts():
+    """
+    (connect, read) timeouts in seconds per call profile:
+        GROQ_CONNECT_TIMEOUT (5), GROQ_READ_TIMEOUT (30) for "default"/"chat",
+        GROQ_GENERATOR_READ_TIMEOUT (90) for the long generator hub completions.
+    """
+    connect = float(os.getenv("GROQ_CONNECT_TIMEOUT", 5))
+    read = float(os.getenv("GROQ_READ_TIMEOUT", 30))
+    return {
+        "default": (connect, read),
+        "chat": (connect, read),
+        "generator": (connect, float(os.getenv("GROQ_GENERATOR_READ_TIMEOUT", 90)))
+    }
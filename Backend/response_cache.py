@@ -0,0 +1,178 @@
+"""
+LLM Response Cache
+Content-addressed cache for deterministic Groq prompts with TTL and LRU eviction
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class MemoryCacheBackend:
+    """In-process LRU store (lost on restart)."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (value, expires_at) or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """On-disk LRU store that survives restarts."""
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            return row
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time()))
+            excess = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)", (excess,))
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    TTL cache keyed on (model, temperature, messages hash).
+    The backend decides where entries live; this class owns expiry and hit/miss stats.
+    """
+
+    def __init__(self, backend, ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, temperature, messages, response_format=None):
+        """Stable content address for a chat completion request."""
+        request = {"model": model, "temperature": temperature, "messages": messages}
+        if response_format is not None:
+            request["response_format"] = response_format  # only when set, so plain keys are unchanged
+        payload = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is not None and entry[1] < time.time():
+            self.backend.delete(key)
+            entry = None
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if entry is None else entry[0]
+
+    def set(self, key, value):
+        self.backend.set(key, value, time.time() + self.ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0
+        }
+
+
+def build_response_cache():
+    """
+    Builds the cache configured in the environment:
+        LLM_CACHE_BACKEND = memory (default) / sqlite / none
+        LLM_CACHE_TTL = seconds (default 3600)
+        LLM_CACHE_MAX_ENTRIES = entry bound for LRU eviction (default 1024)
+        LLM_CACHE_PATH = SQLite file (default Backend/llm_cache.sqlite3)
+    """
+    backend_name = os.getenv("LLM_CACHE_BACKEND", "memory").strip().lower()
+    if backend_name in ("none", "off", "disabled", ""):
+        return None
+
+    max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024))
+    if backend_name == "sqlite":
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+        backend = SQLiteCacheBackend(os.getenv("LLM_CACHE_PATH", default_path), max_entries)
+    elif backend_name == "memory":
+        backend = MemoryCacheBackend(max_entries)
+    else:
+        raise ValueError(f"Unknown LLM_CACHE_BACKEND: {backend_name}")
+
+    return ResponseCache(backend, ttl=int(os.getenv("LLM_CACHE_TTL", 3600)))
@@ -2,3 +2,69 @@
 Routes Package
 Contains all Flask Blueprint definitions for AI modules
 """
+import json
+from typing import Optional, TYPE_CHECKING
+from flask import Response, current_app
+
+if TYPE_CHECKING:
+    from async_ai_service import AsyncAIService
+    from job_queue import JobQueue
+
+
+def current_ai_service() -> 'AsyncAIService':
+    """The AsyncAIService of the app handling this request (built on first use)."""
+    return current_app.extensions['ai_services'].async_ai
+
+
+def current_job_queue(start=True) -> Optional['JobQueue']:
+    """
+    The job queue of the app handling this request, started on first use; None when the
+    jobs module is not enabled (or, with start=False, when no request has started it yet).
+    """
+    services = current_app.extensions['ai_services']
+    return services.job_queue() if start else services.jobs
+
+
+def cache_allowed(req, data=None):
+    """
+    Per-request response cache bypass.
+    Callers skip the LLM response cache with `"no_cache": true` in the JSON body
+    or a `Cache-Control: no-cache` request header.
+    """
+    if data and data.get('no_cache'):
+        return False
+    return 'no-cache' not in req.headers.get('Cache-Control', '').lower()
+
+
+def wants_stream(req, data=None):
+    """True when the caller asked for Server-Sent Events (`"stream": true`, ?stream=true or Accept)."""
+    if data and data.get('stream') in (True, 'true', '1', 1):
+        return True
+    if req.args.get('stream', '').lower() in ('true', '1'):
+        return True
+    return 'text/event-stream' in req.headers.get('Accept', '')
+
+
+def wants_async(req, data=None):
+    """True when the caller asked for job mode (`"async": true`, ?async=true or `Prefer: respond-async`)."""
+    if data and data.get('async') in (True, 'true', '1', 1):
+        return True
+    if req.args.get('async', '').lower() in ('true', '1'):
+        return True
+    return 'respond-async' in req.headers.get('Prefer', '').lower()
+
+
+def sse_response(events):
+    """
+    Streams (event, data) tuples from an AIService *_stream method as Server-Sent Events.
+    Upstream failures after the stream has started are reported as an "error" event.
+    """
+    def generate():
+        try:
+            for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -3,23 +3,12 @@
 Conversational assistant for customer inquiries
 """
 from flask import Blueprint, request, jsonify
-from typing import Optional, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from ai_service import AIService
+from routes import current_ai_service, wants_stream, sse_response
 
 chatbot_bp = Blueprint('chatbot', __name__, url_prefix='/api/chat')
 
-# AI service dependency - will be injected by app.py
-ai_service: Optional['AIService'] = None
-
-def set_ai_service(service):
-    """Inject the AI service instance"""
-    global ai_service
-    ai_service = service
-
 @chatbot_bp.route('', methods=['POST'])
-def chat():
+async def chat():
     """
     POST /api/chat
     24/7 AI chatbot for customer inquiries
@@ -27,23 +16,48 @@ def chat():
     Expected JSON:
     {
         "message": string,
-        "history": [optional list of previous messages]
+        "history": [optional list of previous messages],
+        "session_id": optional string (server-side history; null starts a new session),
+        "stream": optional bool
     }
     
     Returns:
     {
         "response": string,
-        "status": "success/error"
+        "status": "success/error",
+        "session_id": string (session requests only)
     }
+    or, with "stream": true, Server-Sent Events: "token" events ({"delta": string})
+    followed by a "done" event carrying the response object above
     """
-    assert ai_service is not None, "AI service not initialized"
+    ai_service = current_ai_service()
     try:
         data = request.get_json()
         if not data or 'message' not in data:
             return jsonify({'error': 'Missing message field'}), 400
         
+        # Server-side session: the client sends only the new message
+        if 'session_id' in data:
+            if wants_stream(request, data):
+                return sse_response(ai_service.ai_chat_session_stream(data['session_id'], data['message']))
+            result = await ai_service.ai_chat_session_response(data['session_id'], data['message'])
+            return jsonify(result), 200
+        
         history = data.get('history', [])
-        result = ai_service.ai_chat_response(data['message'], history)
+        if wants_stream(request, data):
+            return sse_response(ai_service.ai_chat_response_stream(data['message'], history))
+        
+        result = await ai_service.ai_chat_response(data['message'], history)
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'response': str(e), 'status': 'error'}), 500
+
+@chatbot_bp.route('/session/<session_id>', methods=['DELETE'])
+async def end_session(session_id):
+    """
+    DELETE /api/chat/session/<session_id>
+    Discards a server-side chat session
+    """
+    ai_service = current_ai_service()
+    await ai_service.end_chat_session(session_id)
+    return jsonify({'status': 'success'}), 200
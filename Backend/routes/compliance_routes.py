@@ -2,31 +2,27 @@
 Compliance & Risk Monitoring Module
 Checks marketing text for legal, GDPR, and claim risks
 """
-from flask import Blueprint, request, jsonify
-from typing import Optional, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from ai_service import AIService
+import os
+import json
+from flask import Blueprint, Response, request, jsonify
+from routes import current_ai_service, cache_allowed
+from batch_io import records_from_request, int_option
+from compliance_scan import assets_from_records, default_workers, CHUNK_SIZE
 
 compliance_bp = Blueprint('compliance', __name__, url_prefix='/api/compliance')
 
-# AI service dependency - will be injected by app.py
-ai_service: Optional['AIService'] = None
-
-def set_ai_service(service):
-    """Inject the AI service instance"""
-    global ai_service
-    ai_service = service
-
 @compliance_bp.route('/check', methods=['POST'])
-def compliance_check():
+async def compliance_check():
     """
     POST /api/compliance/check
     Analyzes marketing text for compliance risks (GDPR, claims, legal issues)
     
     Expected JSON:
     {
-        "marketing_text": string
+        "marketing_text": string,
+        "review": optional bool (true = always ask the LLM, false = rules only;
+                  default: LLM review only when a rule fires),
+        "no_cache": optional bool (skip the LLM response cache)
     }
     
     Returns:
@@ -34,16 +30,70 @@ def compliance_check():
         "risk_level": "low/medium/high",
         "flagged_phrases": [list],
         "suggestions": [list],
-        "gdpr_compliant": bool
+        "gdpr_compliant": bool,
+        "matches": [{"rule", "category", "severity", "phrase", "start", "end"}],
+        "path": "rules/llm"
     }
     """
-    assert ai_service is not None, "AI service not initialized"
+    ai_service = current_ai_service()
     try:
         data = request.get_json()
         if not data or 'marketing_text' not in data:
             return jsonify({'error': 'Missing marketing_text field'}), 400
+        if not isinstance(data['marketing_text'], str):
+            return jsonify({'error': 'marketing_text must be a string'}), 400
         
-        result = ai_service.compliance_check(data['marketing_text'])
+        review = data.get('review')
+        result = await ai_service.compliance_check(data['marketing_text'], use_cache=cache_allowed(request, data),
+                                                   review=None if review is None else bool(review))
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@compliance_bp.route('/check/batch', methods=['POST'])
+def compliance_check_batch():
+    """
+    POST /api/compliance/check/batch
+    Rules-only scan of many marketing texts, streamed back as JSONL in input order
+    
+    Expected input (one of):
+    - NDJSON body (application/x-ndjson): one {"id", "text"} object (or JSON string) per line
+    - JSON array of strings or objects, or {"assets": [...], ...options}
+    - CSV upload in the "file" field, or a text/csv body (options as query parameters)
+    
+    Options:
+    - text_field: field holding the text (default: text, marketing_text, copy, body or content)
+    - workers: chunks scanned at once on the app's shared process pool (default COMPLIANCE_SCAN_WORKERS;
+      1 = in this process)
+    - chunk_size: assets per task (default 200)
+    
+    Returns:
+    One line per asset: id, risk_level, flagged_phrases, suggestions, gdpr_compliant,
+    matches (with offsets), rules_version - or id + error when the text is missing
+    """
+    ai_service = current_ai_service()
+    try:
+        try:
+            if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+                options = dict(request.args)
+                records = []
+                for number, line in enumerate(request.get_data(as_text=True).splitlines(), 1):
+                    if line.strip():
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            raise ValueError(f"Line {number} is not valid JSON")
+            else:
+                records, options = records_from_request(request, 'assets')
+            workers = int_option(options, 'workers', default_workers(), minimum=1, maximum=os.cpu_count() or 1)
+            chunk_size = int_option(options, 'chunk_size', CHUNK_SIZE, minimum=1, maximum=10000)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not records:
+            return jsonify({'error': 'No assets provided'}), 400
+        
+        assets = assets_from_records(records, options.get('text_field'))
+        return Response(ai_service.compliance_check_batch(assets, workers, chunk_size),
+                        mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
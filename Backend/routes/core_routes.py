@@ -0,0 +1,55 @@
+"""
+Core Module
+Dashboard pages and the platform health check (always registered)
+"""
+from flask import Blueprint, render_template, jsonify
+from routes import current_ai_service, current_job_queue
+
+core_bp = Blueprint('core', __name__)
+
+@core_bp.route('/')
+def home():
+    """Landing page / dashboard redirect"""
+    return render_template('index.html')
+
+@core_bp.route('/dashboard')
+def dashboard():
+    """Main dashboard with all 6 AI modules"""
+    return render_template('index.html')
+
+@core_bp.route('/generator-hub-test')
+def generator_hub_test():
+    """Testing interface for Generator Hub modules"""
+    return render_template('generator_hub_test.html')
+
+@core_bp.route('/api/health', methods=['GET'])
+def health():
+    """
+    GET /api/health
+    Health check with the upstream circuit state and per-component stats
+    ("jobs" is null until a request has used the job queue)
+    """
+    ai_service = current_ai_service()
+    ai = ai_service.ai
+    circuit = ai.circuit_breaker.state()
+    jobs = current_job_queue(start=False)
+    index = ai.current_product_index()
+    return jsonify({
+        'status': 'healthy' if circuit['state'] == 'closed' else 'degraded',
+        'message': 'AI Platform is running',
+        'upstream_circuit': circuit,
+        'rate_limiter': ai.rate_limiter.stats() if ai.rate_limiter is not None else None,
+        'prompt_savings': ai.prompt_savings_stats(),
+        'sentiment_paths': ai.sentiment_path_stats(),
+        'compliance_rules': ai.compliance_stats(),
+        'micro_batching': ai.micro_batch_stats(),
+        'product_index': index.stats() if index is not None else None,
+        'segment_cache': ai.segment_stats(),
+        'prompt_templates': ai.prompts.stats(),
+        'jobs': jobs.stats() if jobs is not None else None,
+        'connection_pool': ai.connection_stats(),
+        'async_client': ai_service.connection_stats(),
+        'response_cache': ai.cache.stats() if ai.cache else None,
+        'single_flight': ai.single_flight.stats() if ai.single_flight else None,
+        'chat_sessions': ai.chat_sessions.stats()
+    }), 200
@@ -0,0 +1,327 @@
+"""
+Generator Hub Module
+Marketing campaign, sales pitch and lead scoring generators, plus the MarketMind
+(Node.js pattern) system-prompt endpoints
+"""
+from flask import Blueprint, request, jsonify
+from routes import current_ai_service, wants_stream, wants_async, sse_response
+from routes.job_routes import job_accepted
+from batch_io import records_from_request, int_option
+from lead_scoring import parse_budget_value
+
+generator_bp = Blueprint('generator', __name__)
+
+def lead_batch_result(results, top_n):
+    return {'count': len(results), 'reasoned': min(top_n, len(results)), 'leads': results}
+
+@generator_bp.route('/api/generator/marketing-campaign', methods=['POST'])
+async def generator_marketing_campaign():
+    """
+    AI Marketing Strategist Endpoint
+    Generates comprehensive marketing campaign strategy
+    Send "stream": true (or ?stream=true) to receive Server-Sent Events
+    Send "async": true (or ?async=true) to get a job id immediately (202) and fetch the
+    result from /api/jobs/<job_id> or /api/jobs/<job_id>/events
+    """
+    ai_service = current_ai_service()
+    try:
+        data = request.get_json()
+        if not data or 'product_details' not in data or 'linkedin_demographics' not in data:
+            return jsonify({'error': 'Missing required fields: product_details, linkedin_demographics'}), 400
+        
+        if wants_async(request, data):
+            return job_accepted('marketing_campaign', {
+                'product_details': data['product_details'],
+                'linkedin_demographics': data['linkedin_demographics']
+            })
+        
+        if wants_stream(request, data):
+            return sse_response(ai_service.generate_marketing_campaign_strategy_stream(
+                data['product_details'],
+                data['linkedin_demographics']
+            ))
+        
+        result = await ai_service.generate_marketing_campaign_strategy(
+            data['product_details'],
+            data['linkedin_demographics']
+        )
+        return jsonify({'result': result}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@generator_bp.route('/api/generator/sales-pitch', methods=['POST'])
+async def generator_sales_pitch():
+    """
+    B2B Sales Pitch Architect Endpoint
+    Generates personalized sales pitch based on prospect profile
+    Send "stream": true (or ?stream=true) to receive Server-Sent Events
+    Send "async": true (or ?async=true) to run it as a background job (see /api/jobs)
+    """
+    ai_service = current_ai_service()
+    try:
+        data = request.get_json()
+        if not data or 'prospect_title' not in data or 'company_tier' not in data:
+            return jsonify({'error': 'Missing required fields: prospect_title, company_tier'}), 400
+        
+        if wants_async(request, data):
+            return job_accepted('sales_pitch', {
+                'prospect_title': data['prospect_title'],
+                'company_tier': data['company_tier'],
+                'product_info': data.get('product_info', '')
+            })
+        
+        if wants_stream(request, data):
+            return sse_response(ai_service.generate_sales_pitch_stream(
+                data['prospect_title'],
+                data['company_tier'],
+                data.get('product_info', '')
+            ))
+        
+        result = await ai_service.generate_sales_pitch(
+            data['prospect_title'],
+            data['company_tier'],
+            data.get('product_info', '')
+        )
+        return jsonify({'result': result}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@generator_bp.route('/api/generator/lead-score', methods=['POST'])
+async def generator_lead_score():
+    """
+    Intelligent Lead Scorer Endpoint
+    Calculates lead score and provides reasoning
+    Send "stream": true (or ?stream=true) to receive Server-Sent Events
+    Send "async": true (or ?async=true) to run it as a background job (see /api/jobs)
+    """
+    ai_service = current_ai_service()
+    try:
+        data = request.get_json()
+        if not data or 'budget' not in data or 'timeline' not in data or 'urgency' not in data:
+            return jsonify({'error': 'Missing required fields: budget, timeline, urgency'}), 400
+        
+        if wants_async(request, data):
+            return job_accepted('lead_score', {
+                'budget': data['budget'],
+                'timeline': data['timeline'],
+                'urgency': data['urgency'],
+                'additional_context': data.get('additional_context', '')
+            })
+        
+        if wants_stream(request, data):
+            return sse_response(ai_service.intelligent_lead_score_stream(
+                data['budget'],
+                data['timeline'],
+                data['urgency'],
+                data.get('additional_context', '')
+            ))
+        
+        result = await ai_service.intelligent_lead_score(
+            data['budget'],
+            data['timeline'],
+            data['urgency'],
+            data.get('additional_context', '')
+        )
+        return jsonify({'result': result}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@generator_bp.route('/api/generator/lead-score/batch', methods=['POST'])
+async def generator_lead_score_batch():
+    """
+    Batch Intelligent Lead Scorer Endpoint
+    Scores a whole lead list with the vectorized deterministic scorer.
+    LLM reasoning is optional and generated for the top-N leads only.
+    
+    Request body (JSON):
+    {
+        "leads": [{"budget": ..., "timeline": ..., "urgency": ..., "additional_context": optional}, ...],
+        "reasoning_top_n": 0,
+        "max_concurrency": 4
+    }
+    or a CSV upload ("file" field or text/csv body) with budget,timeline,urgency columns
+    and reasoning_top_n / max_concurrency as query parameters.
+    Add "async": true (or ?async=true) to run it as a background job (see /api/jobs).
+    """
+    ai_service = current_ai_service()
+    try:
+        try:
+            leads, options = records_from_request(request, 'leads')
+            top_n = int_option(options, 'reasoning_top_n', 0, maximum=200)
+            max_concurrency = int_option(options, 'max_concurrency', 4, minimum=1, maximum=16)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not leads:
+            return jsonify({'error': 'No leads provided'}), 400
+        if not all(isinstance(lead, dict) for lead in leads):
+            return jsonify({'error': 'Each lead must be an object'}), 400
+        
+        if wants_async(request, options):
+            return job_accepted('lead_score_batch', {
+                'leads': leads, 'reasoning_top_n': top_n, 'max_concurrency': max_concurrency
+            })
+        
+        results = await ai_service.intelligent_lead_score_batch(leads, top_n, max_concurrency)
+        return jsonify({'result': lead_batch_result(results, top_n)}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== NEW ENDPOINTS: NODE.JS PATTERN (MarketMind AI Hub) ====================
+
+@generator_bp.route('/api/generate-campaign', methods=['POST'])
+async def generate_campaign():
+    """
+    Marketing Strategy Endpoint (Node.js Pattern)
+    Generates comprehensive campaign strategy using system prompt + user prompt.
+    
+    Request body:
+    {
+        "productDetails": "Your product description",
+        "audience": "Target audience description"
+    }
+    """
+    ai_service = current_ai_service()
+    try:
+        data = request.get_json()
+        if not data or 'productDetails' not in data or 'audience' not in data:
+            return jsonify({'error': 'Missing required fields: productDetails, audience'}), 400
+        
+        product_details = data['productDetails']
+        audience = data['audience']
+        
+        # System prompt (role-based) + the canonical campaign template shared with the Generator Hub
+        system_prompt = ai_service.ai.prompts.render('campaign_role')
+        user_prompt = ai_service.ai.prompts.render('campaign', product_details=product_details,
+                                                   linkedin_demographics=audience)
+        
+        # Call centralized LLM handler
+        result = await ai_service.call_llm_with_system_prompt(system_prompt, user_prompt)
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@generator_bp.route('/api/generate-pitch', methods=['POST'])
+async def generate_pitch():
+    """
+    Sales Pitch Endpoint (Node.js Pattern)
+    Generates personalized B2B sales pitch using system prompt + user prompt.
+    
+    Request body:
+    {
+        "title": "Prospect job title",
+        "companyTier": "Fortune 500 / Large Enterprise / Mid-Market / Small Business / Startup"
+    }
+    """
+    ai_service = current_ai_service()
+    try:
+        data = request.get_json()
+        if not data or 'title' not in data or 'companyTier' not in data:
+            return jsonify({'error': 'Missing required fields: title, companyTier'}), 400
+        
+        title = data['title']
+        company_tier = data['companyTier']
+        
+        # System prompt (role-based) + the canonical pitch template shared with the Generator Hub
+        system_prompt = ai_service.ai.prompts.render('pitch_role')
+        user_prompt = ai_service.ai.prompts.render('pitch', prospect_title=title, company_tier=company_tier,
+                                                   product_line='')
+        
+        # Call centralized LLM handler
+        result = await ai_service.call_llm_with_system_prompt(system_prompt, user_prompt)
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@generator_bp.route('/api/score-lead', methods=['POST'])
+async def score_lead():
+    """
+    Lead Scorer Endpoint (Node.js Pattern)
+    Hybrid scoring: Deterministic algorithm + AI reasoning.
+    
+    Request body:
+    {
+        "budget": "Budget amount (e.g., '$50000', '1.5M')",
+        "timeline": "Immediate / This Month / This Quarter / This Year / Next Year",
+        "urgency": "High / Medium / Low"
+    }
+    """
+    ai_service = current_ai_service()
+    try:
+        data = request.get_json()
+        if not data or 'budget' not in data or 'timeline' not in data or 'urgency' not in data:
+            return jsonify({'error': 'Missing required fields: budget, timeline, urgency'}), 400
+        if isinstance(data['budget'], bool) or not isinstance(data['budget'], (str, int, float)):
+            return jsonify({'error': 'budget must be a string or a number'}), 400
+        if not isinstance(data['timeline'], str) or not isinstance(data['urgency'], str):
+            return jsonify({'error': 'timeline and urgency must be strings'}), 400
+        
+        budget = data['budget']
+        timeline = data['timeline']
+        urgency = data['urgency']
+        
+        # DETERMINISTIC SCORING (Hard-coded logic matching Node.js pattern)
+        score = 0
+        
+        # Budget scoring (simplified vs detailed in Python version)
+        try:
+            # Extract numeric value from budget string
+            budget_value = parse_budget_value(budget, expand_suffixes=False)
+            if budget_value >= 50000:
+                score += 40
+            elif budget_value >= 10000:
+                score += 25
+            else:
+                score += 10
+        except Exception:
+            score += 15  # Default if parsing fails
+        
+        # Timeline scoring
+        timeline_lower = timeline.lower()
+        if "immediate" in timeline_lower or "this week" in timeline_lower:
+            score += 30
+        elif "this month" in timeline_lower:
+            score += 25
+        elif "this quarter" in timeline_lower:
+            score += 15
+        elif "this year" in timeline_lower:
+            score += 10
+        else:
+            score += 5
+        
+        # Urgency scoring
+        urgency_lower = urgency.lower()
+        if "high" in urgency_lower:
+            score += 30
+        elif "medium" in urgency_lower:
+            score += 15
+        else:
+            score += 5
+        
+        # Cap score at 100
+        score = min(score, 100)
+        
+        # Calculate conversion probability (matching Node.js pattern)
+        conversion_probability = f"{int(score * 0.9)}%"
+        
+        # AI REASONING (LLM explains the score)
+        system_prompt = ai_service.ai.prompts.render('lead_role')
+        reasoning_prompt = ai_service.ai.prompts.render('lead_explanation', budget=budget, timeline=timeline,
+                                                        urgency=urgency, lead_score=score,
+                                                        conversion_probability=conversion_probability)
+        
+        # Get AI reasoning
+        ai_response = await ai_service.call_llm_with_system_prompt(system_prompt, reasoning_prompt)
+        
+        # Return combined response
+        return jsonify({
+            'status': 'success',
+            'data': ai_response.get('data', {
+                'lead_score': score,
+                'conversion_probability': conversion_probability,
+                'reasoning': 'Lead scored based on budget, timeline, and urgency',
+                'recommended_action': 'Schedule discovery call'
+            })
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
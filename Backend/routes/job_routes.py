@@ -0,0 +1,49 @@
+"""
+Background Jobs Module
+Status polling and Server-Sent Events for generator requests submitted in job mode
+"""
+from flask import Blueprint, jsonify
+from routes import current_job_queue, sse_response
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+# Suggested delay between status polls while a job is unfinished
+POLL_AFTER_SECONDS = 2
+
+def job_accepted(kind, payload):
+    """Queues a job and returns the 202 response pointing at its status and event stream."""
+    job_queue = current_job_queue()
+    assert job_queue is not None, "Job queue not initialized"
+    job_id = job_queue.submit(kind, payload)
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}',
+        'events_url': f'/api/jobs/{job_id}/events'
+    }), 202, {'Location': f'/api/jobs/{job_id}'}
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    GET /api/jobs/<job_id>
+    Job status; includes "result" once succeeded or "error" once failed
+    """
+    job_queue = current_job_queue()
+    assert job_queue is not None, "Job queue not initialized"
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    headers = {} if job['status'] in ('succeeded', 'failed') else {'Retry-After': str(POLL_AFTER_SECONDS)}
+    return jsonify(job), 200, headers
+
+@jobs_bp.route('/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    GET /api/jobs/<job_id>/events
+    Server-Sent Events: "status" while queued/running, then "done" or "error" with the job
+    """
+    job_queue = current_job_queue()
+    assert job_queue is not None, "Job queue not initialized"
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return sse_response(job_queue.events(job_id))
@@ -0,0 +1,29 @@
+"""
+Legacy Form Module
+Form-encoded campaign, pitch and lead endpoints kept for backward compatibility
+"""
+from flask import Blueprint, request, jsonify
+from routes import current_ai_service
+
+legacy_bp = Blueprint('legacy', __name__, url_prefix='/api')
+
+@legacy_bp.route('/campaign', methods=['POST'])
+async def campaign():
+    ai_service = current_ai_service()
+    data = request.form
+    result = await ai_service.generate_campaign(data['product'], data['audience'], data['platform'])
+    return jsonify({'result': result})
+
+@legacy_bp.route('/pitch', methods=['POST'])
+async def pitch():
+    ai_service = current_ai_service()
+    data = request.form
+    result = await ai_service.generate_pitch(data['product'], data['customer'])
+    return jsonify({'result': result})
+
+@legacy_bp.route('/score', methods=['POST'])
+async def score():
+    ai_service = current_ai_service()
+    data = request.form
+    result = await ai_service.score_lead(data['name'], data['budget'], data['need'], data['urgency'])
+    return jsonify({'result': result})
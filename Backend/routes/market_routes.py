@@ -2,52 +2,133 @@
 Market & Competitive Intelligence Module
 Analyzes customer sentiment and competitor benchmarking
 """
-from flask import Blueprint, request, jsonify
-from typing import Optional, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from ai_service import AIService
+import json
+import time
+from flask import Blueprint, Response, request, jsonify
+from routes import current_ai_service, cache_allowed, wants_stream, sse_response
+from batch_io import records_from_request, int_option
+from sentiment_lexicon import stream_sentiment_rows
 
 market_bp = Blueprint('market', __name__, url_prefix='/api/market')
 
-# AI service dependency - will be injected by app.py
-ai_service: Optional['AIService'] = None
-
-def set_ai_service(service):
-    """Inject the AI service instance"""
-    global ai_service
-    ai_service = service
-
 @market_bp.route('/sentiment', methods=['POST'])
-def sentiment_analysis():
+async def sentiment_analysis():
     """
     POST /api/market/sentiment
     Analyzes customer feedback sentiment and confidence
+    Confident cases are scored locally ("path": "lexicon"); send "fast_path": false to force the LLM
     """
-    assert ai_service is not None, "AI service not initialized"
+    ai_service = current_ai_service()
     try:
         data = request.get_json()
         if not data or 'feedback' not in data:
             return jsonify({'error': 'Missing feedback field'}), 400
         
-        result = ai_service.analyze_sentiment(data['feedback'])
+        fast_path = data.get('fast_path')
+        result = await ai_service.analyze_sentiment(data['feedback'], use_cache=cache_allowed(request, data),
+                                                    fast_path=None if fast_path is None else bool(fast_path))
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+TEXT_COLUMNS = ('feedback', 'text', 'review')
+
+@market_bp.route('/sentiment/batch', methods=['POST'])
+async def sentiment_batch():
+    """
+    POST /api/market/sentiment/batch
+    Scores a whole feedback export with the vectorized lexicon scorer and streams the results back
+    
+    Expected input (one of):
+    - JSON array of strings or of {"id", "feedback"} rows
+    - JSON object {"reviews": [...], "escalate_limit": 0, "max_concurrency": 4}
+    - CSV upload in the "file" field, or a text/csv body (options as query parameters)
+    
+    Options:
+    - text_column: column holding the text (default: feedback, text or review)
+    - escalate_limit: how many ambiguous rows (least confident first) go to the LLM (default 0, max 200)
+    - max_concurrency: parallel LLM calls for escalated rows (default 4)
+    - format (query): "ndjson" (default) or "csv"
+    
+    Returns:
+    One row per review: id, sentiment, confidence, score, path ("lexicon"/"llm"), ambiguous
+    """
+    ai_service = current_ai_service()
+    try:
+        try:
+            reviews, options = records_from_request(request, 'reviews')
+            escalate_limit = int_option(options, 'escalate_limit', 0, maximum=200)
+            max_concurrency = int_option(options, 'max_concurrency', 4, minimum=1, maximum=16)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not reviews:
+            return jsonify({'error': 'No reviews provided'}), 400
+        
+        if isinstance(reviews[0], dict):
+            column = options.get('text_column') or next((c for c in TEXT_COLUMNS if c in reviews[0]), None)
+            if column is None:
+                return jsonify({'error': f'Missing text column. Expected one of: {list(TEXT_COLUMNS)}'}), 400
+            texts = [row.get(column) or '' for row in reviews]
+            ids = [row.get('id', i) for i, row in enumerate(reviews)]
+        else:
+            texts = [str(review) for review in reviews]
+            ids = list(range(len(reviews)))
+        
+        result = await ai_service.analyze_sentiment_batch(texts, escalate_limit, max_concurrency)
+        output_format = 'csv' if request.args.get('format') == 'csv' else 'ndjson'
+        mimetype = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+        return Response(stream_sentiment_rows(ids, result, output_format), mimetype=mimetype)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+MAX_BRANDS = 500
+
+def benchmark_events(results):
+    """(event, data) pairs for sse_response: one "result" per brand, then a "done" summary."""
+    started = time.perf_counter()
+    count = cached = errors = 0
+    for entry in results:
+        count += 1
+        cached += entry['cached']
+        errors += 'error' in entry
+        yield 'result', entry
+    yield 'done', {'brands': count, 'cached': cached, 'errors': errors,
+                   'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}
+
 @market_bp.route('/benchmark', methods=['POST'])
-def competitor_benchmark():
+async def competitor_benchmark():
     """
     POST /api/market/benchmark
     Benchmarks competitor market position and trends
+    
+    Send {"brands": [...], "max_concurrency": 8} to benchmark many brands concurrently.
+    Each brand is streamed back as soon as it completes (NDJSON, or SSE "result" events and
+    a "done" summary with "stream": true) with its index, result, elapsed_ms and whether
+    the response cache answered it.
     """
-    assert ai_service is not None, "AI service not initialized"
+    ai_service = current_ai_service()
     try:
         data = request.get_json()
+        if data and 'brands' in data:
+            brands = data['brands']
+            if not isinstance(brands, list) or not brands or not all(isinstance(b, str) and b.strip() for b in brands):
+                return jsonify({'error': 'brands must be a non-empty list of brand names'}), 400
+            if len(brands) > MAX_BRANDS:
+                return jsonify({'error': f'At most {MAX_BRANDS} brands per request'}), 400
+            try:
+                max_concurrency = int_option(data, 'max_concurrency', 8, minimum=1, maximum=32)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            results = ai_service.competitor_benchmark_many(brands, max_concurrency, use_cache=cache_allowed(request, data))
+            if wants_stream(request, data):
+                return sse_response(benchmark_events(results))
+            return Response((json.dumps(entry) + '\n' for entry in results), mimetype='application/x-ndjson')
+        
         if not data or 'brand' not in data:
             return jsonify({'error': 'Missing brand field'}), 400
         
-        result = ai_service.competitor_benchmark(data['brand'])
+        result = await ai_service.competitor_benchmark(data['brand'], use_cache=cache_allowed(request, data))
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
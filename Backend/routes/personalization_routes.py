@@ -3,27 +3,25 @@ Advanced Personalization Engine Module
 AI-powered product recommendations based on user profile
 """
 from flask import Blueprint, request, jsonify
-from typing import Optional, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from ai_service import AIService
+from routes import current_ai_service
+from batch_io import records_from_request, int_option
+from product_index import DEFAULT_DIM
+from segment_cache import validate_segments
+from routes.job_routes import job_accepted
 
 personalization_bp = Blueprint('personalization', __name__, url_prefix='/api/personalize')
 
-# AI service dependency - will be injected by app.py
-ai_service: Optional['AIService'] = None
-
-def set_ai_service(service):
-    """Inject the AI service instance"""
-    global ai_service
-    ai_service = service
-
 @personalization_bp.route('', methods=['POST'])
-def personalize():
+async def personalize():
     """
     POST /api/personalize
     Generates AI-powered product recommendations
     
+    When a catalog has been indexed (POST /api/personalize/catalog), the profile retrieves
+    the closest products and the LLM only ranks and explains those candidates.
+    Profiles that only name a role, industry and company size are answered from the
+    precomputed segment table (see /api/personalize/segments/refresh).
+    
     Expected JSON:
     {
         "user_profile": string or dict (user information)
@@ -35,18 +33,97 @@ def personalize():
             {
                 "name": string,
                 "reason": string,
-                "priority": "high/medium/low"
+                "priority": "high/medium/low",
+                "id": string, "score": float (catalog only)
             }
-        ]
+        ],
+        "catalog": {"version": string, "candidates": int, "ranked_by": "llm/retrieval"} (catalog only),
+        "segment": "role/industry/size" (profiles that only describe a segment; served precomputed)
     }
     """
-    assert ai_service is not None, "AI service not initialized"
+    ai_service = current_ai_service()
     try:
         data = request.get_json()
         if not data or 'user_profile' not in data:
             return jsonify({'error': 'Missing user_profile field'}), 400
         
-        result = ai_service.recommend_products(data['user_profile'])
+        result = await ai_service.recommend_products(data['user_profile'])
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@personalization_bp.route('/catalog', methods=['POST'])
+async def personalize_catalog():
+    """
+    POST /api/personalize/catalog
+    Replaces the product catalog used for recommendations and rebuilds the product index
+    
+    Expected input (one of):
+    - JSON array of products, or {"products": [...], "dim": 2048}
+    - CSV upload in the "file" field, or a text/csv body (options as query parameters)
+    
+    Product fields: name (required), id, category, tags, description
+    
+    Returns:
+    {
+        "path": string, "products": int, "dim": int, "version": string, "matrix_mb": float
+    }
+    """
+    ai_service = current_ai_service()
+    try:
+        try:
+            products, options = records_from_request(request, 'products')
+            dim = int_option(options, 'dim', DEFAULT_DIM, minimum=64, maximum=65536)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not products:
+            return jsonify({'error': 'No products provided'}), 400
+        
+        return jsonify(ai_service.rebuild_product_index(products, dim)), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@personalization_bp.route('/segments/refresh', methods=['POST'])
+async def refresh_segments():
+    """
+    POST /api/personalize/segments/refresh
+    Queues a background job that precomputes segment recommendations (see /api/jobs)
+    
+    Expected JSON (all optional):
+    {
+        "segments": ["sales/saas/mid", ...] (default: every stored segment that is stale or
+                    was requested but never computed),
+        "include_known": bool (also every known role/industry/size segment not stored yet),
+        "force": bool (recompute the listed segments even if fresh),
+        "max_concurrency": int (1-16, default 4)
+    }
+    
+    Returns:
+    202 {"job_id", "status_url", "events_url"}; the job result is
+    {"segments", "refreshed", "failed", "seconds", "fingerprint"}
+    409 when the segment cache is disabled (SEGMENT_CACHE_BACKEND=none)
+    """
+    ai_service = current_ai_service()
+    try:
+        if ai_service.ai.segment_store is None:
+            return jsonify({'error': 'Segment cache is disabled (SEGMENT_CACHE_BACKEND=none)'}), 409
+        data = request.get_json(silent=True) or {}
+        segments = data.get('segments')
+        if segments is not None and not isinstance(segments, list):
+            return jsonify({'error': 'segments must be a list'}), 400
+        try:
+            validate_segments(segments or [])
+            max_concurrency = int_option(data, 'max_concurrency', 4, minimum=1, maximum=16)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return job_accepted('segment_refresh', {
+            'segments': segments,
+            'include_known': bool(data.get('include_known', False)),
+            'force': bool(data.get('force', False)),
+            'max_concurrency': max_concurrency
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
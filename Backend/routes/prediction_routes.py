@@ -2,24 +2,15 @@
 Predictive Customer Analytics Module
 Predicts customer behavior and optimal touchpoints
 """
-from flask import Blueprint, request, jsonify
-from typing import Optional, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from ai_service import AIService
+from flask import Blueprint, Response, request, jsonify
+from routes import current_ai_service
+from batch_io import records_from_request, int_option
+from churn_model import record_ids, stream_churn_rows
 
 prediction_bp = Blueprint('prediction', __name__, url_prefix='/api/predict')
 
-# AI service dependency - will be injected by app.py
-ai_service: Optional['AIService'] = None
-
-def set_ai_service(service):
-    """Inject the AI service instance"""
-    global ai_service
-    ai_service = service
-
 @prediction_bp.route('/customer', methods=['POST'])
-def predict_customer_behavior():
+async def predict_customer_behavior():
     """
     POST /api/predict/customer
     Predicts customer behavior, churn risk, and optimal engagement timing
@@ -38,13 +29,58 @@ def predict_customer_behavior():
         "recommended_channel": string
     }
     """
-    assert ai_service is not None, "AI service not initialized"
+    ai_service = current_ai_service()
     try:
         data = request.get_json()
         if not data or 'history_data' not in data:
             return jsonify({'error': 'Missing history_data field'}), 400
         
-        result = ai_service.predict_behavior(data['history_data'])
+        result = await ai_service.predict_behavior(data['history_data'])
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@prediction_bp.route('/customer/batch', methods=['POST'])
+async def predict_customer_batch():
+    """
+    POST /api/predict/customer/batch
+    Scores a customer list with the vectorized churn model and streams the results back
+    
+    Expected input (one of):
+    - JSON array of customer records, or {"customers": [...], "narrate_top_n": 0, "max_concurrency": 4}
+    - CSV upload in the "file" field, or a text/csv body (options as query parameters)
+    
+    Record fields (all optional, missing = typical customer): customer_id, days_since_last_login,
+    logins_30d, support_tickets_90d, tenure_months, payment_failures_90d,
+    plan_change (-1/0/1 or downgrade/upgrade), nps, spend_change_pct
+    
+    Options:
+    - narrate_top_n: LLM next-best-action text for this many of the riskiest high-risk customers (max 200)
+    - format (query): "ndjson" (default) or "csv"
+    
+    Returns:
+    One row per customer: id, churn_probability, churn_risk, top_driver, next_best_action,
+    recommended_channel, campaign_timing, action_source ("playbook"/"llm")
+    """
+    ai_service = current_ai_service()
+    try:
+        try:
+            customers, options = records_from_request(request, 'customers')
+            narrate_top_n = int_option(options, 'narrate_top_n', 0, maximum=200)
+            max_concurrency = int_option(options, 'max_concurrency', 4, minimum=1, maximum=16)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not customers:
+            return jsonify({'error': 'No customers provided'}), 400
+        if not all(isinstance(customer, dict) for customer in customers):
+            return jsonify({'error': 'Each customer must be an object'}), 400
+        
+        result, actions = await ai_service.predict_behavior_batch(customers, narrate_top_n, max_concurrency)
+        output_format = 'csv' if request.args.get('format') == 'csv' else 'ndjson'
+        mimetype = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+        return Response(stream_churn_rows(record_ids(customers), result, output_format, narratives=actions),
+                        mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
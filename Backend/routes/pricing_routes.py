@@ -2,24 +2,14 @@
 Smart Pricing Engine Module
 Dynamic pricing based on cost, demand, and competitor prices
 """
-from flask import Blueprint, request, jsonify
-from typing import Optional, TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from ai_service import AIService
+from flask import Blueprint, Response, request, jsonify
+from routes import current_ai_service
+from pricing_engine import read_pricing_columns, stream_price_rows
 
 pricing_bp = Blueprint('pricing', __name__, url_prefix='/api/pricing')
 
-# AI service dependency - will be injected by app.py
-ai_service: Optional['AIService'] = None
-
-def set_ai_service(service):
-    """Inject the AI service instance"""
-    global ai_service
-    ai_service = service
-
 @pricing_bp.route('/optimize', methods=['POST'])
-def optimize_pricing():
+async def optimize_pricing():
     """
     POST /api/pricing/optimize
     Calculates optimal dynamic pricing based on market conditions
@@ -31,7 +21,7 @@ def optimize_pricing():
         "competitor_price": float
     }
     """
-    assert ai_service is not None, "AI service not initialized"
+    ai_service = current_ai_service()
     try:
         data = request.get_json()
         
@@ -40,7 +30,7 @@ def optimize_pricing():
         if not all(field in data for field in required):
             return jsonify({'error': f'Missing fields. Required: {required}'}), 400
         
-        result = ai_service.dynamic_price(
+        result = await ai_service.dynamic_price(
             data['cost'],
             data['demand_index'],
             data['competitor_price']
@@ -48,3 +38,44 @@ def optimize_pricing():
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@pricing_bp.route('/optimize/batch', methods=['POST'])
+async def optimize_pricing_batch():
+    """
+    POST /api/pricing/optimize/batch
+    Reprices a whole catalog in one NumPy pass and streams the results back
+    
+    Expected input (one of):
+    - JSON columns: {"cost": [...], "demand_index": [...], "competitor_price": [...], "sku": optional [...]}
+    - JSON array of {"sku", "cost", "demand_index", "competitor_price"} rows
+    - CSV (or Parquet, with pyarrow) upload in the "file" field, or a text/csv body
+    
+    Query parameters:
+    - format: "ndjson" (default) or "csv"
+    
+    Returns:
+    One row per SKU: sku, optimal_price, margin_percent, reason_code (+ pricing_reason in NDJSON)
+    """
+    ai_service = current_ai_service()
+    try:
+        try:
+            columns = read_pricing_columns(request)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        required = ['cost', 'demand_index', 'competitor_price']
+        if not all(field in columns for field in required):
+            return jsonify({'error': f'Missing columns. Required: {required}'}), 400
+        
+        result = await ai_service.dynamic_price_batch(
+            columns['cost'],
+            columns['demand_index'],
+            columns['competitor_price']
+        )
+        output_format = 'csv' if request.args.get('format') == 'csv' else 'ndjson'
+        mimetype = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+        return Response(stream_price_rows(columns, result, output_format), mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,363 @@
+"""
+Segment Recommendation Cache
+Maps personalization profiles onto role x industry x company-size segments and keeps
+precomputed recommendations per segment in a SQLite table (file or in-memory), keyed
+on a fingerprint of the catalog, prompt texts and model so changes refresh them
+
+Usage:
+    python segment_cache.py                    # refresh stale + requested segments
+    python segment_cache.py --all              # precompute every known segment
+    python segment_cache.py --segments sales/saas/mid,marketing/ecommerce/small --force
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import itertools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Dimension values and the phrases that select them (matched on whole words)
+ROLES = {
+    "executive": ("ceo", "executive", "founder", "co founder", "cofounder", "owner", "president", "chief executive",
+                  "managing director", "general manager"),
+    "sales": ("sales", "account executive", "sdr", "bdr", "cro", "business development", "revenue"),
+    "marketing": ("marketing", "cmo", "growth", "brand", "demand generation", "demand gen", "content"),
+    "operations": ("operations", "ops", "coo", "revops", "procurement", "supply chain"),
+    "finance": ("finance", "cfo", "controller", "fp&a", "accounting"),
+    "technology": ("cto", "cio", "it", "engineering", "engineer", "developer", "technology", "data", "product"),
+    "people": ("hr", "human resources", "people ops", "people operations", "recruiting", "talent", "chro"),
+    "customer_success": ("customer success", "customer service", "support", "cx", "account manager"),
+}
+INDUSTRIES = {
+    "saas": ("saas", "software", "tech", "cloud", "b2b software"),
+    "ecommerce": ("ecommerce", "e commerce", "retail", "retailer", "dtc", "d2c", "online store", "marketplace",
+                  "consumer goods", "cpg"),
+    "financial_services": ("fintech", "bank", "banking", "insurance", "financial services", "investment",
+                           "wealth management", "lending"),
+    "healthcare": ("healthcare", "health", "medical", "hospital", "pharma", "pharmaceutical", "biotech", "clinic",
+                   "life sciences"),
+    "manufacturing": ("manufacturing", "manufacturer", "industrial", "automotive", "logistics", "construction"),
+    "education": ("education", "edtech", "school", "university", "e learning", "elearning"),
+    "professional_services": ("agency", "consulting", "consultancy", "law firm", "legal", "accounting firm",
+                              "marketing agency", "professional services"),
+    "real_estate": ("real estate", "property", "proptech"),
+    "media": ("media", "publishing", "publisher", "entertainment", "gaming"),
+}
+SIZES = {
+    "small": ("startup", "smb", "small business", "small", "solo"),
+    "mid": ("mid market", "midmarket", "mid size", "midsize", "mid sized", "medium"),
+    "enterprise": ("enterprise", "large", "fortune 500", "corporation", "multinational", "global"),
+}
+# Headcount -> size: up to 50 is small, up to 1000 mid-market, above that enterprise
+SIZE_LIMITS = (("small", 50), ("mid", 1000))
+
+ROLE_LABELS = {"executive": "Executive", "sales": "Sales leader", "marketing": "Marketing leader",
+               "operations": "Operations leader", "finance": "Finance leader", "technology": "IT/technology leader",
+               "people": "HR leader", "customer_success": "Customer success leader"}
+INDUSTRY_LABELS = {"saas": "SaaS", "ecommerce": "e-commerce/retail", "financial_services": "financial services",
+                   "healthcare": "healthcare", "manufacturing": "manufacturing", "education": "education",
+                   "professional_services": "professional services", "real_estate": "real estate",
+                   "media": "media"}
+SIZE_LABELS = {"small": "small (1-50 employees)", "mid": "mid-market (51-1000 employees)",
+               "enterprise": "enterprise (1001+ employees)"}
+
+# Words that may appear around the segment phrases without adding information
+FILLER = frozenset(
+    "a an the at of in for with from our my is am we i vp svp evp avp head director manager lead leader senior "
+    "junior chief officer company companies firm business organization org team role title industry sector "
+    "size working works".split())
+HEADCOUNT_UNITS = frozenset("person people employee employees staff seats fte ftes headcount strong".split())
+
+# Dict profile keys read for each dimension; any other non-empty key makes the profile individual
+PROFILE_KEYS = {
+    "role": ("role", "title", "job_title", "position"),
+    "industry": ("industry", "sector", "vertical"),
+    "size": ("company_size", "size", "employees", "team_size", "headcount"),
+}
+
+# Templates whose wording changes the cached recommendations
+PROMPT_TEMPLATES = ("recommendations", "recommendations_task", "catalog_recommendations",
+                    "catalog_recommendations_task")
+
+_TOKEN = re.compile(r"[a-z0-9&]+")
+_HEADCOUNT = re.compile(r"(\d+)(k?)")
+
+
+def _tokens(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+def _phrase_table():
+    """(phrase tokens, dimension, value), longest phrase first so "accounting firm" beats "accounting"."""
+    table = [(tuple(_tokens(phrase)), dimension, value)
+             for dimension, values in (("role", ROLES), ("industry", INDUSTRIES), ("size", SIZES))
+             for value, phrases in values.items() for phrase in phrases]
+    return sorted(table, key=lambda entry: -len(entry[0]))
+
+
+_PHRASES = _phrase_table()
+
+
+def _headcount_size(word):
+    """Size for a headcount word ("200", "5k"), or None when the word is not a number."""
+    match = _HEADCOUNT.fullmatch(word)
+    if not match:
+        return None
+    count = int(match.group(1)) * (1000 if match.group(2) else 1)
+    return next((size for size, limit in SIZE_LIMITS if count <= limit), "enterprise")
+
+
+def _scan(text):
+    """Segment values found in text, or None when a word is left unexplained."""
+    words = _tokens(text)
+    found = {"role": set(), "industry": set(), "size": set()}
+    position = 0
+    while position < len(words):
+        word = words[position]
+        size = _headcount_size(word)
+        if size:
+            # a range like "50-200 employees" counts as its upper bound
+            while position + 1 < len(words) and _headcount_size(words[position + 1]):
+                position += 1
+                size = _headcount_size(words[position])
+            found["size"].add(size)
+            position += 1
+            while position < len(words) and words[position] in HEADCOUNT_UNITS:
+                position += 1
+            continue
+        for phrase, dimension, value in _PHRASES:
+            if tuple(words[position:position + len(phrase)]) == phrase:
+                found[dimension].add(value)
+                position += len(phrase)
+                break
+        else:
+            if word not in FILLER:
+                return None
+            position += 1
+    return found
+
+
+def segment_key(profile):
+    """
+    "role/industry/size" when the profile says nothing beyond its segment, else None.
+
+    A string profile maps when every word is a segment phrase, a headcount or filler
+    ("VP Sales at a 200-person SaaS company"); a dict maps when it only has role,
+    industry and size keys. A profile naming two roles (or industries, sizes) is not a
+    segment.
+    """
+    if isinstance(profile, dict):
+        keys = {key for keys in PROFILE_KEYS.values() for key in keys}
+        if any(value not in (None, "") and key not in keys for key, value in profile.items()):
+            return None
+        text = " ".join(str(profile[key]) for keys in PROFILE_KEYS.values() for key in keys
+                        if profile.get(key) not in (None, ""))
+    else:
+        text = str(profile)
+    found = _scan(text)
+    if found is None or any(len(values) != 1 for values in found.values()):
+        return None
+    return "/".join(next(iter(found[dimension])) for dimension in ("role", "industry", "size"))
+
+
+def known_segments():
+    return ["/".join(combo) for combo in itertools.product(ROLES, INDUSTRIES, SIZES)]
+
+
+def validate_segments(segments):
+    """Raises ValueError for keys that are not known role/industry/size segments."""
+    known = set(known_segments())
+    unknown = [segment for segment in segments if segment not in known]
+    if unknown:
+        raise ValueError(f"Unknown segments: {', '.join(unknown[:10])}")
+    return list(segments)
+
+
+def segment_profile(segment):
+    """Canonical profile text the recommendations for a segment are generated from."""
+    role, industry, size = segment.split("/")
+    return f"{ROLE_LABELS[role]} at a {SIZE_LABELS[size]} {INDUSTRY_LABELS[industry]} company"
+
+
+def fingerprint(inputs):
+    """Short hash of everything the cached recommendations depend on (catalog, prompts, model...)."""
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+# Request counts are kept in memory and written to the table at most this often (and
+# before the table is read for a refresh or stats), so lookups do not write per request
+REQUEST_FLUSH_SECONDS = 5.0
+
+
+class SegmentStore:
+    """
+    segment_recommendations table: one row per segment with the recommendations, the
+    fingerprint they were generated under and how often the segment was requested.
+    Rows whose fingerprint differs from the current one are stale: they are not served
+    and are what an incremental refresh recomputes. Lookups of segments without a row
+    add an empty one (when the counts are flushed), so segments seen in traffic are
+    precomputed next time.
+    """
+
+    def __init__(self, path=":memory:", flush_seconds=REQUEST_FLUSH_SECONDS):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._requests = Counter()  # segment -> lookups not written to the table yet
+        self._flushed_at = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS segment_recommendations ("
+            " segment TEXT PRIMARY KEY, fingerprint TEXT, result TEXT,"
+            " computed_at REAL, requests INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, segment, current):
+        """Fresh recommendations for the segment or None (counts the request either way)."""
+        with self._lock:
+            self._requests[segment] += 1
+            if time.monotonic() - self._flushed_at >= self.flush_seconds:
+                self._flush()
+            row = self._conn.execute(
+                "SELECT fingerprint, result FROM segment_recommendations WHERE segment = ?", (segment,)).fetchone()
+            if row is not None and row[1] is not None and row[0] == current:
+                self.hits += 1
+                return json.loads(row[1])
+            if row is not None and row[1] is not None:
+                self.stale += 1
+            self.misses += 1
+            return None
+
+    def flush(self):
+        """Writes the request counts gathered since the last flush."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._flushed_at = time.monotonic()
+        if not self._requests:
+            return
+        self._conn.executemany(
+            "INSERT INTO segment_recommendations (segment, requests) VALUES (?, ?)"
+            " ON CONFLICT(segment) DO UPDATE SET requests = requests + excluded.requests",
+            list(self._requests.items()))
+        self._conn.commit()
+        self._requests.clear()
+
+    def put(self, segment, current, result):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO segment_recommendations (segment, fingerprint, result, computed_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(segment) DO UPDATE SET fingerprint = excluded.fingerprint,"
+                " result = excluded.result, computed_at = excluded.computed_at",
+                (segment, current, json.dumps(result), time.time()))
+            self._conn.commit()
+
+    def outdated(self, current, segments=()):
+        """Segments to refresh: rows that are stale or empty (most requested first), then new ones from segments."""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT segment, fingerprint, result FROM segment_recommendations ORDER BY requests DESC, segment"
+            ).fetchall()
+        known = {segment for segment, _, _ in rows}
+        todo = [segment for segment, row_fingerprint, result in rows if result is None or row_fingerprint != current]
+        return todo + [segment for segment in segments if segment not in known]
+
+    def stats(self, current=None):
+        with self._lock:
+            self._flush()
+            segments, computed, fresh = self._conn.execute(
+                "SELECT COUNT(*), COUNT(result), COUNT(CASE WHEN result IS NOT NULL AND fingerprint = ? THEN 1 END)"
+                " FROM segment_recommendations", (current,)).fetchone()
+            hits, misses, stale = self.hits, self.misses, self.stale
+        lookups = hits + misses
+        return {
+            "path": self.path,
+            "fingerprint": current,
+            "segments": segments,
+            "computed": computed,
+            "fresh": fresh,
+            "hits": hits,
+            "misses": misses,
+            "stale_misses": stale,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0
+        }
+
+
+def build_segment_store():
+    """
+    Builds the store configured in the environment:
+        SEGMENT_CACHE_BACKEND = sqlite (default) / memory / none
+        SEGMENT_CACHE_PATH = SQLite file (default Backend/segments.sqlite3)
+        SEGMENT_CACHE_FLUSH_SECONDS = how often request counts are written (default 5)
+    """
+    backend = os.getenv("SEGMENT_CACHE_BACKEND", "sqlite").strip().lower()
+    if backend in ("none", "off", "disabled", ""):
+        return None
+    flush_seconds = float(os.getenv("SEGMENT_CACHE_FLUSH_SECONDS", REQUEST_FLUSH_SECONDS))
+    if backend == "memory":
+        return SegmentStore(flush_seconds=flush_seconds)
+    if backend != "sqlite":
+        raise ValueError(f"Unknown SEGMENT_CACHE_BACKEND: {backend}")
+    default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "segments.sqlite3")
+    return SegmentStore(os.getenv("SEGMENT_CACHE_PATH", default_path), flush_seconds)
+
+
+def precompute(ai, segments, max_concurrency=4, progress=None):
+    """
+    Generates and stores recommendations for segments with ai.refresh_segment.
+
+    Returns:
+        dict: summary (refreshed, failed, seconds)
+    """
+    started = time.perf_counter()
+    refreshed = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        for segment, ok in zip(segments, pool.map(ai.refresh_segment, segments)):
+            refreshed += ok
+            failed += not ok
+            if progress:
+                progress(segment, refreshed + failed, len(segments))
+    return {"refreshed": refreshed, "failed": failed, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute per-segment personalization recommendations")
+    parser.add_argument("--all", action="store_true", help="also compute every known segment not stored yet")
+    parser.add_argument("--segments", help="comma-separated role/industry/size keys (default: stale + requested)")
+    parser.add_argument("--force", action="store_true", help="recompute the chosen segments even if fresh")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="parallel LLM calls")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from ai_service import AIService
+    load_dotenv()
+    ai = AIService()
+    segments = [segment.strip() for segment in args.segments.split(",")] if args.segments else None
+
+    def progress(segment, done, total):
+        print(f"\r  {done}/{total} segments", end="", file=sys.stderr, flush=True)
+
+    try:
+        summary = ai.refresh_segments(segments, args.all, args.force, args.max_concurrency, progress)
+    except ValueError as e:
+        parser.error(str(e))
+    print(file=sys.stderr)
+    print(json.dumps(dict(summary, stats=ai.segment_stats()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Lexicon Sentiment Scorer
+Local fast path for AIService.analyze_sentiment: word valences with negation and
+intensifier handling, vectorized over whole batches of reviews
+"""
+import io
+import re
+import csv
+import json
+from itertools import repeat
+import numpy as np
+
+# Valence per word on a -4..+4 scale (VADER-style), tuned for product and service feedback
+LEXICON = {
+    # positive
+    "love": 3.2, "loved": 2.9, "loves": 2.7, "loving": 2.9, "amazing": 2.8, "awesome": 3.1,
+    "excellent": 3.2, "outstanding": 3.3, "fantastic": 2.6, "wonderful": 2.7, "perfect": 2.7,
+    "great": 3.1, "brilliant": 2.8, "superb": 3.1, "exceptional": 2.9, "incredible": 2.4,
+    "best": 3.2, "good": 1.9, "nice": 1.8, "happy": 2.7, "glad": 2.0, "pleased": 1.9,
+    "satisfied": 1.8, "enjoy": 2.2, "enjoyed": 2.3, "recommend": 1.5, "recommended": 1.5,
+    "helpful": 1.8, "friendly": 2.2, "fast": 1.1, "quick": 1.1, "quickly": 1.1, "easy": 1.9,
+    "easier": 1.6, "smooth": 1.5, "reliable": 1.8, "intuitive": 1.8, "efficient": 1.8,
+    "impressed": 2.2, "impressive": 2.3, "beautiful": 2.9, "clean": 1.7, "fair": 1.3,
+    "affordable": 1.5, "worth": 1.4, "valuable": 2.1, "useful": 1.9, "works": 1.0,
+    "solid": 1.4, "responsive": 1.5, "professional": 1.3, "thanks": 1.9, "thank": 1.5,
+    "appreciate": 1.7, "appreciated": 1.9, "delighted": 3.1, "fabulous": 2.4, "favorite": 2.0,
+    "flawless": 2.8, "seamless": 2.0, "convenient": 1.7, "better": 1.9, "improved": 1.9,
+    "improvement": 1.5, "success": 2.7, "successful": 2.8, "resolved": 1.4, "win": 2.8,
+    "like": 1.5, "liked": 1.8, "likes": 1.8, "cool": 1.3, "positive": 2.6, "quality": 0.8,
+    "top": 0.8, "wow": 2.8, "superior": 2.3, "trustworthy": 2.2, "trust": 2.3, "polite": 1.9,
+    "knowledgeable": 1.8, "powerful": 1.6, "stable": 1.2, "gorgeous": 3.0, "pleasant": 2.3,
+    "fine": 0.8, "okay": 0.9, "ok": 0.9, "decent": 1.0,
+    # negative
+    "hate": -2.7, "hated": -3.2, "hates": -1.9, "terrible": -2.1, "horrible": -2.5,
+    "awful": -2.0, "worst": -3.1, "bad": -2.5, "poor": -2.1, "poorly": -1.9, "disappointed": -1.9,
+    "disappointing": -2.2, "disappointment": -2.3, "useless": -1.8, "broken": -2.1, "broke": -1.8,
+    "slow": -1.2, "slower": -1.1, "buggy": -1.9, "bug": -1.0, "bugs": -1.2, "crash": -1.7,
+    "crashes": -1.9, "crashed": -1.9, "error": -1.4, "errors": -1.5, "fail": -2.5,
+    "failed": -2.3, "fails": -2.0, "failure": -2.3, "problem": -1.7, "problems": -1.7,
+    "issue": -1.0, "issues": -1.1, "annoying": -1.9, "annoyed": -1.6, "frustrating": -2.2,
+    "frustrated": -2.4, "confusing": -1.3, "confused": -1.3, "complicated": -1.3,
+    "expensive": -1.2, "overpriced": -2.0, "waste": -1.8, "wasted": -2.2, "refund": -1.0,
+    "rude": -2.0, "unhelpful": -1.8, "unreliable": -1.9, "unusable": -2.4, "unacceptable": -2.5,
+    "angry": -2.3, "upset": -1.6, "sad": -2.1, "unhappy": -1.8, "worse": -2.1, "lost": -1.3,
+    "lose": -1.7, "missing": -1.2, "delay": -1.3, "delayed": -1.4, "late": -1.1, "wrong": -2.1,
+    "scam": -2.6, "fraud": -2.8, "garbage": -2.6, "trash": -2.1, "junk": -2.0, "sucks": -1.5,
+    "pathetic": -2.7, "nightmare": -2.6, "regret": -1.8, "avoid": -1.6, "cancel": -1.4,
+    "cancelled": -1.5, "complaint": -1.5, "difficult": -1.5, "hard": -0.4, "lacking": -1.3,
+    "lacks": -1.3, "mediocre": -1.0, "meh": -0.9, "ugly": -2.3, "dirty": -1.9, "defective": -2.2,
+    "negative": -2.7, "ignored": -1.6, "stuck": -1.5, "painful": -2.1, "terribly": -2.1,
+    "disaster": -3.1, "dreadful": -2.7, "lousy": -2.5, "misleading": -2.0, "clunky": -1.4,
+    "outdated": -1.2, "laggy": -1.5, "glitchy": -1.7, "unstable": -1.6, "dissatisfied": -1.9,
+}
+
+# A negator flips (and dampens) the valence of the next few words in the same clause
+NEGATORS = (
+    "not", "no", "never", "nothing", "nobody", "none", "neither", "nor", "without", "hardly",
+    "barely", "cannot", "cant", "dont", "doesnt", "didnt", "isnt", "wasnt", "arent", "werent",
+    "wont", "wouldnt", "couldnt", "shouldnt", "havent", "hasnt", "hadnt", "aint",
+    "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't", "won't", "wouldn't",
+    "can't", "couldn't", "shouldn't", "haven't", "hasn't", "hadn't", "ain't",
+)
+NEGATION_SCALAR = -0.74
+NEGATION_WINDOW = 3
+
+# Degree modifiers scale the word that follows them
+MODIFIERS = {
+    "very": 1.3, "really": 1.3, "extremely": 1.5, "super": 1.4, "so": 1.2, "incredibly": 1.5,
+    "absolutely": 1.4, "totally": 1.3, "completely": 1.3, "highly": 1.3, "truly": 1.3,
+    "most": 1.2, "too": 1.2, "quite": 1.1, "pretty": 1.1,
+    "slightly": 0.7, "somewhat": 0.7, "bit": 0.7, "little": 0.8, "kinda": 0.7, "fairly": 0.8,
+}
+
+# Normalization constant for total valence -> compound score in (-1, 1)
+ALPHA = 15.0
+
+# Clause boundaries end a negation scope
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?|[.!?;,]")
+_BOUNDARY_TOKENS = (".", "!", "?", ";", ",")
+
+# Token id 0 is any unknown word; each vocabulary word maps to rows of the lookup arrays
+_VOCAB = {}
+for _word in (*LEXICON, *NEGATORS, *MODIFIERS, *_BOUNDARY_TOKENS):
+    _VOCAB.setdefault(_word, len(_VOCAB) + 1)
+_VALENCE = np.zeros(len(_VOCAB) + 1)
+_IS_NEGATOR = np.zeros(len(_VOCAB) + 1, dtype=bool)
+_MODIFIER = np.ones(len(_VOCAB) + 1)
+_IS_BOUNDARY = np.zeros(len(_VOCAB) + 1, dtype=bool)
+for _word, _id in _VOCAB.items():
+    _VALENCE[_id] = LEXICON.get(_word, 0.0)
+    _IS_NEGATOR[_id] = _word in NEGATORS
+    _MODIFIER[_id] = MODIFIERS.get(_word, 1.0)
+    _IS_BOUNDARY[_id] = _word in _BOUNDARY_TOKENS
+
+
+def _tokenize(texts):
+    """-> (flat token id array, tokens per text)."""
+    ids = []
+    lengths = np.zeros(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        tokens = _TOKEN.findall(str(text).lower())
+        ids.extend(map(_VOCAB.get, tokens, repeat(0)))
+        lengths[i] = len(tokens)
+    return np.asarray(ids, dtype=np.int64), lengths
+
+
+def score_texts(texts, min_confidence=0.5):
+    """
+    Scores a whole batch in NumPy passes over the flattened tokens.
+
+    A word is negated when an odd number of negators appear in the NEGATION_WINDOW words
+    before it within its clause; a modifier directly before it scales it. The summed
+    valence is squashed to a compound score in (-1, 1); confidence discounts it by how
+    mixed the positive and negative evidence is. Texts with no lexicon words or a
+    confidence below min_confidence are flagged ambiguous (candidates for the LLM).
+
+    Returns:
+        dict: "sentiment" (array of str), "confidence", "score" (compound) float arrays,
+              "matches" (lexicon words per text) and "ambiguous" (bool array)
+    """
+    count = len(texts)
+    ids, lengths = _tokenize(texts)
+    total_tokens = len(ids)
+    doc = np.repeat(np.arange(count), lengths)
+    positions = np.arange(total_tokens)
+
+    # First position of each token's clause: text starts and the token after each boundary
+    starts = np.zeros(total_tokens, dtype=bool)
+    offsets = np.cumsum(lengths) - lengths
+    starts[offsets[lengths > 0]] = True
+    is_boundary = _IS_BOUNDARY[ids]
+    clause_start = np.where(is_boundary, positions + 1, np.where(starts, positions, 0))
+    clause_start = np.maximum.accumulate(clause_start) if total_tokens else clause_start
+
+    negators = np.concatenate(([0], np.cumsum(_IS_NEGATOR[ids])))
+    window_start = np.maximum(positions - NEGATION_WINDOW, clause_start)
+    negated = (negators[positions] - negators[np.minimum(window_start, positions)]) % 2 == 1
+
+    previous = np.concatenate(([0], ids[:-1])) if total_tokens else ids
+    modifier = np.where(positions - 1 >= clause_start, _MODIFIER[previous], 1.0)
+
+    valence = _VALENCE[ids]
+    weighted = valence * np.where(negated, NEGATION_SCALAR, 1.0) * modifier
+    total = np.bincount(doc, weights=weighted, minlength=count)
+    positive = np.bincount(doc, weights=np.clip(weighted, 0, None), minlength=count)
+    negative = np.bincount(doc, weights=-np.clip(weighted, None, 0), minlength=count)
+    matches = np.bincount(doc, weights=valence != 0, minlength=count).astype(np.int64)
+
+    compound = total / np.sqrt(total * total + ALPHA)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mixed = np.where(np.maximum(positive, negative) > 0,
+                         np.minimum(positive, negative) / np.maximum(positive, negative), 0.0)
+    confidence = np.abs(compound) * (1 - mixed)
+    sentiment = np.select([compound >= 0.05, compound <= -0.05], ["positive", "negative"], default="neutral")
+    return {
+        "sentiment": sentiment,
+        "confidence": np.round(confidence, 3),
+        "score": np.round(compound, 3),
+        "matches": matches,
+        "ambiguous": (matches == 0) | (confidence < min_confidence)
+    }
+
+
+def score_text(text, min_confidence=0.5):
+    """
+    Single-text score in the analyze_sentiment response shape (+ "score"), or None when
+    the text is ambiguous and should go to the LLM.
+    """
+    result = score_texts([text], min_confidence)
+    if result["ambiguous"][0]:
+        return None
+    sentiment = str(result["sentiment"][0])
+    words = [token for token in _TOKEN.findall(str(text).lower()) if token in LEXICON]
+    return {
+        "sentiment": sentiment,
+        "confidence": float(result["confidence"][0]),
+        "score": float(result["score"][0]),
+        "summary": f"{sentiment.capitalize()} wording: {', '.join(dict.fromkeys(words[:8]))}"
+    }
+
+
+def escalation_indices(result, limit):
+    """Row indices (ascending) of the `limit` least confident ambiguous texts."""
+    ambiguous = np.flatnonzero(result["ambiguous"])
+    if limit <= 0 or not len(ambiguous):
+        return ambiguous[:0]
+    chosen = ambiguous[np.argsort(result["confidence"][ambiguous], kind="stable")[:limit]]
+    return np.sort(chosen)
+
+
+def stream_sentiment_rows(ids, result, output_format="ndjson", chunk_size=5000):
+    """
+    Yields batch results as NDJSON lines or CSV, chunk_size rows at a time.
+    result may carry an "escalated" dict {row index: LLM result} for rows sent to the model.
+    """
+    count = len(result["sentiment"])
+    escalated = result.get("escalated", {})
+    if output_format == "csv":
+        yield "id,sentiment,confidence,score,path,ambiguous\n"
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n") if output_format == "csv" else None
+        rows = zip(range(start, stop), ids[start:stop], result["sentiment"][start:stop].tolist(),
+                   result["confidence"][start:stop].tolist(), result["score"][start:stop].tolist(),
+                   result["ambiguous"][start:stop].tolist())
+        for i, row_id, sentiment, confidence, score, ambiguous in rows:
+            path = "lexicon"
+            if i in escalated:
+                path = "llm"
+                sentiment = escalated[i].get("sentiment", sentiment)
+                confidence = escalated[i].get("confidence", confidence)
+            if writer is not None:
+                writer.writerow([row_id, sentiment, confidence, score, path, ambiguous])
+            else:
+                buffer.write(json.dumps({"id": row_id, "sentiment": sentiment, "confidence": confidence,
+                                         "score": score, "path": path, "ambiguous": ambiguous}))
+                buffer.write("\n")
+        yield buffer.getvalue()
@@ -0,0 +1,82 @@
+"""
+Single-Flight Request Coalescing
+Concurrent callers asking for the same key share one upstream call
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Tracks in-flight calls by key. The first caller (the leader) runs the call;
+    everyone arriving while it is running waits on the same concurrent.futures.Future
+    and receives its result or exception.
+
+    A thread-safe Future is used as the rendezvous so threaded Flask workers
+    (do) and coroutines on any event loop (do_async) can coalesce with each other.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        """Returns (future, is_leader)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _release(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def do(self, key, fn):
+        """Runs fn() once per key for all concurrent (threaded) callers."""
+        future, is_leader = self._join(key)
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._release(key)
+            future.set_exception(e)
+            raise
+        self._release(key)
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key, coro_fn):
+        """Awaits coro_fn() once per key for all concurrent callers."""
+        future, is_leader = self._join(key)
+        if not is_leader:
+            # shield: a cancelled follower must not cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            self._release(key)
+            future.set_exception(e)
+            raise
+        self._release(key)
+        future.set_result(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "in_flight": in_flight,
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.coalesced
+        }
@@ -0,0 +1,44 @@
+import os
+import sys
+import pytest
+
+# The backend modules are flat files in Backend/, imported by name as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(tmp_path, monkeypatch):
+    """Every file the services create (jobs, segments, product index) goes to tmp_path."""
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("JOB_DB_PATH", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setenv("SEGMENT_CACHE_PATH", str(tmp_path / "segments.sqlite3"))
+    monkeypatch.setenv("PRODUCT_INDEX_PATH", str(tmp_path / "product_index"))
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "memory")
+
+
+@pytest.fixture
+def mock_groq():
+    """mock_groq_server on a free port with no added latency -> (server, chat completions URL)."""
+    from mock_groq_server import MockConfig, start_mock_server
+    server, url = start_mock_server(config=MockConfig(latency_ms=0, jitter_ms=0))
+    yield server, url
+    server.shutdown()
+
+
+@pytest.fixture
+def make_app(monkeypatch, mock_groq):
+    """create_app(**config) pointed at the mock upstream; job workers it starts are stopped afterwards."""
+    monkeypatch.setenv("GROQ_API_URL", mock_groq[1])
+    from app import create_app
+    apps = []
+
+    def make(**config):
+        app = create_app(dict(config, LOAD_DOTENV=False))
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        jobs = app.extensions["ai_services"].jobs
+        if jobs is not None:
+            jobs.stop(timeout=5)
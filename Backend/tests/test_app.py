@@ -0,0 +1,67 @@
+import os
+import threading
+import pytest
+from app import MODULES, create_app, enabled_modules
+
+
+def _job_workers():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("job-worker")]
+
+
+def test_enabled_modules_adds_core_and_jobs():
+    assert enabled_modules(["pricing"]) == ["core", "pricing"]
+    assert enabled_modules("generator, market") == ["core", "generator", "market", "jobs"]
+    assert enabled_modules([]) == list(MODULES)
+    with pytest.raises(ValueError, match="Unknown app modules: nope"):
+        enabled_modules(["pricing", "nope"])
+
+
+def test_only_enabled_blueprints_are_registered(make_app):
+    app = make_app(MODULES=["pricing"])
+    assert {rule.rule for rule in app.url_map.iter_rules()} >= {"/api/health", "/api/pricing/optimize"}
+    assert not any(rule.rule.startswith(("/api/chat", "/api/jobs")) for rule in app.url_map.iter_rules())
+    assert app.test_client().post("/api/chat", json={"message": "hi"}).status_code == 404
+
+
+def test_job_queue_starts_on_first_use(make_app, tmp_path):
+    path = tmp_path / "lazy" / "jobs.sqlite3"
+    before = len(_job_workers())
+    app = make_app(MODULES=["generator"], JOB_DB_PATH=str(path))
+    client = app.test_client()
+    assert client.get("/api/health").get_json()["jobs"] is None  # health does not start it
+    assert app.extensions["ai_services"].jobs is None and not path.exists()
+    assert len(_job_workers()) == before
+
+    response = client.post("/api/generator/lead-score/batch?async=true",
+                           json={"leads": [{"budget": "$80k", "timeline": "Immediate", "urgency": "High"}]})
+    assert response.status_code == 202
+    jobs = app.extensions["ai_services"].jobs
+    assert jobs is not None and jobs.store.path == str(path) and path.exists()
+    assert client.get("/api/health").get_json()["jobs"]["path"] == str(path)
+
+
+def test_job_store_defaults_to_the_instance_folder(make_app, monkeypatch):
+    monkeypatch.delenv("JOB_DB_PATH")
+    app = make_app(MODULES=["generator"])
+    assert app.extensions["ai_services"].job_db_path == os.path.join(app.instance_path, "jobs.sqlite3")
+    assert make_app(MODULES=["pricing"]).extensions["ai_services"].job_db_path is None
+
+
+def test_start_jobs_opt_in(make_app, tmp_path):
+    app = make_app(MODULES=["jobs"], START_JOBS=True, JOB_DB_PATH=str(tmp_path / "jobs.sqlite3"))
+    assert app.extensions["ai_services"].jobs is not None
+
+
+def test_apps_do_not_share_services(make_app):
+    from ai_service import AIService
+    shared = AIService()
+    first = make_app(MODULES=["pricing"], AI_SERVICE=shared)
+    second = make_app(MODULES=["pricing"])
+    assert first.extensions["ai_services"].ai._resolve() is shared
+    assert second.extensions["ai_services"].ai._resolve() is not shared
+    assert first.config["MODULES"] == ["core", "pricing"]
+
+
+def test_benchmark_covers_every_route(make_app):
+    from benchmark import uncovered_routes
+    assert uncovered_routes(make_app()) == []
@@ -0,0 +1,89 @@
+import time
+import json
+import asyncio
+import threading
+from flask import Flask, Response, request, jsonify
+from asgi import ASGIApp
+
+
+def _flask_app():
+    app = Flask(__name__)
+    threads = set()
+
+    @app.route("/slow", methods=["POST"])
+    async def slow():
+        threads.add(threading.get_ident())
+        await asyncio.sleep(0.2)
+        return jsonify({"echo": request.get_json()["n"], "q": request.args.get("q")})
+
+    @app.route("/sync")
+    def sync_view():
+        return "sync", 201, {"X-Test": "yes"}
+
+    @app.route("/stream")
+    def stream():
+        return Response((f"{i}\n" for i in range(3)), mimetype="text/plain")
+
+    @app.route("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.view_threads = threads
+    return app
+
+
+async def _call(asgi_app, method, path, body=b"", query=b""):
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query, "root_path": "",
+             "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+             "http_version": "1.1", "scheme": "http", "server": ("test", 80), "client": ("127.0.0.1", 1)}
+    await asgi_app(scope, receive, send)
+    start = sent[0]
+    return start["status"], dict(start["headers"]), b"".join(m["body"] for m in sent[1:])
+
+
+def test_async_views_share_the_event_loop():
+    app = _flask_app()
+    asgi_app = ASGIApp(app)
+
+    async def main():
+        return await asyncio.gather(*[
+            _call(asgi_app, "POST", "/slow", json.dumps({"n": i}).encode(), b"q=x") for i in range(50)])
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    assert time.perf_counter() - started < 2.0  # 50 x 0.2 s serially would take 10 s
+    assert [json.loads(body)["echo"] for _, _, body in results] == list(range(50))
+    assert all(status == 200 and json.loads(body)["q"] == "x" for status, _, body in results)
+    assert len(app.view_threads) == 1  # every view ran on the loop's thread
+
+
+def test_sync_view_streaming_and_errors():
+    asgi_app = ASGIApp(_flask_app())
+    status, headers, body = asyncio.run(_call(asgi_app, "GET", "/sync"))
+    assert (status, headers[b"x-test"], body) == (201, b"yes", b"sync")
+    assert asyncio.run(_call(asgi_app, "GET", "/stream"))[2] == b"0\n1\n2\n"
+    assert asyncio.run(_call(asgi_app, "GET", "/missing"))[0] == 404
+    assert asyncio.run(_call(asgi_app, "GET", "/boom"))[0] == 500
+
+
+def test_lifespan():
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(ASGIApp(_flask_app())({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
@@ -0,0 +1,74 @@
+import pytest
+from chat_sessions import ChatSessionStore
+
+LONG = "x" * 400  # about 100 tokens per message
+
+
+def _store_with_turns(turns, **options):
+    store = ChatSessionStore(**options)
+    for i in range(turns):
+        store.record_turn("s", f"{LONG} question {i}", f"{LONG} answer {i}")
+    return store
+
+
+def test_nothing_to_fold_under_budget():
+    store = _store_with_turns(2, token_budget=10000)
+    assert store.pending_compaction("s") is None
+    assert len(store.history("s")) == 4
+
+
+def test_folds_oldest_whole_turns_first():
+    store = _store_with_turns(5, token_budget=450, keep_recent=4)
+    summary, folded = store.pending_compaction("s")
+    assert summary == ""
+    assert len(folded) % 2 == 0
+    assert folded[0]["content"].endswith("question 0")
+    store.apply_compaction("s", "earlier turns", folded)
+    history = store.history("s")
+    assert history[0] == {"role": "system", "content": "Summary of the earlier conversation: earlier turns"}
+    assert len(history) - 1 == 10 - len(folded)
+
+
+@pytest.mark.parametrize("keep_recent, extra_message", [(3, False), (5, False), (4, True)])
+def test_never_folds_into_the_recent_window(keep_recent, extra_message):
+    store = _store_with_turns(6, token_budget=1, keep_recent=keep_recent)
+    if extra_message:  # odd history length, e.g. a turn that was only half recorded
+        store.history("s")
+        store._sessions["s"]["messages"].append({"role": "user", "content": LONG})
+    messages = store._sessions["s"]["messages"]
+    _, folded = store.pending_compaction("s")
+    assert len(messages) - len(folded) == keep_recent
+
+
+def test_stale_compaction_is_skipped():
+    store = _store_with_turns(4, token_budget=1, keep_recent=2)
+    _, folded = store.pending_compaction("s")
+    store.apply_compaction("s", "first", folded)
+    store.apply_compaction("s", "second", folded)  # those messages are already gone
+    assert store.history("s")[0]["content"].endswith("first")
+
+
+def test_evicted_sessions_reload_from_sqlite(tmp_path):
+    path = str(tmp_path / "chat.sqlite3")
+    store = ChatSessionStore(max_sessions=1, db_path=path)
+    store.record_turn("a", "hi", "hello")
+    store.record_turn("b", "hey", "hi there")
+    assert list(store._sessions) == ["b"]
+    assert [m["content"] for m in store.history("a")] == ["hi", "hello"]
+    assert [m["content"] for m in ChatSessionStore(db_path=path).history("b")] == ["hey", "hi there"]
+    store.delete("a")
+    assert store.history("a") == []
+
+
+def test_chat_route_keeps_history_server_side(make_app, monkeypatch):
+    monkeypatch.setenv("CHAT_HISTORY_TOKEN_BUDGET", "60")
+    monkeypatch.setenv("CHAT_KEEP_RECENT", "2")
+    app = make_app(MODULES=["chatbot"])
+    client = app.test_client()
+    for i in range(3):
+        response = client.post("/api/chat", json={"session_id": "s1", "message": f"question {i} " + LONG})
+        assert response.get_json()["status"] == "success"
+    history = app.extensions["ai_services"].ai.chat_sessions.history("s1")
+    assert history[0]["role"] == "system"  # older turns were folded into a summary
+    assert len(history) - 1 <= 4
+    assert client.delete("/api/chat/session/s1").status_code == 200
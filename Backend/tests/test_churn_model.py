@@ -0,0 +1,78 @@
+import json
+import numpy as np
+import pytest
+from churn_model import (BASE_RATE, score_customers, columns_from_records, predict_one, high_risk_indices,
+                         record_ids, score_file)
+
+AT_RISK = {"customer_id": "c1", "days_since_last_login": 90, "logins_30d": 0, "payment_failures_90d": 3,
+           "plan_change": "downgrade", "nps": 2}
+HEALTHY = {"customer_id": "c2", "days_since_last_login": 1, "logins_30d": 40, "tenure_months": 48, "nps": 10}
+
+
+def test_typical_customer_scores_the_base_rate():
+    result = score_customers({}, count=2)
+    assert result["churn_probability"].tolist() == [round(BASE_RATE * 100)] * 2
+    assert result["top_driver"].tolist() == ["none", "none"]
+
+
+def test_risk_ordering_and_drivers():
+    result = score_customers(columns_from_records([AT_RISK, HEALTHY, {"plan_change": "Downgraded"}]))
+    probability = result["churn_probability"]
+    assert probability[0] > probability[2] > probability[1]
+    assert result["churn_risk"].tolist()[:2] == ["high", "low"]
+    assert result["top_driver"].tolist()[2] == "plan_change"
+
+
+def test_bad_values_count_as_typical_and_lengths_must_match():
+    assert score_customers({"nps": ["n/a", None]})["churn_probability"].tolist() == [15, 15]
+    with pytest.raises(ValueError):
+        score_customers({"nps": [1, 2], "logins_30d": [1]}, count=2)
+
+
+def test_predict_one_matches_the_batch_and_accepts_free_text():
+    single = predict_one(AT_RISK)
+    assert single["churn_probability"] == score_customers(columns_from_records([AT_RISK]))["churn_probability"][0]
+    assert single["churn_risk"] == "high" and single["campaign_timing"] == "Within 48 hours"
+    assert predict_one("loyal customer since 2019")["churn_risk"] == "low"
+
+
+def test_high_risk_indices_pick_the_riskiest():
+    result = {"churn_risk": np.array(["high", "low", "high", "high"]),
+              "churn_probability": np.array([70, 10, 95, 80])}
+    assert high_risk_indices(result, 2).tolist() == [2, 3]
+    assert high_risk_indices(result, 0).tolist() == []
+
+
+def test_record_ids_fall_back_to_row_numbers():
+    assert record_ids([{"id": "a"}, {"id": "b"}]) == ["a", "b"]
+    assert record_ids([{"nps": 1}, {"nps": 2}], offset=10) == [10, 11]
+
+
+def test_score_file_in_chunks_narrates_the_riskiest_overall(tmp_path):
+    source = tmp_path / "customers.ndjson"
+    customers = [dict(HEALTHY, customer_id=f"h{i}") for i in range(5)] + [AT_RISK]
+    source.write_text("".join(json.dumps(customer) + "\n" for customer in customers))
+    output = str(tmp_path / "scored.csv")
+    narrated = []
+
+    def narrate(items):
+        narrated.extend(items)
+        return [{"next_best_action": "Call", "campaign_timing": "Now", "recommended_channel": "Phone"}] * len(items)
+
+    summary = score_file(str(source), output, chunk_size=2, narrate=narrate, narrate_top_n=1)
+    assert summary["customers"] == 6 and summary["by_risk"]["high"] == 1 and summary["narrated"] == 1
+    assert [record["customer_id"] for record, _, _ in narrated] == ["c1"]
+    with open(output) as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("id,churn_probability") and len(lines) == 7
+    with open(f"{output}.actions.jsonl") as f:
+        assert json.loads(f.readline())["id"] == "c1"
+
+
+def test_batch_route_streams_scores(make_app):
+    client = make_app(MODULES=["prediction"]).test_client()
+    response = client.post("/api/predict/customer/batch", json={"customers": [AT_RISK, HEALTHY], "narrate_top_n": 1})
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["id"] for row in rows] == ["c1", "c2"]
+    assert [row["action_source"] for row in rows] == ["llm", "playbook"]
+    assert client.post("/api/predict/customer/batch", json={"customers": [1]}).status_code == 400
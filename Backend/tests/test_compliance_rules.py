@@ -0,0 +1,55 @@
+from compliance_rules import PhraseAutomaton, RuleSet, DEFAULT_RULES
+
+
+def _matches(automaton, text):
+    return sorted((start, end, automaton.phrases[index]) for start, end, index in automaton.scan(text))
+
+
+def test_failure_links_find_overlapping_phrases():
+    automaton = PhraseAutomaton(["he", "she", "his", "hers"])
+    assert _matches(automaton, "ushers") == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_mismatch_falls_back_to_a_suffix_state():
+    # "abc" fails at "e" inside "abcd"; the failure link must still report "bc"
+    automaton = PhraseAutomaton(["abcd", "bc"])
+    assert _matches(automaton, "xabce") == [(2, 4, "bc")]
+
+
+def test_no_phrases():
+    assert list(PhraseAutomaton([]).scan("anything")) == []
+
+
+def test_whole_word_filter():
+    rules = RuleSet(DEFAULT_RULES)
+    assert rules.scan("A secure platform that procures leads") == []
+    assert [match["phrase"] for match in rules.scan("It cures everything")] == ["cures"]
+
+
+def test_overlapping_hits_keep_the_leftmost_longest():
+    rules = RuleSet(DEFAULT_RULES)
+    matches = rules.scan("Guaranteed Results, every time")
+    assert [(match["phrase"], match["start"], match["end"]) for match in matches] == [("Guaranteed Results", 0, 18)]
+    assert matches[0]["rule"] == "absolute_guarantee"
+
+
+def test_regex_rules_and_assessment():
+    result = RuleSet(DEFAULT_RULES).assess("Act now and share your data with third parties")
+    assert result["risk_level"] == "high"
+    assert result["gdpr_compliant"] is False
+    assert result["flagged_phrases"] == ["Act now", "share your data", "with third parties"]
+
+
+def test_disabled_rule_is_skipped():
+    rules = RuleSet([dict(rule, enabled=rule["id"] != "health_claim") for rule in DEFAULT_RULES])
+    assert rules.scan("a miracle cure") == []
+
+
+def test_check_route_answers_clean_text_from_the_rules(make_app):
+    client = make_app(MODULES=["compliance"]).test_client()
+    clean = client.post("/api/compliance/check", json={"marketing_text": "Our platform helps sales teams"})
+    assert clean.status_code == 200 and clean.get_json()["path"] == "rules"
+    flagged = client.post("/api/compliance/check", json={"marketing_text": "Guaranteed results, act now"})
+    assert flagged.get_json()["path"] == "llm"
+    assert "Guaranteed results" in flagged.get_json()["flagged_phrases"]
+    assert client.post("/api/compliance/check", json={"marketing_text": ["x"]}).status_code == 400
@@ -0,0 +1,91 @@
+import os
+import json
+import pytest
+from compliance_rules import RuleSet, DEFAULT_RULES
+from compliance_scan import assets_from_records, scan_chunks, scan_pool, scan_to_file
+
+ASSETS = [{"id": f"a{i}", "copy": "Guaranteed results" if i % 2 else "Our platform", "text": f"plain {i}"}
+          for i in range(10)]
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "ads.ndjson"
+    path.write_text("".join(json.dumps(asset) + "\n" for asset in ASSETS) + "not json\n")
+    return str(path)
+
+
+def _interrupt_after_first_chunk(state):
+    raise Interrupted
+
+
+def _ids(path):
+    with open(path) as f:
+        return [json.loads(line)["id"] for line in f]
+
+
+def test_records_yield_ids_and_text():
+    assets = list(assets_from_records(["hi", {"id": "x", "body": "yo"}, {"other": 1}, 7], "body"))
+    assert assets == [(0, "hi"), ("x", "yo"), (2, None), (3, None)]
+
+
+def test_resume_continues_after_the_last_checkpoint(source, tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    rules = RuleSet(DEFAULT_RULES)
+    with pytest.raises(Interrupted):
+        scan_to_file(source, output, rules, chunk_size=4, text_field="copy", progress=_interrupt_after_first_chunk)
+    with open(output, "a") as f:
+        f.write('{"id": "partial')  # a chunk that was being written when the process died
+    summary = scan_to_file(source, output, rules, chunk_size=4, text_field="copy")
+    assert summary["resumed_from"] == 4 and summary["total"] == 11
+    assert summary["flagged"] == 5 and summary["errors"] == 1
+    assert summary["checkpoint_mismatch"] == []
+    assert _ids(output) == [f"a{i}" for i in range(10)] + [10]
+
+
+@pytest.mark.parametrize("change", ["text_field", "rules_version"])
+def test_checkpoint_for_other_settings_starts_over(source, tmp_path, change):
+    output = str(tmp_path / "out.jsonl")
+    with pytest.raises(Interrupted):
+        scan_to_file(source, output, RuleSet(DEFAULT_RULES), chunk_size=4, text_field="copy",
+                     progress=_interrupt_after_first_chunk)
+    rules = RuleSet(DEFAULT_RULES[1:]) if change == "rules_version" else RuleSet(DEFAULT_RULES)
+    summary = scan_to_file(source, output, rules, chunk_size=4,
+                           text_field="text" if change == "text_field" else "copy")
+    assert summary["resumed_from"] == 0 and summary["checkpoint_mismatch"] == [change]
+    assert len(_ids(output)) == 11
+
+
+def test_shared_pool_keeps_input_order():
+    rules = RuleSet(DEFAULT_RULES)
+    assets = list(assets_from_records(ASSETS, "copy"))
+    pool = scan_pool(rules, 2)
+    try:
+        for _ in range(2):  # the pool outlives a scan
+            results = [result for chunk in scan_chunks(assets, rules, 2, 3, pool) for result in chunk]
+            assert [result["id"] for result in results] == [asset_id for asset_id, _ in assets]
+            assert results == [result for chunk in scan_chunks(assets, rules, 1, 3) for result in chunk]
+    finally:
+        pool.shutdown()
+
+
+def test_batch_route_reuses_the_app_pool(make_app, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)  # the route caps workers at the CPU count
+    app = make_app(MODULES=["compliance"])
+    client = app.test_client()
+    ai = app.extensions["ai_services"].ai
+    pools = []
+    try:
+        for _ in range(2):
+            response = client.post("/api/compliance/check/batch?workers=2&chunk_size=3", json={"assets": ASSETS})
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            assert [line["id"] for line in lines] == [asset["id"] for asset in ASSETS]
+            pools.append(ai._scan_pool)
+    finally:
+        if ai._scan_pool is not None:
+            ai._scan_pool.shutdown()
+    assert pools[0] is not None and pools[0] is pools[1]
@@ -0,0 +1,97 @@
+import os
+import time
+import pytest
+import job_queue
+from job_queue import JobQueue, JobStore, QUEUED, RUNNING, SUCCEEDED, FAILED
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def wait_finished(get_job, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get_job(job_id)
+        if job["status"] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_jobs_run_and_record_results_and_errors(store):
+    def fail(payload):
+        raise RuntimeError("boom")
+
+    queue = JobQueue(store, {"double": lambda payload: payload["n"] * 2, "fail": fail}, workers=2)
+    queue.start()
+    try:
+        done = wait_finished(queue.get, queue.submit("double", {"n": 21}))
+        failed = wait_finished(queue.get, queue.submit("fail", {}))
+    finally:
+        queue.stop(timeout=5)
+    assert done["result"] == 42 and done["attempts"] == 1
+    assert failed["error"] == "boom" and "result" not in failed
+    assert queue.stats()["jobs"] == {QUEUED: 0, RUNNING: 0, SUCCEEDED: 1, FAILED: 1}
+    with pytest.raises(ValueError):
+        queue.submit("unknown", {})
+
+
+def test_recover_requeues_jobs_of_exited_processes_only(store):
+    stale = store.create("demo", {})
+    store.claim()
+    store._conn.execute("UPDATE jobs SET owner = ? WHERE id = ?", (2 ** 22 + 12345, stale))  # no such pid
+    ours = store.create("demo", {})
+    store.claim()  # running on "our" worker: claimed in this process
+    left_behind = store.create("demo", {})
+    store.claim()
+    store._conn.execute("UPDATE jobs SET owner = ? WHERE id = ?", (os.getpid(), left_behind))
+    job_queue._claimed_here.discard(left_behind)  # an earlier process that had our pid
+
+    assert store.recover(max_attempts=3) == 2
+    assert [store.get(job_id)["status"] for job_id in (stale, ours, left_behind)] == [QUEUED, RUNNING, QUEUED]
+    store.finish(ours, result={})
+
+
+def test_recover_fails_jobs_interrupted_too_often(store):
+    job_id = store.create("demo", {})
+    store.claim()
+    store._conn.execute("UPDATE jobs SET owner = NULL, attempts = 3 WHERE id = ?", (job_id,))
+    assert store.recover(max_attempts=3) == 0
+    assert store.get(job_id)["error"] == "Interrupted by a restart too many times"
+
+
+def test_purge_removes_only_old_finished_jobs(store):
+    old = store.create("demo", {})
+    store.claim()
+    store.finish(old, result=1)
+    queued = store.create("demo", {})
+    assert store.purge(time.time() + 1) == 1
+    assert store.get(old) is None and store.get(queued)["status"] == QUEUED
+
+
+def test_events_end_with_done(store):
+    queue = JobQueue(store, {"demo": lambda payload: "ok"}, workers=1)
+    job_id = queue.submit("demo", {})
+    events = queue.events(job_id)
+    assert next(events)[0] == "status"
+    queue.start()
+    try:
+        remaining = list(events)
+    finally:
+        queue.stop(timeout=5)
+    assert remaining[-1] == ("done", queue.get(job_id))
+    assert list(queue.events("missing")) == [("error", {"job_id": "missing", "error": "Unknown job"})]
+
+
+def test_async_batch_request_returns_a_job(make_app):
+    client = make_app(MODULES=["generator"]).test_client()
+    response = client.post("/api/generator/lead-score/batch?async=true", json={"leads": [
+        {"budget": "$80k", "timeline": "Immediate", "urgency": "High"}
+    ]})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    job = wait_finished(lambda job_id: client.get(f"/api/jobs/{job_id}").get_json(), job_id)
+    assert job["result"]["count"] == 1
+    assert client.get("/api/jobs/missing").status_code == 404
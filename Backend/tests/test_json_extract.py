@@ -0,0 +1,62 @@
+from json_extract import extract_json, validate, parse
+
+
+def test_plain_object():
+    assert extract_json('  {"a": 1}  ') == {"a": 1}
+
+
+def test_prose_and_code_fence_around_object():
+    text = 'Here is the analysis:\n```json\n{"sentiment": "positive"}\n```\nHope this helps {sic'
+    assert extract_json(text) == {"sentiment": "positive"}
+
+
+def test_braces_inside_strings_do_not_count():
+    text = 'Result: {"summary": "use } and {{ freely", "n": 1} and then {"other": 2}'
+    assert extract_json(text) == {"summary": "use } and {{ freely", "n": 1}
+
+
+def test_escaped_quotes_stay_inside_the_string():
+    text = r'Answer {"summary": "he said \"}\" twice", "n": 2} done'
+    assert extract_json(text) == {"summary": 'he said "}" twice', "n": 2}
+
+
+def test_escaped_backslash_ends_before_the_quote():
+    text = r'x {"path": "C:\\", "n": 3} y'
+    assert extract_json(text) == {"path": "C:\\", "n": 3}
+
+
+def test_invalid_balanced_candidate_is_skipped():
+    assert extract_json('{not json} then {"a": 1}') == {"a": 1}
+
+
+def test_unclosed_brace_in_prose_does_not_hide_a_later_object():
+    assert extract_json('Fill in {name and reply with {"a": 1}') == {"a": 1}
+
+
+def test_object_nested_in_an_invalid_candidate_is_found():
+    assert extract_json('{note: see {"a": 1} below}') == {"a": 1}
+
+
+def test_no_object():
+    assert extract_json('{"a": 1') is None
+    assert extract_json("no json here") is None
+    assert extract_json(None) is None
+
+
+def test_validate_normalizes_enums_and_numeric_strings():
+    data, errors = validate({"sentiment": " Positive ", "confidence": "0.8", "summary": "ok"}, "sentiment")
+    assert errors == []
+    assert data["sentiment"] == "positive"
+    assert data["confidence"] == 0.8
+
+
+def test_validate_reports_missing_and_out_of_range_fields():
+    _, errors = validate({"sentiment": "great", "confidence": 2}, "sentiment")
+    assert "'sentiment' must be one of positive/neutral/negative" in errors
+    assert "'confidence' must be between 0 and 1" in errors
+    assert "missing 'summary'" in errors
+
+
+def test_parse_passes_upstream_errors_through():
+    assert parse("AI Error: timeout", "sentiment") == (None, ["AI Error: timeout"])
+    assert parse("nothing", "sentiment") == (None, ["no JSON object found"])
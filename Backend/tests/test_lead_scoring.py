@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from lead_scoring import parse_budget_value, score_lead, score_leads, budget_scores, top_lead_indices
+
+
+@pytest.mark.parametrize("text, value", [
+    ("$50,000", 50000), ("1.5M", 1.5e6), ("$50k", 50000), ("2 million", 2e6),
+    ("USD 3bn", 3e9), (".5m", 5e5), (75000, 75000), ("about 12 thousand", 12000)
+])
+def test_parse_budget_value_expands_suffixes(text, value):
+    assert parse_budget_value(text) == value
+
+
+def test_parse_budget_value_without_suffixes_strips_non_digits():
+    assert parse_budget_value("$1.5M", expand_suffixes=False) == 1.5
+    with pytest.raises(ValueError):
+        parse_budget_value("TBD")
+
+
+def test_vectorized_scores_match_the_scalar_scorer():
+    budgets = ["$5,000", "$25k", "1.5M", "TBD", "$5,000", 80000]
+    timelines = ["Immediate", "This Quarter", "Next Year", "unknown", "Immediate", "this month"]
+    urgencies = ["High", "Medium", "Low", "", "High", "critical"]
+    scored = score_leads(budgets, timelines, urgencies)
+    expected = [score_lead(*lead) for lead in zip(budgets, timelines, urgencies)]
+    assert scored["lead_score"].tolist() == [score for score, _ in expected]
+    assert scored["conversion_probability"].tolist() == [probability for _, probability in expected]
+    assert budget_scores(["TBD", "$9,999", "$10k", "$50k"]).tolist() == [50, 30, 60, 100]
+
+
+def test_top_lead_indices_is_stable():
+    assert top_lead_indices(np.array([50, 90, 90, 10]), 2).tolist() == [1, 2]
+    assert top_lead_indices(np.array([50]), 0).tolist() == []
+
+
+def test_batch_route_scores_without_upstream(make_app):
+    client = make_app(MODULES=["generator"]).test_client()
+    response = client.post("/api/generator/lead-score/batch", json={"leads": [
+        {"budget": "$80k", "timeline": "Immediate", "urgency": "High"},
+        {"budget": "$2k", "timeline": "Next year", "urgency": "Low"}
+    ]})
+    assert response.status_code == 200
+    leads = response.get_json()["result"]["leads"]
+    assert [lead["lead_score"] for lead in leads] == [score_lead("$80k", "Immediate", "High")[0],
+                                                      score_lead("$2k", "Next year", "Low")[0]]
+
+
+def test_batch_route_rejects_bad_leads(make_app):
+    client = make_app(MODULES=["generator"]).test_client()
+    assert client.post("/api/generator/lead-score/batch", json={"leads": ["x"]}).status_code == 400
+    assert client.post("/api/generator/lead-score/batch", json={"leads": []}).status_code == 400
+
+
+@pytest.mark.parametrize("payload", [
+    {"budget": "$50k", "timeline": 3, "urgency": "High"},
+    {"budget": "$50k", "timeline": "Immediate", "urgency": None},
+    {"budget": ["$50k"], "timeline": "Immediate", "urgency": "High"},
+    {"budget": True, "timeline": "Immediate", "urgency": "High"}
+])
+def test_score_lead_rejects_wrong_types(make_app, payload):
+    response = make_app(MODULES=["generator"]).test_client().post("/api/score-lead", json=payload)
+    assert response.status_code == 400
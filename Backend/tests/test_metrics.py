@@ -0,0 +1,116 @@
+import asyncio
+import time
+import pytest
+import metrics
+from metrics import Counter, Histogram
+
+
+@pytest.fixture
+def metrics_on(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", True)
+
+
+def test_counter_renders_escaped_labels():
+    counter = Counter("demo_total", "Demo.", ("route",))
+    counter.inc('/a"b\\c\nd')
+    counter.inc('/a"b\\c\nd', amount=2)
+    assert counter.render() == [
+        "# HELP demo_total Demo.", "# TYPE demo_total counter", 'demo_total{route="/a\\"b\\\\c\\nd"} 3']
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("demo_seconds", "Demo.", ("method",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "m")
+    lines = histogram.render()[2:]
+    assert lines == [
+        'demo_seconds_bucket{method="m",le="0.1"} 1',
+        'demo_seconds_bucket{method="m",le="1.0"} 3',
+        'demo_seconds_bucket{method="m",le="+Inf"} 4',
+        'demo_seconds_sum{method="m"} 6.05',
+        'demo_seconds_count{method="m"} 4'
+    ]
+
+
+def test_track_method_labels_sync_async_and_generators(metrics_on):
+    seen = []
+
+    @metrics.track_method()
+    def sync_method():
+        seen.append(metrics._current_method.get())
+
+    @metrics.track_method("renamed")
+    async def async_method():
+        seen.append(metrics._current_method.get())
+
+    @metrics.track_method()
+    def stream_method():
+        for _ in range(2):
+            seen.append(metrics._current_method.get())
+            yield
+
+    sync_method()
+    asyncio.run(async_method())
+    for _ in stream_method():
+        seen.append(metrics._current_method.get())  # between steps the caller's label applies
+    assert seen == ["sync_method", "renamed", "stream_method", "other", "stream_method", "other"]
+
+
+def test_recording_helpers_do_nothing_when_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+    before = metrics.llm_fallbacks.render()
+    metrics.record_fallback("sentiment", "AI Error: x")
+    assert metrics.llm_fallbacks.render() == before
+
+
+def test_fallback_reasons(metrics_on):
+    metrics.record_fallback("demo_module", "AI Error: timeout")
+    metrics.record_fallback("demo_module", "not json")
+    lines = metrics.llm_fallbacks.render()
+    assert 'llm_fallback_total{module="demo_module",reason="upstream_error"} 1' in lines
+    assert 'llm_fallback_total{module="demo_module",reason="invalid_json"} 1' in lines
+
+
+def test_metrics_endpoint(make_app, metrics_on):
+    client = make_app(MODULES=["pricing"]).test_client()
+    client.post("/api/pricing/optimize", json={"cost": 100, "demand_index": 1.0, "competitor_price": 120})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{route="/api/pricing/optimize",method="POST",status="200"}' in text
+    assert "# TYPE llm_cache_hits_total counter" in text
+    assert "llm_circuit_open 0" in text
+
+
+def test_no_metrics_route_when_disabled(make_app, monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+    assert make_app(MODULES=["pricing"]).test_client().get("/metrics").status_code == 404
+
+
+def test_micro_batched_calls_keep_their_method_label(make_app, metrics_on, monkeypatch):
+    monkeypatch.setenv("LLM_MICRO_BATCH", "true")
+    monkeypatch.setenv("LLM_MICRO_BATCH_MAX_WAIT_MS", "50")
+    ai = make_app(MODULES=["market"]).extensions["ai_services"].ai
+    before = metrics.llm_upstream_duration.render()
+    futures = [ai._submit_classification("sentiment", f"review {i}", use_cache=False) for i in range(3)]
+    assert all(future.result(timeout=10) for future in futures)
+    added = [line for line in metrics.llm_upstream_duration.render() if line not in before]
+    assert any('method="analyze_sentiment"' in line for line in added)
+    assert not any('method="other"' in line for line in added)
+
+
+def test_job_workers_label_calls_with_the_job_type(metrics_on, tmp_path):
+    from job_queue import JobQueue, JobStore
+    queue = JobQueue(JobStore(str(tmp_path / "jobs.sqlite3")),
+                     {"demo": lambda payload: {"method": metrics._current_method.get()}}, workers=1)
+    queue.start()
+    try:
+        job_id = queue.submit("demo", {})
+        for _ in range(100):
+            if queue.get(job_id)["status"] == "succeeded":
+                break
+            time.sleep(0.05)
+    finally:
+        queue.stop(timeout=5)
+    assert queue.get(job_id)["result"] == {"method": "demo"}
@@ -0,0 +1,79 @@
+import threading
+import pytest
+from micro_batcher import MicroBatcher
+from rate_limiter import request_priority
+
+
+def test_full_batches_close_without_waiting_for_the_window():
+    seen = []
+    batcher = MicroBatcher("demo", lambda items: seen.append(list(items)) or [item * 2 for item in items],
+                           max_batch_size=3, max_wait=60)
+    futures = [batcher.submit(i) for i in range(6)]
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6, 8, 10]
+    assert seen == [[0, 1, 2], [3, 4, 5]]
+    assert batcher.stats()["full_batches"] == 2
+
+
+def test_partial_batch_goes_when_the_window_closes():
+    batcher = MicroBatcher("demo", lambda items: [len(items)] * len(items), max_batch_size=8, max_wait=0.02)
+    futures = [batcher.submit(i) for i in range(2)]
+    assert [future.result(timeout=5) for future in futures] == [2, 2]
+    assert batcher.stats()["largest_batch"] == 2
+
+
+def test_errors_fail_their_own_items_or_the_whole_batch():
+    batcher = MicroBatcher("demo", lambda items: [ValueError(item) if item == "bad" else item for item in items],
+                           max_batch_size=2, max_wait=60)
+    good, bad = batcher.submit("ok"), batcher.submit("bad")
+    assert good.result(timeout=5) == "ok"
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+
+    short = MicroBatcher("demo", lambda items: items[:1], max_batch_size=2, max_wait=60)
+    futures = [short.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+
+@pytest.fixture
+def batching_ai(monkeypatch):
+    monkeypatch.setenv("LLM_MICRO_BATCH", "true")
+    monkeypatch.setenv("LLM_MICRO_BATCH_MAX_SIZE", "3")
+    monkeypatch.setenv("LLM_MICRO_BATCH_MAX_WAIT_MS", "60000")
+    from ai_service import AIService
+    ai = AIService()
+    calls = []
+
+    def fake_call(prompt, use_cache=False, timeout="default", priority=None, json_mode=False, request_key=None):
+        calls.append(priority)
+        return "AI Error: offline"
+
+    monkeypatch.setattr(ai, "_call_groq", fake_call)
+    return ai, calls
+
+
+def test_batch_call_uses_the_most_urgent_priority_of_its_items(batching_ai):
+    ai, calls = batching_ai
+    futures = []
+
+    def submit(priority, text):
+        with request_priority(priority):
+            futures.append(ai._submit_classification("sentiment", text, use_cache=False))
+
+    submit("batch", "first")
+    thread = threading.Thread(target=submit, args=("interactive", "second"))  # another request's thread
+    thread.start()
+    thread.join()
+    submit("batch", "third")
+    for future in futures:
+        future.result(timeout=5)
+    assert calls == ["interactive"]
+
+
+def test_items_sent_alone_keep_their_own_priority(batching_ai, monkeypatch):
+    ai, calls = batching_ai
+    monkeypatch.setattr(ai.micro_batchers["sentiment"], "max_wait", 0.01)
+    with request_priority("interactive"):
+        ai._submit_classification("sentiment", "only one", use_cache=False).result(timeout=5)
+    assert calls and set(calls) == {"interactive"}
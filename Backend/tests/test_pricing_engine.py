@@ -0,0 +1,49 @@
+import json
+import numpy as np
+import pytest
+from ai_service import AIService
+from pricing_engine import optimize_prices, stream_price_rows, to_float_array
+
+
+def test_batch_matches_dynamic_price():
+    ai = AIService()
+    rows = [(100, 1.3, 120), (50, 0.6, 45), (80, 1.0, 95)]
+    result = optimize_prices(*zip(*rows))
+    for i, row in enumerate(rows):
+        single = ai.dynamic_price(*row)
+        assert result["optimal_price"][i] == pytest.approx(single["optimal_price"], abs=0.01)
+        assert result["margin_percent"][i] == pytest.approx(single["margin_percent"], abs=0.01)
+    assert result["reason_code"].tolist() == ["high_demand", "low_demand", "stable_demand"]
+
+
+def test_invalid_rows_are_flagged_not_raised():
+    result = optimize_prices(["abc", 0, 10], [1.0, 1.0, None], [10, 10, 10])
+    assert np.isnan(result["optimal_price"]).tolist() == [True, True, True]
+    assert result["reason_code"].tolist() == ["invalid_input"] * 3
+    assert np.isnan(to_float_array(["1", "x"])[1])
+    with pytest.raises(ValueError):
+        optimize_prices([1, 2], [1], [1, 2])
+
+
+def test_stream_rows_in_chunks():
+    columns = {"sku": ["A", "B", "C"]}
+    result = optimize_prices([100, "bad", 10], [1.0, 1.0, 1.0], [100, 100, 10])
+    chunks = list(stream_price_rows(columns, result, chunk_size=2))
+    assert len(chunks) == 2
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [row["sku"] for row in rows] == ["A", "B", "C"]
+    assert rows[1]["optimal_price"] is None and rows[1]["reason_code"] == "invalid_input"
+    csv_text = "".join(stream_price_rows(columns, result, "csv"))
+    assert csv_text.splitlines()[0] == "sku,optimal_price,margin_percent,reason_code"
+    assert csv_text.splitlines()[2] == "B,,,invalid_input"
+
+
+def test_batch_route_accepts_csv(make_app):
+    client = make_app(MODULES=["pricing"]).test_client()
+    body = "sku,cost,demand_index,competitor_price\nA,100,1.3,120\nB,50,0.6,45\n"
+    response = client.post("/api/pricing/optimize/batch?format=csv", data=body, content_type="text/csv")
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert [line.split(",")[0] for line in lines] == ["sku", "A", "B"]
+    missing = client.post("/api/pricing/optimize/batch", json={"cost": [1]})
+    assert missing.status_code == 400
@@ -0,0 +1,70 @@
+import pytest
+from product_index import ProductIndex, normalize_products, tokenize, load_product_index
+
+CATALOG = [
+    {"id": "crm", "name": "Predictive CRM", "category": "sales", "tags": "pipeline forecasting",
+     "description": "Forecast pipeline and deal risk for sales teams"},
+    {"id": "sec", "name": "Zero Trust Gateway", "category": "security", "tags": "compliance audit",
+     "description": "Access control and audit logs for regulated companies"},
+    {"name": "Payroll Cloud", "category": "finance", "description": "Payroll and expenses " + "x" * 400},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ProductIndex.build(CATALOG, str(tmp_path / "index"), dim=256)
+
+
+def test_tokenize_drops_stopwords_and_numbers():
+    assert tokenize("The VP of Sales at a 200-person SaaS") == ["vp", "sales", "person", "saas"]
+
+
+def test_normalize_fills_ids_and_trims_descriptions():
+    products = normalize_products(CATALOG)
+    assert [product["id"] for product in products] == ["crm", "sec", "3"]
+    assert len(products[2]["description"]) == 240
+    with pytest.raises(ValueError):
+        normalize_products([{"id": "a", "name": "A"}, {"id": "a", "name": "B"}])
+    with pytest.raises(ValueError):
+        normalize_products([{"id": "a"}])
+
+
+def test_search_ranks_by_shared_terms(index):
+    results = index.search({"role": "Head of Sales", "needs": "pipeline forecasting"}, k=3)
+    assert [result["id"] for result in results] == ["crm"]  # products sharing no word are left out
+    assert "pipeline" in results[0]["matched_terms"] and 0 < results[0]["score"] <= 1
+    assert index.search("compliance audit for a bank")[0]["id"] == "sec"
+    assert index.search("12345") == []
+
+
+def test_reopened_index_matches_the_built_one(index, tmp_path):
+    reopened = load_product_index(index.path)
+    assert reopened.version == index.version and reopened.stats()["products"] == 3
+    assert reopened.search("payroll expenses") == index.search("payroll expenses")
+    assert load_product_index(str(tmp_path / "missing")) is None
+
+
+def test_version_follows_the_catalog(tmp_path):
+    first = ProductIndex.build(CATALOG, str(tmp_path / "a"), dim=256)
+    second = ProductIndex.build(CATALOG[:2], str(tmp_path / "b"), dim=256)
+    assert first.version != second.version
+    assert ProductIndex.build(CATALOG, str(tmp_path / "c"), dim=256).version == first.version
+
+
+def test_other_services_pick_up_a_rebuilt_index():
+    from ai_service import AIService
+    writer, reader = AIService(), AIService()
+    assert reader.current_product_index() is None
+    writer.rebuild_product_index(CATALOG, dim=256)
+    assert reader.current_product_index().version == writer.product_index.version
+
+
+def test_catalog_upload_grounds_recommendations(make_app):
+    client = make_app(MODULES=["personalization"]).test_client()
+    built = client.post("/api/personalize/catalog", json={"products": CATALOG, "dim": 256})
+    assert built.status_code == 200 and built.get_json()["products"] == 3
+    result = client.post("/api/personalize", json={"user_profile": "VP Sales who needs pipeline forecasting"})
+    result = result.get_json()
+    assert result["catalog"]["candidates"] >= 1
+    assert {product.get("id") for product in result["recommended_products"]} <= {"crm", "sec", "3"}
+    assert client.post("/api/personalize/catalog", json={"products": [{"id": "x"}]}).status_code == 400
@@ -0,0 +1,41 @@
+import pytest
+import prompts
+from ai_service import AIService
+from prompts import PromptRegistry, PromptTemplate
+
+
+def test_render_fills_fields_and_records_sizes():
+    template = PromptTemplate("demo", 1, "Say {greeting} to {name}, {{literally}}.")
+    assert template.fields == ("greeting", "name")
+    assert template.render(greeting="hi", name=42) == "Say hi to 42, {literally}."
+    assert template.estimate(greeting="hi", name=42) == template.stats()["max_tokens"]
+    assert template.stats()["renders"] == 1
+    with pytest.raises(KeyError):
+        template.render(greeting="hi")
+
+
+def test_only_plain_placeholders_are_allowed():
+    with pytest.raises(ValueError):
+        PromptTemplate("demo", 1, "{value:.2f}")
+
+
+def test_registry_uses_the_highest_version():
+    registry = PromptRegistry([PromptTemplate("demo", 1, "old {x}"), PromptTemplate("demo", 2, "new {x}")])
+    assert registry.render("demo", x=1) == "new 1"
+    assert registry.get("demo", 1).render(x=1) == "old 1"
+    with pytest.raises(ValueError):
+        registry.register(PromptTemplate("demo", 2, "again"))
+
+
+def test_digest_follows_the_text_not_the_version():
+    assert PromptTemplate("demo", 1, "a {x}").digest == PromptTemplate("demo", 7, "a {x}").digest
+    assert PromptTemplate("demo", 1, "a {x}").digest != PromptTemplate("demo", 1, "b {x}").digest
+
+
+def test_segment_fingerprint_changes_when_a_prompt_is_reworded_without_a_bump(monkeypatch):
+    ai = AIService()
+    before = ai.segment_fingerprint()
+    reworded = [PromptTemplate(t.name, t.version, "Reworded {user_profile}") if t.name == "recommendations" else t
+                for t in prompts.TEMPLATES]
+    monkeypatch.setattr(ai, "prompts", PromptRegistry(reworded))
+    assert ai.segment_fingerprint() != before
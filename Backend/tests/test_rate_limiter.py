@@ -0,0 +1,96 @@
+import time
+import asyncio
+import threading
+import pytest
+from rate_limiter import TokenBucket, RateLimiter, RateLimitExceeded, build_rate_limiter
+
+
+def test_bucket_refills_at_per_minute_over_60():
+    bucket = TokenBucket(60)
+    start = bucket.updated
+    assert bucket.wait_time(60, start) == 0.0
+    bucket.take(60)
+    assert bucket.wait_time(1, start) == pytest.approx(1.0)
+    assert bucket.wait_time(1, start + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(1, start + 1.0) == 0.0
+
+
+def test_bucket_caps_refill_and_oversized_requests():
+    bucket = TokenBucket(60)
+    start = bucket.updated
+    bucket.wait_time(0, start + 600)
+    assert bucket.tokens == 60
+    bucket.take(1000)
+    assert bucket.tokens == 0
+    assert bucket.wait_time(1000, start + 600) == pytest.approx(60.0)
+
+
+def test_settle_charges_the_estimate_difference():
+    limiter = RateLimiter(tpm=1000)
+    limiter.acquire(tokens=100)
+    limiter.settle(100, 400)
+    assert limiter.stats()["tokens_available"] == 600
+
+
+def test_request_past_its_deadline_is_shed():
+    limiter = RateLimiter(rpm=1, max_wait={"interactive": 0.05})
+    limiter.acquire(priority="interactive")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(priority="interactive")
+    stats = limiter.stats()
+    assert stats["granted"]["interactive"] == 1
+    assert stats["shed"]["interactive"] == 1
+    assert stats["queued"] == 0
+
+
+def test_async_request_is_shed():
+    limiter = RateLimiter(rpm=1, max_wait={"batch": 0.05})
+    limiter.acquire(priority="batch")
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(limiter.acquire_async(priority="batch"))
+    assert limiter.stats()["queued"] == 0
+
+
+def test_budget_is_split_across_workers(monkeypatch):
+    monkeypatch.setenv("GROQ_RPM_LIMIT", "30")
+    monkeypatch.setenv("GROQ_TPM_LIMIT", "0")
+    monkeypatch.setenv("GROQ_RATE_LIMIT_WORKERS", "4")
+    limiter = build_rate_limiter()
+    assert (limiter.rpm, limiter.tpm) == (7, 0)
+    monkeypatch.setenv("GROQ_RPM_LIMIT", "0")
+    assert build_rate_limiter() is None
+
+
+def test_interactive_callers_jump_the_queue():
+    limiter = RateLimiter(rpm=600)
+    limiter._requests.tokens = 0  # empty bucket: one grant every 0.1 s
+    order = []
+
+    def caller(priority):
+        limiter.acquire(priority=priority)
+        order.append(priority)
+
+    batch = threading.Thread(target=caller, args=("batch",))
+    batch.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=caller, args=("interactive",))
+    interactive.start()
+    batch.join()
+    interactive.join()
+    assert order == ["interactive", "batch"]
+
+
+def test_interrupted_wait_does_not_wedge_the_queue(monkeypatch):
+    limiter = RateLimiter(rpm=1)
+    limiter.acquire()
+
+    def interrupted(timeout=None):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(limiter._cond, "wait", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        limiter.acquire()
+    monkeypatch.undo()
+    assert limiter.stats()["queued"] == 0
+    limiter._requests.tokens = 1
+    limiter.acquire()  # the next caller is not stuck behind a dead ticket
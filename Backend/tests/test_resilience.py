@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from rate_limiter import RateLimiter, RateLimitExceeded
+from resilience import (CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retries,
+                        call_with_retries_async, parse_retry_after)
+
+NO_DELAY = RetryPolicy(max_attempts=3, base_delay=0)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+def _sender(*outcomes):
+    """send() returning/raising the given outcomes in order; counts calls."""
+    outcomes = list(outcomes)
+
+    def send():
+        send.calls += 1
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return FakeResponse(outcome)
+    send.calls = 0
+    return send
+
+
+def _open_breaker(reset_timeout=0.0):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.before_call() is False
+    breaker.record_failure()
+    assert breaker.state()["state"] == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.state()["rejected_calls"] == 1
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = _open_breaker()
+    assert breaker.before_call() is True
+    assert breaker.state()["state"] == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state()["state"] == "closed"
+    assert breaker.before_call() is False
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = _open_breaker(reset_timeout=60)
+    breaker._opened_at -= 60
+    assert breaker.before_call() is True
+    breaker.record_failure()
+    state = breaker.state()
+    assert state["state"] == "open"
+    assert state["times_opened"] == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_retries_retryable_status_then_returns():
+    breaker = CircuitBreaker(failure_threshold=5)
+    send = _sender(503, 200)
+    assert call_with_retries(send, NO_DELAY, breaker, (ConnectionError,)).status_code == 200
+    assert send.calls == 2
+    assert breaker.state()["consecutive_failures"] == 0
+
+
+def test_non_retryable_status_is_returned_immediately():
+    send = _sender(400)
+    assert call_with_retries(send, NO_DELAY, CircuitBreaker(), (ConnectionError,)).status_code == 400
+    assert send.calls == 1
+
+
+def test_transport_errors_count_as_failures_and_reraise():
+    breaker = CircuitBreaker(failure_threshold=5)
+    send = _sender(ConnectionError(), ConnectionError(), ConnectionError())
+    with pytest.raises(ConnectionError):
+        call_with_retries(send, NO_DELAY, breaker, (ConnectionError,))
+    assert send.calls == 3
+    assert breaker.state()["consecutive_failures"] == 3
+
+
+def test_unexpected_error_in_probe_releases_it():
+    breaker = _open_breaker()
+    with pytest.raises(ValueError):
+        call_with_retries(_sender(ValueError("boom")), NO_DELAY, breaker, (ConnectionError,))
+    assert breaker.before_call() is True  # the next call may probe instead of failing fast
+
+
+def test_cancelled_async_probe_releases_it():
+    breaker = _open_breaker()
+
+    async def send():
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(call_with_retries_async(send, NO_DELAY, breaker, (ConnectionError,)))
+    assert breaker.before_call() is True
+
+
+def test_shed_request_never_reaches_the_breaker():
+    breaker = _open_breaker()
+    limiter = RateLimiter(rpm=1, max_wait={"interactive": 0.05})
+    limiter.acquire(priority="interactive")
+    send = _sender(200)
+    with pytest.raises(RateLimitExceeded):
+        call_with_retries(send, NO_DELAY, breaker, (ConnectionError,),
+                          acquire=lambda: limiter.acquire(priority="interactive"))
+    assert send.calls == 0
+    assert breaker.state()["consecutive_failures"] == 1
+    assert breaker.before_call() is True
+
+
+def test_retry_after_header():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
+    assert NO_DELAY.backoff(1, retry_after=5) == 5
@@ -0,0 +1,63 @@
+import time
+import pytest
+from response_cache import MemoryCacheBackend, SQLiteCacheBackend, ResponseCache, build_response_cache
+
+MESSAGES = [{"role": "user", "content": "Classify: great product"}]
+
+
+def test_key_is_stable_and_content_addressed():
+    key = ResponseCache.make_key("m", 0.0, MESSAGES)
+    assert key == ResponseCache.make_key("m", 0.0, [dict(MESSAGES[0])])
+    assert key != ResponseCache.make_key("m", 0.1, MESSAGES)
+    assert key != ResponseCache.make_key("other", 0.0, MESSAGES)
+    assert key != ResponseCache.make_key("m", 0.0, MESSAGES, {"type": "json_object"})
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=2)
+    return SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=2)
+
+
+def test_hits_misses_and_expiry(backend):
+    cache = ResponseCache(backend, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", "reply")
+    assert cache.get("a") == "reply"
+    backend.set("old", "stale", time.time() - 1)
+    assert cache.get("old") is None
+    assert len(backend) == 1  # the expired entry was deleted on read
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 2, 0.333)
+
+
+def test_least_recently_used_entry_is_evicted(backend):
+    cache = ResponseCache(backend, ttl=60)
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    cache.get("a")  # "b" is now the least recently used
+    time.sleep(0.01)
+    cache.set("c", "3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1", None, "3")
+
+
+def test_sqlite_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(SQLiteCacheBackend(path)).set("k", "v")
+    assert ResponseCache(SQLiteCacheBackend(path)).get("k") == "v"
+
+
+def test_build_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "none")
+    assert build_response_cache() is None
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "c.sqlite3"))
+    monkeypatch.setenv("LLM_CACHE_TTL", "5")
+    cache = build_response_cache()
+    assert isinstance(cache.backend, SQLiteCacheBackend) and cache.ttl == 5
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        build_response_cache()
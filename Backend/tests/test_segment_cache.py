@@ -0,0 +1,65 @@
+import pytest
+from segment_cache import SegmentStore, segment_key, validate_segments, known_segments
+
+RESULT = {"recommended_products": [{"name": "Predictive CRM", "reason": "fits", "priority": "high"}]}
+
+
+def test_profiles_that_only_describe_a_segment_map_to_a_key():
+    key = segment_key("VP Sales at a 200-person SaaS company")
+    assert key in known_segments()
+    assert segment_key({"role": "CFO", "industry": "banking", "company_size": 40}) in known_segments()
+    assert segment_key("VP Sales at a SaaS company who loves golf and hates spreadsheets") is None
+    with pytest.raises(ValueError):
+        validate_segments(["not/a/segment"])
+
+
+def test_only_rows_with_the_current_fingerprint_are_served():
+    store = SegmentStore()
+    assert store.get("sales/saas/mid", "v1") is None
+    store.put("sales/saas/mid", "v1", RESULT)
+    assert store.get("sales/saas/mid", "v1") == RESULT
+    assert store.get("sales/saas/mid", "v2") is None
+    stats = store.stats("v2")
+    assert (stats["hits"], stats["misses"], stats["stale_misses"], stats["fresh"]) == (1, 2, 1, 0)
+
+
+def test_request_counts_are_batched_and_order_the_refresh():
+    store = SegmentStore(flush_seconds=3600)
+    for segment, count in (("sales/saas/mid", 1), ("finance/banking/small", 3)):
+        for _ in range(count):
+            store.get(segment, "v1")
+    rows = store._conn.execute("SELECT COUNT(*) FROM segment_recommendations").fetchone()[0]
+    assert rows == 0  # nothing written by the lookups themselves
+    assert store.outdated("v1") == ["finance/banking/small", "sales/saas/mid"]
+    assert dict(store._conn.execute("SELECT segment, requests FROM segment_recommendations")) == {
+        "finance/banking/small": 3, "sales/saas/mid": 1}
+    store.put("finance/banking/small", "v1", RESULT)
+    assert store.outdated("v1", ["hr/retail/large"]) == ["sales/saas/mid", "hr/retail/large"]
+
+
+def test_counts_are_flushed_once_the_interval_passes():
+    store = SegmentStore(flush_seconds=0)
+    store.get("sales/saas/mid", "v1")
+    assert store._conn.execute("SELECT requests FROM segment_recommendations").fetchone()[0] == 1
+
+
+def test_refresh_is_rejected_when_the_cache_is_disabled(make_app, monkeypatch):
+    monkeypatch.setenv("SEGMENT_CACHE_BACKEND", "none")
+    client = make_app(MODULES=["personalization"]).test_client()
+    assert client.post("/api/personalize/segments/refresh", json={}).status_code == 409
+
+
+def test_refresh_job_precomputes_requested_segments(make_app, monkeypatch):
+    monkeypatch.setenv("SEGMENT_CACHE_BACKEND", "memory")
+    app = make_app(MODULES=["personalization"])
+    client = app.test_client()
+    profile = {"user_profile": "VP Sales at a 200-person SaaS company"}
+    first = client.post("/api/personalize", json=profile).get_json()
+    assert first["segment"] == segment_key(profile["user_profile"])
+    response = client.post("/api/personalize/segments/refresh", json={"segments": [first["segment"]], "force": True})
+    assert response.status_code == 202
+    jobs = app.extensions["ai_services"].jobs
+    events = list(jobs.events(response.get_json()["job_id"]))
+    assert events[-1][0] == "done" and events[-1][1]["result"]["refreshed"] == 1
+    stats = app.extensions["ai_services"].ai.segment_stats()
+    assert stats["fresh"] == 1
@@ -0,0 +1,63 @@
+import json
+import numpy as np
+from sentiment_lexicon import score_texts, score_text, escalation_indices, stream_sentiment_rows
+
+
+def test_polarity_and_negation():
+    result = score_texts(["Great product, I love it!", "Terrible support, totally useless.",
+                          "Not good at all.", "This is not bad."])
+    assert result["sentiment"].tolist() == ["positive", "negative", "negative", "positive"]
+
+
+def test_negation_stops_at_the_clause_boundary():
+    negated = score_texts(["not great"])["score"][0]
+    outside = score_texts(["not really, great"])["score"][0]
+    assert negated < 0 < outside
+
+
+def test_modifiers_scale_the_next_word():
+    plain, boosted, dampened = score_texts(["good", "very good", "slightly good"])["score"]
+    assert dampened < plain < boosted
+
+
+def test_batch_matches_single_texts():
+    texts = ["Amazing!", "", "meh", "Awful, broken and slow. But the staff were great."]
+    batch = score_texts(texts)
+    for i, text in enumerate(texts):
+        single = score_texts([text])
+        for key in ("sentiment", "confidence", "score", "matches", "ambiguous"):
+            assert batch[key][i] == single[key][0]
+
+
+def test_unknown_and_mixed_texts_are_ambiguous():
+    result = score_texts(["The package arrived on Tuesday", "great features but awful support"])
+    assert result["ambiguous"].tolist() == [True, True]
+    assert score_text("The package arrived on Tuesday") is None
+    confident = score_text("Excellent, fantastic service")
+    assert confident["sentiment"] == "positive" and confident["summary"].startswith("Positive wording")
+
+
+def test_escalation_picks_the_least_confident_ambiguous_rows():
+    result = {"ambiguous": np.array([True, False, True, True]), "confidence": np.array([0.4, 0.1, 0.0, 0.2])}
+    assert escalation_indices(result, 2).tolist() == [2, 3]
+    assert escalation_indices(result, 0).tolist() == []
+
+
+def test_stream_rows_mark_escalated_rows():
+    result = score_texts(["great", "hmm", "awful"])
+    result["escalated"] = {1: {"sentiment": "neutral", "confidence": 0.9}}
+    rows = [json.loads(line) for chunk in stream_sentiment_rows(["a", "b", "c"], result, chunk_size=2)
+            for line in chunk.splitlines()]
+    assert [row["path"] for row in rows] == ["lexicon", "llm", "lexicon"]
+    assert rows[1]["sentiment"] == "neutral"
+    csv_lines = "".join(stream_sentiment_rows(["a", "b", "c"], result, "csv")).splitlines()
+    assert csv_lines[0] == "id,sentiment,confidence,score,path,ambiguous" and len(csv_lines) == 4
+
+
+def test_sentiment_route_answers_confident_text_locally(make_app):
+    client = make_app(MODULES=["market"]).test_client()
+    response = client.post("/api/market/sentiment", json={"feedback": "Excellent, fantastic service"})
+    assert response.get_json()["path"] == "lexicon"
+    batch = client.post("/api/market/sentiment/batch", json=["I love it", "awful"])
+    assert [json.loads(line)["sentiment"] for line in batch.get_data(as_text=True).splitlines()] == [
+        "positive", "negative"]
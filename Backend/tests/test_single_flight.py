@@ -0,0 +1,84 @@
+import time
+import asyncio
+import threading
+import pytest
+from single_flight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "reply"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["coalesced_calls"] < 7:
+        time.sleep(0.005)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["reply"] * 8
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "upstream_calls": 1, "coalesced_calls": 7}
+
+
+def test_leader_exception_reaches_followers_and_the_key_is_released():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*[flight.do_async("k", failing) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.do("k", lambda: "fresh") == "fresh"  # a later call starts a new flight
+
+
+def test_sync_and_async_callers_coalesce():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.1)
+        return 42
+
+    leader = threading.Thread(target=lambda: flight.do("k", slow))
+    leader.start()
+    started.wait(5)
+
+    async def never_called():
+        raise AssertionError("follower must not call upstream")
+
+    assert asyncio.run(flight.do_async("k", never_called)) == 42
+    leader.join()
+
+
+def test_cancelled_follower_does_not_cancel_the_leader():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("k", slow))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.do_async("k", slow))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(main()) == "done"
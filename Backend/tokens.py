@@ -0,0 +1,21 @@
+"""
+Token Estimation
+Cheap prompt-size estimates for budgeting (no tokenizer dependency)
+"""
+
+# Llama-family tokenizers average roughly 4 characters of English text per token
+CHARS_PER_TOKEN = 4
+# Per-message framing (role markers, separators) added by the chat template
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text):
+    """Approximate token count of a string."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(messages):
+    """Approximate prompt tokens of a chat messages list."""
+    return sum(estimate_tokens(str(m.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS for m in messages)
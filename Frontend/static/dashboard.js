@@ -55,6 +55,57 @@ async function fetchAPI(endpoint, data) {
     }
 }
 
+/**
+ * Streaming API wrapper (Server-Sent Events over a POST body)
+ * Calls onEvent(event, data) for every event as it arrives and resolves
+ * with the data of the final "done" event.
+ */
+async function streamAPI(endpoint, data, onEvent) {
+    const response = await fetch(endpoint, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify({ ...data, stream: true })
+    });
+    
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            let payload = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) payload += line.slice(5).trim();
+            });
+            
+            const eventData = payload ? JSON.parse(payload) : {};
+            if (eventName === 'error') throw new Error(eventData.error || 'Stream error');
+            if (eventName === 'done') result = eventData;
+            onEvent(eventName, eventData);
+        }
+    }
+    return result;
+}
+
 // ==================== MODULE 1: MARKET INTELLIGENCE ====================
 
 /**
@@ -192,6 +243,7 @@ let chatMessages = [];
 
 /**
  * Add message to chat display
+ * Returns the text element so streamed responses can be appended to it
  */
 function addChatMessage(message, sender) {
     const chatHistory = document.getElementById('chat-history');
@@ -200,6 +252,7 @@ function addChatMessage(message, sender) {
     messageDiv.innerHTML = `<span class="message-text">${escapeHtml(message)}</span>`;
     chatHistory.appendChild(messageDiv);
     chatHistory.scrollTop = chatHistory.scrollHeight;
+    return messageDiv.querySelector('.message-text');
 }
 
 /**
@@ -231,21 +284,26 @@ async function handleChatSubmit(event) {
     input.value = '';
     chatMessages.push({ role: 'user', content: message });
     
+    // Render the reply token by token as it streams in
+    const botText = addChatMessage('', 'bot');
+    const chatHistory = document.getElementById('chat-history');
+    
     try {
-        const result = await fetchAPI(`${API_BASE}/chat`, {
+        const result = await streamAPI(`${API_BASE}/chat`, {
             message: message,
             history: chatMessages.slice(0, -1)  // Exclude current message for history
+        }, (eventName, data) => {
+            if (eventName === 'token') {
+                botText.textContent += data.delta;
+                chatHistory.scrollTop = chatHistory.scrollHeight;
+            }
         });
         
-        if (result.status === 'error') {
-            addChatMessage(`Error: ${result.response}`, 'bot');
-        } else {
-            const response = result.response || 'I did not understand that. Please try again.';
-            addChatMessage(response, 'bot');
-            chatMessages.push({ role: 'assistant', content: response });
-        }
+        const response = (result && result.response) || 'I did not understand that. Please try again.';
+        botText.textContent = response;
+        chatMessages.push({ role: 'assistant', content: response });
     } catch (error) {
-        addChatMessage(`Connection error: ${error.message}`, 'bot');
+        botText.textContent = `Connection error: ${error.message}`;
     }
 }
 